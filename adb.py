@@ -0,0 +1,63 @@
+"""One entry point for the test scripts.
+
+    python adb.py timer [--iterations N]
+    python adb.py burn [--sequence FILE --cycles N]
+    python adb.py functional [--sequence FILE --cycles N]
+    python adb.py multi timer|burn [--channels 1 2 3]
+    python adb.py quick
+    python adb.py analyze [timerTestResultCalculator options]
+
+Only the command's own module is imported, so `adb analyze` never loads
+pyvisa or the WaveForms library, and the hardware scripts open the PSU and
+the Analog Discovery inside main(), not at import. The PSU address is taken
+from the cache adbPsu keeps (ADB_PSU_CACHE) and checked with one *IDN?
+before any bus scan. At exit the commands that sample print the cold start
+from this file's first line to the first sample, split into imports, PSU
+open and DWF open (see adbProfile.STARTUP).
+"""
+import time
+_T0 = time.perf_counter() # before anything else is imported
+
+import argparse
+import importlib
+import runpy
+import sys
+
+# command -> (module, what it does); the module is imported only when its command runs
+COMMANDS = {
+    'timer': ('adbTimer', "timer test, repeated with --iterations"),
+    'burn': ('adbBurnToDeploy', "burn wire consistency test"),
+    'functional': ('adbFullFunctional', "full functional test"),
+    'multi': ('adbMulti', "timer or burn tests on up to three ADBs, one per PSU channel"),
+    'quick': ('quickTest', "check that the PSU answers and powers up"),
+    'analyze': ('timerTestResultCalculator', "summarize result files, no instruments needed"),
+}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='adb', description="ADB test station.")
+    sub = parser.add_subparsers(dest='command', metavar='command')
+    sub.required = True
+    for name, (module, help) in COMMANDS.items():
+        sub.add_parser(name, help=help, add_help=False) # --help goes on to the command's own parser
+    args, rest = parser.parse_known_args(argv)
+    module = COMMANDS[args.command][0]
+
+    if args.command == 'analyze':
+        # a script with only a __main__ block: run it with its own argv
+        sys.argv = [module + '.py'] + rest
+        runpy.run_module(module, run_name='__main__')
+        return 0
+
+    command = importlib.import_module(module)
+    from adbProfile import STARTUP
+    STARTUP.begin(_T0)
+    STARTUP.mark('imports')
+    try:
+        command.main(rest)
+    finally:
+        if STARTUP.firstSample is not None:
+            print(STARTUP.report())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
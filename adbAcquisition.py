@@ -0,0 +1,317 @@
+import threading
+import time
+from collections import deque, namedtuple
+from typing import Callable, Dict, List, Optional, Tuple
+from adbProfile import STARTUP, phases, timed
+from adbPsu import measure_all, visa_error
+from adbScheduler import AdaptiveRate, SampleScheduler
+
+# t is seconds since the engine started (perf_counter), taken at the middle of the query
+Sample = namedtuple('Sample', ['t', 'volt', 'curr', 'power'])
+
+class SampleQueue:
+    """Bounded single-producer/single-consumer sample queue.
+
+    Backed by a deque, whose append/popleft are atomic, so neither side takes a lock.
+    When a consumer falls behind the oldest samples are dropped and counted.
+    """
+    def __init__(self, maxlen: int = 8192):
+        self._buf = deque(maxlen=maxlen)
+        self._ready = threading.Event()
+        self.dropped = 0
+
+    def put(self, sample: Sample):
+        if len(self._buf) == self._buf.maxlen:
+            self.dropped += 1
+        self._buf.append(sample)
+        self._ready.set()
+
+    def get_all(self, timeout: Optional[float] = None) -> List[Sample]:
+        """Return every queued sample, waiting up to timeout for the first one."""
+        if not self._buf and timeout:
+            self._ready.wait(timeout)
+        self._ready.clear()
+        out = []
+        while True:
+            try:
+                out.append(self._buf.popleft())
+            except IndexError:
+                return out
+
+class _Housekeeping:
+    """A periodic PSU query that is fitted into the idle time between samples."""
+    def __init__(self, interval: float, cmd: str, handler: Callable[[str], None]):
+        self.interval = interval
+        self.cmd = cmd
+        self.handler = handler
+        self.due = 0.0
+        self.cost = 0.02 # seconds; replaced by the measured query time
+
+class Acquisition:
+    """Samples the PSU on a dedicated thread and fans samples out to consumer queues.
+
+    The thread does nothing but MEAS:ALL? reads on a drift-free SampleScheduler.
+    Each sample is timestamped at the midpoint of its query. Periodic queries
+    registered with every() run in the slack before the next deadline, and
+    other PSU traffic goes through query()/write() so it is serialized with
+    sampling. On VisaIOError recover(psu) is called and returns the PSU to keep
+    using; without one, a PsuSession recovers itself.
+
+    With an AdaptiveRate, period is ignored and the rate follows the DUT
+    (see adbScheduler.AdaptiveRate); consumers call burst() on DIO changes.
+    Every rate change is logged in rateLog as (t, sample period).
+    """
+    def __init__(self, psu, chan: int, period: float = 0.25,
+                 recover: Optional[Callable] = None, maxQueue: int = 8192,
+                 adaptive: Optional[AdaptiveRate] = None):
+        self.psu = psu
+        self.chan = chan
+        self.period = period
+        self._recoverWith = recover
+        self.maxQueue = maxQueue
+        self.lock = threading.Lock()
+        self.readers: List[SampleQueue] = []
+        self.adaptive = adaptive
+        self.scheduler = SampleScheduler(adaptive.pollPeriod if adaptive else period)
+        self.housekeeping: List[_Housekeeping] = []
+        self.samples = 0
+        self.published = 0
+        self.errors = 0
+        self.error: Optional[BaseException] = None # what ended the thread, if not stop()
+        self.t0 = 0.0
+        self.fastMode = False
+        self.rateLog: List[Tuple[float, float]] = []
+        self._held = deque()        # quiescent samples kept back as pre-trigger history
+        self._lastOut = float('-inf')
+        self._burst = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # stop() or burst()
+        self._thread = threading.Thread(target=self._run, name="psu-acquisition", daemon=True)
+
+    def reader(self) -> SampleQueue:
+        """Register a consumer; call before start() so no samples are missed."""
+        q = SampleQueue(self.maxQueue)
+        self.readers.append(q)
+        return q
+
+    def every(self, interval: float, cmd: str, handler: Callable[[str], None]):
+        """Run cmd about every interval seconds in idle slack; handler gets the reply.
+
+        The handler runs on the acquisition thread, so keep it short.
+        """
+        self.housekeeping.append(_Housekeeping(interval, cmd, handler))
+
+    def start(self):
+        self.t0 = self.scheduler.start()
+        for task in self.housekeeping:
+            task.due = self.t0 + task.interval
+        if self.adaptive is not None:
+            self.rateLog.append((0.0, self.adaptive.slowPeriod))
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+
+    def burst(self):
+        """Switch to the fast rate now (e.g. a DET line changed); no-op without adaptive."""
+        if self.adaptive is not None:
+            self._burst = True
+            self._wake.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def check(self):
+        """Raise what ended the acquisition thread if it ended without stop().
+
+        Consumer loops call this so they stop instead of waiting on an
+        empty queue when, say, a garbled reply fails float().
+        """
+        if self._thread.is_alive() or self._thread.ident is None or self._stop.is_set():
+            return
+        raise self.error or RuntimeError("acquisition thread ended")
+
+    @property
+    def late(self) -> int:
+        return self.scheduler.overruns
+
+    @property
+    def dropped(self) -> int:
+        return sum(q.dropped for q in self.readers)
+
+    def query(self, cmd: str) -> str:
+        with self.lock:
+            return self.psu.query(cmd)
+
+    def write(self, cmd: str):
+        with self.lock:
+            self.psu.write(cmd)
+
+    def timing(self) -> Dict[str, float]:
+        """Scheduler statistics plus drop counts, for the run metadata."""
+        stats = self.scheduler.stats()
+        stats.update(samples=self.samples, dropped=self.dropped, psuErrors=self.errors)
+        if self.adaptive is not None:
+            stats.update(published=self.published, rateChanges=len(self.rateLog) - 1,
+                         slowPeriod=self.adaptive.slowPeriod, fastPeriod=self.adaptive.fastPeriod,
+                         preTrigger=self.adaptive.preTrigger)
+        return stats
+
+    def report(self) -> str:
+        st = self.scheduler.stats()
+        return (f"Samples: {self.samples}, late: {st['overruns']} (skipped ticks: {st['skippedTicks']}), "
+                f"dropped: {self.dropped}, PSU errors: {self.errors}, "
+                f"jitter mean/p99/max: {st['jitterMean'] * 1000:.2f}/{st['jitterP99'] * 1000:.2f}/{st['jitterMax'] * 1000:.2f} ms")
+
+    def recover(self):
+        """Get the PSU link working again after a VisaIOError from query() or write()."""
+        self._recover()
+
+    def _recover(self):
+        self.errors += 1
+        with self.lock:
+            if self._recoverWith is not None:
+                self.psu = self._recoverWith(self.psu)
+            elif hasattr(self.psu, 'recover'):
+                self.psu.recover()
+
+    def _housekeep(self):
+        clock = self.scheduler.clock
+        for task in self.housekeeping:
+            now = clock()
+            if now < task.due:
+                continue
+            # wait for a slot with enough slack at the current rate, and for the end of a
+            # fast burst (adaptive sampling), unless it is a whole interval overdue
+            period = self.scheduler.period
+            bursting = period < self.period
+            if now < task.due + task.interval and (bursting or (period > 0 and self.scheduler.slack() < task.cost)):
+                continue
+            try:
+                with self.lock:
+                    reply = self.psu.query(task.cmd)
+            except visa_error():
+                self._recover()
+                continue
+            done = clock()
+            task.cost = 0.5 * task.cost + 0.5 * (done - now)
+            task.due = done + task.interval
+            task.handler(reply)
+
+    def _out(self, sample: Sample):
+        for q in self.readers:
+            q.put(sample)
+        self._lastOut = sample.t
+        if not self.published:
+            STARTUP.mark('first sample')
+        self.published += 1
+
+    def _set_fast(self, fast: bool, now: float):
+        if fast == self.fastMode:
+            return
+        self.fastMode = fast
+        a = self.adaptive
+        period = a.fastPeriod if fast else a.pollPeriod
+        if period != self.scheduler.period:
+            # fast starts right away, slow one period from now
+            self.scheduler.set_period(period, now if fast else now + period)
+        self.rateLog.append((now - self.t0, a.fastPeriod if fast else a.slowPeriod))
+
+    def _publish(self, sample: Sample, now: float):
+        a = self.adaptive
+        if a is None:
+            self._out(sample)
+            return
+        self._set_fast(a.fast(sample, now), now)
+        if a.preTrigger <= 0:
+            self._out(sample)
+        elif self.fastMode:
+            while self._held:
+                self._out(self._held.popleft())
+            self._out(sample)
+        else:
+            self._held.append(sample)
+            while self._held and sample.t - self._held[0].t > a.preTrigger:
+                self._release(self._held.popleft())
+
+    def _release(self, sample: Sample):
+        """Pass on a held quiescent sample if it is due at the slow rate."""
+        if sample.t - self._lastOut >= self.adaptive.slowPeriod * 0.999:
+            self._out(sample)
+
+    def _run(self):
+        clock = self.scheduler.clock
+        try:
+            self._loop(clock)
+        except Exception as e:
+            self.error = e # re-raised by check() in the consumer
+        finally:
+            while self._held:
+                self._release(self._held.popleft())
+
+    def _loop(self, clock):
+        phase = phases('loop.') # timed with ADB_PROFILE
+        while True:
+            self.scheduler.wait(self._wake)
+            phase.mark('wait')
+            if self._stop.is_set():
+                return
+            if self._wake.is_set():
+                self._wake.clear()
+                if not self._burst:
+                    continue
+                self._burst = False
+                now = clock()
+                self.adaptive.burst(now)
+                if self.fastMode:
+                    continue
+                self._set_fast(True, now)
+            before = clock()
+            self.scheduler.tick(before)
+            phase.lap()
+            try:
+                with self.lock:
+                    volt_val, curr_val, pow_val = measure_all(self.psu, self.chan)
+            except visa_error():
+                phase.mark('measure')
+                self._recover()
+                phase.mark('recover')
+                continue             # retry on the next tick
+            phase.mark('measure')
+            after = clock()
+            sample = Sample((before + after) / 2 - self.t0, volt_val, curr_val, pow_val)
+            self.samples += 1
+            self._publish(sample, after)
+            phase.mark('publish')
+            if self.housekeeping:
+                self._housekeep()
+                phase.mark('housekeep')
+
+class Display(threading.Thread):
+    """Prints samples from its own queue so a slow console never stalls sampling."""
+    def __init__(self, engine: Acquisition, fmt: Callable[[Sample], str]):
+        super().__init__(name="psu-display", daemon=True)
+        self.queue = engine.reader()
+        self.engine = engine
+        self.fmt = fmt
+        self._print = timed('console.print', print)
+        self._done = threading.Event()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def run(self):
+        while not self._done.is_set():
+            for s in self.queue.get_all(timeout=0.5):
+                self._print(self.fmt(s))
+        for s in self.queue.get_all():
+            self._print(self.fmt(s))
+
+def report_psu_error(reply: str):
+    """every() handler for SYST:ERR?."""
+    if not reply.startswith('0'):
+        print("PSU error:", reply)
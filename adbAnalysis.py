@@ -0,0 +1,179 @@
+"""Vectorized run analysis shared by the calculator and the acquisition scripts.
+
+Everything works on float64 NumPy arrays; lists, array('d') and the
+memoryview columns of an .adbrun file are accepted and, where possible,
+wrapped without copying.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+GAP_THRESHOLD = 1.0 # seconds between samples that count as an error/downtime
+PERCENTILES = (50, 95, 99)
+
+# trigger thresholds the scripts use, for runs whose file doesn't record one
+DEFAULT_THRESHOLDS = {'timer_test': 0.5, 'full_functional_test': 0.5}
+
+def as_array(data) -> np.ndarray:
+    return np.asarray(data, dtype=np.float64)
+
+def gaps(times, maxGap: float = GAP_THRESHOLD) -> Tuple[int, float]:
+    """Return (number of gaps > maxGap, total downtime in those gaps)."""
+    d = np.diff(as_array(times))
+    mask = d > maxGap
+    return int(np.count_nonzero(mask)), float(d[mask].sum())
+
+def integrate(times, values) -> float:
+    """Trapezoidal integral, correct for uneven sample spacing (power -> J, current -> C)."""
+    t = as_array(times)
+    y = as_array(values)
+    if len(t) < 2:
+        return 0.0
+    return float(np.dot(np.diff(t), y[1:] + y[:-1]) * 0.5)
+
+def crossing_index(currents, threshold: float) -> Optional[int]:
+    """Index of the first sample at or above threshold, or None."""
+    above = as_array(currents) >= threshold
+    idx = int(np.argmax(above))
+    return idx if above[idx] else None
+
+def crossing_time(times, currents, threshold: float, k: int) -> float:
+    """Time the current crossed threshold between samples k-1 and k, interpolated linearly."""
+    t = as_array(times)
+    i = as_array(currents)
+    if k <= 0:
+        return float(t[0])
+    if i[k] == i[k - 1]:
+        return float(t[k])
+    frac = min(max((threshold - i[k - 1]) / (i[k] - i[k - 1]), 0.0), 1.0)
+    return float(t[k - 1] + frac * (t[k] - t[k - 1]))
+
+def _held(t: np.ndarray, y: np.ndarray, k: int, split: float) -> float:
+    """Integral from sample k-1 to split, y held at sample k-1's level until the crossing."""
+    return float(y[k - 1] * (split - t[k - 1]))
+
+def _rest(t: np.ndarray, y: np.ndarray, k: int, split: float) -> float:
+    """The rest of the k-1 -> k trapezoid after split."""
+    return float(0.5 * (t[k] - t[k - 1]) * (y[k - 1] + y[k])) - _held(t, y, k, split)
+
+def segment_stats(times, volts, currents, powers, lo: int = 0, hi: Optional[int] = None,
+                  start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, float]:
+    """Statistics for samples lo..hi-1.
+
+    Averages, peaks and percentiles use the samples in the segment. Duration,
+    energy and charge run from start (a time between samples lo-1 and lo)
+    to end (between samples hi-1 and hi). Up to the split the quantity is
+    taken at the level of the sample before it, since it only crossed the
+    threshold there; the segment after the split gets the rest of that
+    interval's trapezoid, so adjacent segments split at the same time add
+    up to the whole run. Without them the segment spans samples lo to hi-1.
+    power_avg is energy / duration, so it is not skewed by uneven sampling.
+    """
+    t = as_array(times)
+    n = len(t)
+    hi = n if hi is None else hi
+    i = as_array(currents)
+    p = as_array(powers)
+    seg = slice(lo, hi)
+    energy = integrate(t[seg], p[seg])
+    charge = integrate(t[seg], i[seg])
+    first = float(t[lo]) if hi > lo else 0.0
+    last = float(t[hi - 1]) if hi > lo else 0.0
+    if start is not None and 0 < lo < n:
+        energy += _rest(t, p, lo, start)
+        charge += _rest(t, i, lo, start)
+        first = start
+    if end is not None and 0 < hi < n:
+        energy += _held(t, p, hi, end)
+        charge += _held(t, i, hi, end)
+        last = end
+    if start is not None and end is not None and hi <= lo:
+        first = last = start
+    duration = max(last - first, 0.0)
+    stats = {
+        'samples': hi - lo,
+        'duration': duration,
+        'volt_avg': float(as_array(volts)[seg].mean()) if volts is not None and hi > lo else 0.0,
+        'curr_avg': float(i[seg].mean()) if hi > lo else 0.0,
+        'power_avg': energy / duration if duration > 0 else float(p[seg].mean()) if hi > lo else 0.0,
+        'energy': energy,
+        'charge': charge,
+        'curr_peak': float(i[seg].max()) if hi > lo else 0.0,
+        'power_peak': float(p[seg].max()) if hi > lo else 0.0,
+    }
+    if hi > lo:
+        for q, v in zip(PERCENTILES, np.percentile(i[seg], PERCENTILES)):
+            stats[f'curr_p{q}'] = float(v)
+    return stats
+
+def summarize(times, volts, currents, powers, threshold: Optional[float] = None,
+              maxGap: float = GAP_THRESHOLD, index: Optional[int] = None,
+              triggerTime: Optional[float] = None) -> Dict[str, object]:
+    """Whole-run summary, split into timer and burn segments when threshold is given.
+
+    volts may be None for runs without a voltage column (burn_test CSVs).
+    index is the burn onset found by a trigger (adbTrigger) and takes
+    precedence over the plain threshold crossing; triggerTime is where it
+    interpolated the crossing. The segments split there, or at the
+    threshold crossing interpolated here, so the samples leading up to the
+    onset are not charged to the timer.
+    """
+    t = as_array(times)
+    errors, downtime = gaps(t, maxGap)
+    out: Dict[str, object] = {
+        'overall': segment_stats(t, volts, currents, powers),
+        'gaps': errors,
+        'downtime': downtime,
+        'burnIndex': None,
+    }
+    if index is not None or threshold is not None:
+        k = index if index is not None else crossing_index(currents, threshold)
+        if k is not None:
+            if k == 0:
+                split = float(t[0])
+            elif triggerTime is not None:
+                split = min(max(triggerTime, float(t[k - 1])), float(t[k]))
+            elif threshold is not None:
+                split = crossing_time(t, currents, threshold, k)
+            else:
+                split = float(t[k - 1]) # no crossing time: the whole interval goes to the burn
+            out['burnIndex'] = k
+            out['triggerTime'] = split
+            out['timer'] = segment_stats(t, volts, currents, powers, 0, k, start=float(t[0]), end=split)
+            out['burn'] = segment_stats(t, volts, currents, powers, k, start=split)
+    return out
+
+def run_summary(times, volts, currents, powers, threshold: Optional[float] = None,
+                test: str = 'unknown', index: Optional[int] = None,
+                triggerTime: Optional[float] = None) -> Dict[str, object]:
+    """summarize() plus the per-run fields the calculator and the run index use.
+
+    triggerTime is the interpolated crossing time when a trigger found one.
+    """
+    summary = summarize(times, volts, currents, powers, threshold, index=index, triggerTime=triggerTime)
+    n = len(times)
+    finalTime = float(times[-1]) if n else 0.0
+    summary.update(
+        test=test,
+        samples=n,
+        finalTime=finalTime,
+        # timer runs end at the trigger; burn runs have no trigger and count the whole run
+        triggerTime=summary.get('triggerTime', finalTime),
+    )
+    return summary
+
+def summarize_run(times, volts, currents, powers, header: Dict, test: str) -> Dict[str, object]:
+    """run_summary() of a recorded run, split where the script's trigger fired.
+
+    The trigger index and time come from the run header (triggerIndex /
+    triggerTime, burnStartIndex / burnTime) and the threshold from it or
+    DEFAULT_THRESHOLDS; burn runs count the whole run. volts is None for
+    runs without a voltage column. The calculator and
+    the run index both summarize files through here, so a cached summary
+    is the one a fresh analysis would give.
+    """
+    if test == 'burn_test':
+        return run_summary(times, volts, currents, powers, None, test)
+    threshold = header.get('currThreshold', header.get('burnCurrThreshold', DEFAULT_THRESHOLDS.get(test)))
+    index = header.get('triggerIndex', header.get('burnStartIndex'))
+    triggerTime = header.get('triggerTime', header.get('burnTime')) if index is not None else None
+    return run_summary(times, volts, currents, powers, threshold, test, index=index, triggerTime=triggerTime)
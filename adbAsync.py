@@ -0,0 +1,212 @@
+"""asyncio layer over the PSU session and the Analog Discovery digital IO.
+
+The drivers block, so every call runs in an executor: one single-thread
+worker per instrument, which keeps each instrument's calls in order (a VISA
+session or a DWF handle must not be used from two threads at once) while
+different instruments, housekeeping and file writes overlap:
+
+    sample, levels = await asyncio.gather(station.psu.measure(), station.dio.status())
+    await station.files.run(f.write, text)
+
+Events are awaited instead of polled from a sleep loop. AsyncDio.watch()
+ticks an adbDio.DioDevice on its own task and wakes waiters when the pins
+change, and
+AsyncPsu.wait_for() feeds an adbTrigger condition until it fires:
+
+    await station.dio.wait_for(DET1, False, timeout=60)    # DET1 low
+    await station.psu.wait_for(Trigger(current_trigger(0.5)), timeout=10)
+
+Both raise asyncio.TimeoutError when the timeout passes first.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from adbAcquisition import Sample, report_psu_error
+from adbDio import DioDevice, Snapshot
+from adbPsu import measure_all, visa_error
+from adbTrigger import Crossing, Trigger
+
+class Worker:
+    """A single-thread executor for one blocking device or file."""
+    def __init__(self, name: str):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+class AsyncPsu:
+    """A PsuSession (or any pyvisa-like resource) behind its own worker thread.
+
+    measure() retries through psu.recover() on VisaIOError like the scripts'
+    query loops; query() and write() pass errors on. Sample times are seconds
+    since construction, at the middle of the query.
+    """
+    def __init__(self, psu, chan: Optional[int] = None, clock: Callable[[], float] = time.perf_counter):
+        self.psu = psu
+        self.chan = chan
+        self.clock = clock
+        self.t0 = clock()
+        self.worker = Worker('psu')
+
+    async def query(self, cmd: str) -> str:
+        return await self.worker.run(self.psu.query, cmd)
+
+    async def write(self, cmd: str):
+        await self.worker.run(self.psu.write, cmd)
+
+    async def measure(self) -> Sample:
+        return await self.worker.run(self._measure)
+
+    def _measure(self) -> Sample:
+        while True:
+            before = self.clock()
+            try:
+                volt, curr, power = measure_all(self.psu, self.chan)
+            except visa_error():
+                self.psu.recover()
+                continue             # retry
+            return Sample((before + self.clock()) / 2 - self.t0, volt, curr, power)
+
+    async def wait_for(self, trigger: Trigger, timeout: Optional[float] = None, period: float = 0.0,
+                       dio: Optional["AsyncDio"] = None, pins: Optional[dict] = None) -> Crossing:
+        """Measure every period seconds (0 = back to back) until trigger fires.
+
+        With dio and pins ({'DET1': 1, ...}) the latest DIO levels are passed
+        along for Level conditions.
+        """
+        async def poll() -> Crossing:
+            while True:
+                s = await self.measure()
+                hit = trigger.feed(s, dio.levels(pins) if dio is not None and pins else None)
+                if hit:
+                    return hit
+                await asyncio.sleep(period)
+        return await asyncio.wait_for(poll(), timeout)
+
+    async def housekeeping(self, interval: float = 60.0, cmd: str = 'SYST:ERR?',
+                           handler: Callable[[str], None] = report_psu_error):
+        """Run cmd every interval seconds until cancelled; start as a task."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                handler(await self.query(cmd))
+            except visa_error():
+                await self.worker.run(self.psu.recover)
+
+    def close(self):
+        self.worker.close()
+
+class AsyncDio:
+    """A DioDevice (any adbDio backend) behind its own worker thread.
+
+    While watch() runs, the pins are read every poll seconds and waiters are
+    woken on each change; wait_for() starts it on first use.
+    """
+    def __init__(self, device: DioDevice, poll: float = 0.01):
+        self.device = device
+        self.poll = poll
+        self.worker = Worker('dio')
+        self.state: Optional[int] = None    # last polled bitmask
+        self.changedAt: Optional[float] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def tick(self) -> Snapshot:
+        """One status read of every pin."""
+        return await self.worker.run(self.device.tick)
+
+    async def status(self) -> int:
+        """Read every pin now, as a bitmask."""
+        return (await self.tick()).state
+
+    async def read(self, pin: int) -> bool:
+        return bool(await self.status() & (1 << pin))
+
+    async def set_outputs(self, mask: int):
+        await self.worker.run(self.device.set_outputs, mask)
+
+    def levels(self, pins: dict) -> Optional[dict]:
+        """Last polled levels by name ({'DET1': 1} -> {'DET1': True}), None before the first poll."""
+        if self.state is None:
+            return None
+        return {name: bool(self.state & (1 << pin)) for name, pin in pins.items()}
+
+    def start(self):
+        """Start watch() on the running loop, once."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def watch(self):
+        """Poll until cancelled, waking waiters on every change."""
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        while True:
+            snap = await self.tick()
+            if snap.state != self.state:
+                async with self._changed:
+                    self.state, self.changedAt = snap.state, snap.t
+                    self._changed.notify_all()
+            await asyncio.sleep(self.poll)
+
+    async def wait_for(self, pin: int, level: bool, timeout: Optional[float] = None) -> float:
+        """Wait until pin reads level (at once if it already does); return when that was first seen."""
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        self.start()
+        async def until() -> float:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.state is not None and bool(self.state & (1 << pin)) == level)
+                return self.changedAt
+        return await asyncio.wait_for(until(), timeout)
+
+    def close(self):
+        self.worker.close()
+
+class AsyncStation:
+    """PSU, DioDevice and a file worker for one test, as an async context manager.
+
+    Inside `async with station:` the DIO watcher and the SYST:ERR?
+    housekeeping run as tasks next to whatever the test awaits. run() puts
+    any other blocking call (input(), a slow print) on the default executor.
+    """
+    def __init__(self, psu, device: DioDevice, chan: Optional[int] = None, housekeeping: float = 60.0, poll: float = 0.01):
+        self.psu = AsyncPsu(psu, chan)
+        self.dio = AsyncDio(device, poll)
+        self.files = Worker('files')
+        self.housekeepingInterval = housekeeping
+        self._housekeeping: Optional[asyncio.Task] = None
+
+    async def run(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def __aenter__(self) -> "AsyncStation":
+        self.dio.start()
+        self._housekeeping = asyncio.get_running_loop().create_task(self.psu.housekeeping(self.housekeepingInterval))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.dio.stop()
+        self._housekeeping.cancel()
+        try:
+            await self._housekeeping
+        except asyncio.CancelledError:
+            pass
+
+    def close(self):
+        """Shut the worker threads down; the wrapped devices stay open."""
+        self.psu.close()
+        self.dio.close()
+        self.files.close()
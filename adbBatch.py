@@ -0,0 +1,278 @@
+"""Unattended batch mode for adbBurnToDeploy.py and adbFullFunctional.py.
+
+Run a script with a sequence file and it answers its own confirmations and
+repeats the test for --cycles boards, switching the PSU output off for
+BATCH_OFF_S in between, as adbTimer.py's iterations do:
+
+    python adbFullFunctional.py --sequence full_functional.seq --cycles 20
+
+A sequence file has one 'prompt = answer' line per confirmation; prompts
+match case-insensitively and may use * and ? wildcards, the first match
+wins, and # starts a comment. An answer is one of
+
+    y                        the operator's yes
+    n                        fail the cycle here
+    wait:<seconds>           pause, e.g. for a fixture to settle, then yes
+    check:<name>[,<name>..]  decide by measurement instead
+
+Checks read back what the operator would have looked at: burn-on/off,
+det1-on/off and det2-on/off read the DIO pins, ds1-on/off compare the
+median of a few quiescent current readings with DS1_ON_CURRENT. A failed
+check, an 'n', a prompt without an answer or a wait past
+BATCH_STEP_TIMEOUT_S fails the cycle (CycleFailed); the script powers down
+and goes on with the next one. Each cycle still writes its own result
+files, and <test>_batch_<timestamp>.txt adds pass/fail per cycle, boards
+per hour and the time per step.
+
+Without --sequence the scripts ask on the console as before, one board.
+"""
+import argparse
+import asyncio
+import fnmatch
+import inspect
+import statistics
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from adbStreamWriter import atomic_open
+import adbConfig as cfg
+
+Verdict = Tuple[bool, str]
+Check = Callable[[], Union[Verdict, Awaitable[Verdict]]]
+
+# check name -> (DIO pin, what the operator would look at)
+PINS = {'burn': (0, 'EGSE BURN'), 'det1': (1, 'EGSE DET1'), 'det2': (2, 'EGSE DET2')}
+QUIESCENT_READS = 5
+
+class CycleFailed(Exception):
+    """A cycle stopped where an operator would have answered 'n'."""
+
+class Sequence:
+    """Answers to the confirmation prompts, from a sequence file."""
+    def __init__(self, answers: List[Tuple[str, str]], path: Optional[str] = None):
+        self.answers = answers
+        self.path = path
+        for pattern, answer in answers:
+            kind, _, arg = answer.partition(':')
+            if answer not in ('y', 'n') and not (kind == 'wait' and _is_number(arg)) and not (kind == 'check' and arg):
+                raise ValueError(f"{path or 'sequence'}: bad answer {answer!r} for {pattern!r}")
+
+    @classmethod
+    def load(cls, path: str) -> "Sequence":
+        answers = []
+        with open(path) as f:
+            for n, line in enumerate(f, 1):
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                prompt, sep, answer = line.rpartition('=')
+                if not sep or not prompt.strip():
+                    raise ValueError(f"{path}:{n}: expected 'prompt = answer', got {line!r}")
+                answers.append((prompt.strip().lower(), answer.strip().lower().replace(' ', '')))
+        return cls(answers, path)
+
+    def answer(self, prompt: str) -> Optional[str]:
+        prompt = prompt.strip().lower()
+        for pattern, answer in self.answers:
+            if fnmatch.fnmatchcase(prompt, pattern):
+                return answer
+        return None
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+def _then(value, fn):
+    """fn(value), or a coroutine giving it when value is awaitable."""
+    if inspect.isawaitable(value):
+        async def later():
+            return fn(await value)
+        return later()
+    return fn(value)
+
+def pin_verdict(label: str, high: bool, want: bool) -> Verdict:
+    return high == want, f"{label} reads {'high' if high else 'low'}"
+
+def ds1_verdict(currents: List[float], lit: bool, threshold: float = cfg.DS1_ON_CURRENT) -> Verdict:
+    curr = statistics.median(currents)
+    on = curr >= threshold
+    return on == lit, f"quiescent current {curr * 1000:.2f} mA, DS1 {'lit' if on else 'dark'} (threshold {threshold * 1000:.2f} mA)"
+
+def station_checks(read_pin: Callable[[int], Union[bool, Awaitable[bool]]],
+                   read_currents: Callable[[int], Union[List[float], Awaitable[List[float]]]]) -> Dict[str, Check]:
+    """The standard checks over a station's pin and current readers, blocking or async."""
+    checks: Dict[str, Check] = {}
+    for name, (pin, label) in PINS.items():
+        for state, level in (('on', True), ('off', False)):
+            checks[f'{name}-{state}'] = (lambda pin=pin, label=label, level=level:
+                                         _then(read_pin(pin), lambda high: pin_verdict(label, high, level)))
+    for state, lit in (('on', True), ('off', False)):
+        checks[f'ds1-{state}'] = (lambda lit=lit:
+                                  _then(read_currents(QUIESCENT_READS), lambda currents: ds1_verdict(currents, lit)))
+    return checks
+
+def format_duration(seconds: float) -> str:
+    minutes = int(seconds) // 60
+    return f"{minutes:02d}:{seconds - minutes * 60:06.3f}"  # MM:SS.mmm
+
+class Batch:
+    """Cycle loop state for a test script: answers, checks, step times and the throughput report.
+
+    Without a sequence it is the interactive single run: unattended is
+    False, cycles is 1, the timeouts are None and no report is written.
+    """
+    def __init__(self, test: str, sequence: Optional[Sequence] = None, cycles: int = 1,
+                 timeout: float = cfg.BATCH_STEP_TIMEOUT_S, runTimeout: float = cfg.BATCH_RUN_TIMEOUT_S,
+                 offTime: float = cfg.BATCH_OFF_S):
+        self.test = test
+        self.sequence = sequence
+        self.unattended = sequence is not None
+        self.cycles = cycles if self.unattended else 1
+        self.timeout = timeout if self.unattended else None
+        self.runTimeout = runTimeout if self.unattended else None
+        self.offTime = offTime
+        self.checks: Dict[str, Check] = {}
+        self.results: List[Dict] = []
+        self.started: Optional[float] = None # wall clock
+        self._t0: Optional[float] = None
+        self._t1 = 0.0
+        self._cycle: Optional[Dict] = None
+        self._step: Optional[str] = None
+        self._stepStart = 0.0
+
+    @classmethod
+    def from_args(cls, test: str, argv: Optional[List[str]] = None) -> "Batch":
+        parser = argparse.ArgumentParser(description=f"{test}: asks on the console, or runs unattended with --sequence.")
+        parser.add_argument('--sequence', help="answer the confirmations from this file (see adbBatch)")
+        parser.add_argument('--cycles', type=int, default=1, help="with --sequence: cycles to run, power-cycled in between")
+        args = parser.parse_args(argv)
+        if args.cycles != 1 and not args.sequence:
+            parser.error("--cycles needs --sequence")
+        if args.cycles < 1:
+            parser.error("--cycles must be at least 1")
+        return cls(test, Sequence.load(args.sequence) if args.sequence else None, args.cycles)
+
+    # cycles and steps
+
+    def start_cycle(self, cycle: int):
+        if self.started is None:
+            self.started = time.time()
+            self._t0 = time.perf_counter()
+        self._cycle = {'cycle': cycle, 'start': time.perf_counter(), 'steps': {}}
+        self._step = None
+        if self.unattended:
+            print(f"=== Cycle {cycle} of {self.cycles} ===\n")
+
+    def step(self, name: Optional[str]):
+        """Close the current step and start timing name."""
+        now = time.perf_counter()
+        if self._cycle is not None and self._step is not None:
+            steps = self._cycle['steps']
+            steps[self._step] = steps.get(self._step, 0.0) + now - self._stepStart
+        self._step = name
+        self._stepStart = now
+
+    def end_cycle(self, passed: bool, note: str = '', result: Optional[str] = None):
+        self.step(None)
+        cycle = self._cycle
+        self._t1 = time.perf_counter()
+        cycle.update(passed=passed, note=note, result=result, duration=self._t1 - cycle.pop('start'))
+        self.results.append(cycle)
+        self._cycle = None
+        if self.unattended:
+            print(f"Cycle {cycle['cycle']}: {'PASS' if passed else 'FAIL'}" + (f" ({note})" if note else "") + "\n")
+
+    # confirmations
+
+    def _answer(self, prompt: str) -> Tuple[str, str]:
+        answer = self.sequence.answer(prompt)
+        print(f"-> {prompt} [{answer or 'no answer'}]")
+        if answer is None:
+            raise CycleFailed(f"no answer in {self.sequence.path} for {prompt!r}")
+        if answer == 'n':
+            raise CycleFailed(f"{prompt!r} answered n")
+        kind, _, arg = answer.partition(':')
+        return kind, arg
+
+    def _check(self, name: str) -> Check:
+        check = self.checks.get(name)
+        if check is None:
+            raise ValueError(f"{self.test} has no check {name!r}; it has {', '.join(sorted(self.checks))}")
+        return check
+
+    @staticmethod
+    def _judge(name: str, verdict: Verdict):
+        ok, detail = verdict
+        print(f"   {name}: {'ok' if ok else 'FAILED'}, {detail}")
+        if not ok:
+            raise CycleFailed(f"{name}: {detail}")
+
+    def ask(self, prompt: str):
+        """Answer prompt from the sequence; raises CycleFailed instead of answering 'n'."""
+        kind, arg = self._answer(prompt)
+        if kind == 'wait':
+            time.sleep(float(arg))
+        elif kind == 'check':
+            for name in arg.split(','):
+                verdict = self._check(name)()
+                if inspect.isawaitable(verdict):
+                    verdict.close()
+                    raise TypeError(f"check {name!r} is async; use ask_async()")
+                self._judge(name, verdict)
+
+    async def ask_async(self, prompt: str):
+        """ask() for asyncio scripts; checks may be coroutines."""
+        kind, arg = self._answer(prompt)
+        if kind == 'wait':
+            await asyncio.sleep(float(arg))
+        elif kind == 'check':
+            for name in arg.split(','):
+                verdict = self._check(name)()
+                if inspect.isawaitable(verdict):
+                    verdict = await verdict
+                self._judge(name, verdict)
+
+    # throughput report
+
+    def report(self) -> List[str]:
+        passed = sum(1 for r in self.results if r['passed'])
+        busy = sum(r['duration'] for r in self.results)
+        elapsed = self._t1 - self._t0 if self._t0 is not None else busy # including the off time between cycles
+        perHour = len(self.results) / elapsed * 3600 if elapsed > 0 else 0.0
+        lines = [f"Batch results for {self.test}, started {datetime.fromtimestamp(self.started or time.time()):%Y-%m-%d %H:%M:%S}",
+                 f"Sequence: {self.sequence.path if self.sequence else 'interactive'}",
+                 f"Cycles: {len(self.results)}, passed: {passed}, failed: {len(self.results) - passed}",
+                 f"Total time: {format_duration(elapsed)}, in cycles {format_duration(busy)}, mean cycle {format_duration(busy / len(self.results)) if self.results else '-'}",
+                 f"Throughput: {perHour:.1f} boards/hour, {passed / elapsed * 3600 if elapsed > 0 else 0.0:.1f} passed/hour",
+                 "",
+                 "Per cycle:"]
+        for r in self.results:
+            line = f"Cycle {r['cycle']}: {'PASS' if r['passed'] else 'FAIL'}, {format_duration(r['duration'])}"
+            if r['note']:
+                line += f", {r['note']}"
+            if r['result']:
+                line += f", {r['result']}"
+            lines.append(line)
+        lines += ["", "Time per step (mean / min / max over the cycles that reached it):"]
+        names: List[str] = []
+        for r in self.results:
+            names += [n for n in r['steps'] if n not in names]
+        for name in names:
+            times = [r['steps'][name] for r in self.results if name in r['steps']]
+            lines.append(f"{name}: {format_duration(statistics.mean(times))} / {format_duration(min(times))} / "
+                         f"{format_duration(max(times))} ({len(times)} cycles)")
+        return lines
+
+    def write_report(self) -> Optional[str]:
+        """Write <test>_batch_<timestamp>.txt after an unattended run; returns its path."""
+        if not self.unattended or not self.results:
+            return None
+        path = f"{self.test}_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        with atomic_open(path) as f:
+            for line in self.report():
+                f.write(line + "\n")
+        print("Batch report saved to " + path)
+        return path
@@ -0,0 +1,258 @@
+"""Throughput and latency benchmark of the acquisition loop on simulated hardware.
+
+Runs the timer, burn and full-functional flows against adbSim's DP832 and
+Analog Discovery stand-ins using the same Acquisition, PsuSession and
+EdgeCapture code as the scripts, and reports samples/s, per-query latency
+percentiles, how long after the (simulated) event RBF removal, burn onset
+and deployment were detected, and recovery time after injected faults.
+
+    python adbBench.py                       # all flows, 20 Hz
+    python adbBench.py --period 0 --flows timer --json bench.json
+    python adbBench.py --flows faults --error-rate 0.01
+"""
+import argparse
+import json
+import threading
+import time
+from ctypes import byref, c_int
+from typing import Callable, Dict, List, Optional, Tuple
+from adbAcquisition import Acquisition
+from adbEdgeCapture import DwfRecorder, EdgeCapture
+from adbPsu import PsuSession
+from adbSim import DET1_PIN, DET2_PIN, SimulatedBoard, SimulatedDevice, SimulatedDwf, SimulatedPsu, SimulatedResourceManager
+
+FLOWS = ('timer', 'burn', 'functional', 'faults')
+
+rbfCurrThreshold = 0.004
+currThreshold = 0.5
+
+def percentiles(values: List[float], qs=(50, 90, 99)) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    out = {f"p{q}": ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] for q in qs}
+    out['max'] = ordered[-1]
+    out['mean'] = sum(ordered) / len(ordered)
+    return out
+
+class TimedResource:
+    """Wraps a PSU resource and records the duration of every query."""
+    def __init__(self, resource, clock: Callable[[], float] = time.perf_counter):
+        self._resource = resource
+        self.clock = clock
+        self.latencies: List[float] = []
+
+    def query(self, cmd: str) -> str:
+        start = self.clock()
+        try:
+            return self._resource.query(cmd)
+        finally:
+            self.latencies.append(self.clock() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._resource, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_resource', 'clock', 'latencies'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._resource, name, value)
+
+class Rig:
+    """Board, PSU session and acquisition engine for one flow."""
+    def __init__(self, args, board: SimulatedBoard, **psuOptions):
+        self.board = board
+        self.sim = SimulatedPsu(board, latency=args.latency, jitter=args.jitter, **psuOptions)
+        self.timed = TimedResource(self.sim)
+        self.psu = PsuSession(address=self.sim.resource_name, timeout=args.timeout,
+                              rm=SimulatedResourceManager(self.timed))
+        self.psu.write('*RST')
+        self.psu.write('INST:NSEL 1')
+        self.psu.write('VOLT 7.2')
+        self.psu.write('CURR 3.0')
+        self.engine = Acquisition(self.psu, 1, period=args.period)
+        self.queue = self.engine.reader()
+        self.samples = 0
+        self.lastT = None
+        self.maxGap = 0.0
+
+    def power_on(self):
+        self.psu.write('OUTP ON')
+        self.engine.start()
+
+    def wait_until(self, test: Callable, timeout: float) -> Optional[Tuple[float, float]]:
+        """Consume samples until test(sample) holds; return (sample time, time noticed) on perf_counter."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            for s in self.queue.get_all(timeout=0.1):
+                self.samples += 1
+                if self.lastT is not None:
+                    self.maxGap = max(self.maxGap, s.t - self.lastT)
+                self.lastT = s.t
+                if test(s):
+                    return self.engine.t0 + s.t, time.perf_counter()
+        return None
+
+    def finish(self) -> Dict:
+        start = self.engine.t0
+        self.engine.stop()
+        self.psu.write('OUTP OFF')
+        elapsed = time.perf_counter() - start
+        return {
+            'samples': self.engine.samples,
+            'samplesPerSecond': self.engine.samples / elapsed if elapsed else 0.0,
+            'queryLatency': percentiles(self.timed.latencies),
+            'timing': self.engine.timing(),
+            'maxSampleGap': self.maxGap,
+        }
+
+def detection(event: Optional[float], found) -> Dict[str, Optional[float]]:
+    """Latency of the sample that showed the event and of the consumer noticing it."""
+    if event is None or found is None:
+        return {'sample': None, 'noticed': None}
+    sampleTime, noticed = found
+    return {'sample': sampleTime - event, 'noticed': noticed - event}
+
+def flow_timer(args) -> Dict:
+    """Power on, wait for the board's own timer to start burning (current > currThreshold)."""
+    rig = Rig(args, SimulatedBoard(timerDelay=args.timer_delay))
+    rig.power_on()
+    found = rig.wait_until(lambda s: s.curr > currThreshold, args.timer_delay + 5)
+    result = rig.finish()
+    result['burnOnset'] = detection(rig.board.events.get('burnOn'), found)
+    return result
+
+def _poll_dio(read: Callable[[int], bool], pins, timeout: float) -> Dict[int, float]:
+    """The scripts' polled read_DIO loop; returns when each pin was seen high."""
+    seen = {}
+    deadline = time.perf_counter() + timeout
+    while len(seen) < len(pins) and time.perf_counter() < deadline:
+        for pin in pins:
+            if pin not in seen and read(pin):
+                seen[pin] = time.perf_counter()
+        time.sleep(0.01)
+    return seen
+
+def _deploy_latency(board: SimulatedBoard, capture: EdgeCapture, polled: Dict[int, float]) -> Dict:
+    out = {}
+    for name, pin in (('DET1', DET1_PIN), ('DET2', DET2_PIN)):
+        event = board.events.get(name)
+        edge = capture.first_edge(name, True)
+        out[name] = {
+            'edgeCapture': None if event is None or edge is None else edge - event,
+            'polled': None if event is None or pin not in polled else polled[pin] - event,
+        }
+    return out
+
+def flow_burn(args) -> Dict:
+    """EGSE burn through the dwfpy stand-in: burn onset by current, deployment by DIO."""
+    rig = Rig(args, SimulatedBoard(timerDelay=None, deployDelays=args.deploy))
+    dwf = SimulatedDwf(rig.board)
+    device = SimulatedDevice(dwf)
+    io = device.digital_io
+    capture = EdgeCapture(DwfRecorder(dwf, device.handle), rate=args.dio_rate)
+    rig.power_on()
+    rig.wait_until(lambda s: True, 1.0)
+    capture.start()
+    io[0].output_state = True
+
+    def read(pin):
+        io.read_status()
+        return io[pin].input_state
+
+    found = rig.wait_until(lambda s: s.curr > currThreshold, 5)
+    polled = _poll_dio(read, (DET1_PIN, DET2_PIN), max(args.deploy) + 5)
+    io[0].output_state = False
+    capture.stop()
+    result = rig.finish()
+    result['burnOnset'] = detection(rig.board.events.get('burnOn'), found)
+    result['deployment'] = _deploy_latency(rig.board, capture, polled)
+    result['dwfCalls'] = dwf.calls
+    return result
+
+def flow_functional(args) -> Dict:
+    """RBF removal, internal timer, burn and deployment on the ctypes stand-in."""
+    board = SimulatedBoard(timerDelay=args.timer_delay, deployDelays=args.deploy, rbfInserted=True)
+    rig = Rig(args, board)
+    dwf = SimulatedDwf(board)
+    hdwf = SimulatedDevice(dwf).hdwf
+    capture = EdgeCapture(DwfRecorder(dwf, hdwf), rate=args.dio_rate)
+    rig.power_on()
+    rig.wait_until(lambda s: True, 1.0)
+    threading.Timer(0.5, board.remove_rbf).start()
+    rbf = rig.wait_until(lambda s: s.curr > rbfCurrThreshold, 5)
+    capture.start()
+    onset = rig.wait_until(lambda s: s.curr > currThreshold, args.timer_delay + 5)
+
+    def read(pin):
+        dwRead = c_int()
+        dwf.FDwfDigitalIOStatus(hdwf)
+        dwf.FDwfDigitalIOInputStatus(hdwf, byref(dwRead))
+        return bool(dwRead.value & (1 << pin))
+
+    polled = _poll_dio(read, (DET1_PIN, DET2_PIN), max(args.deploy) + 5)
+    capture.stop()
+    result = rig.finish()
+    result['rbfRemoval'] = detection(board.events.get('rbfRemoved'), rbf)
+    result['burnOnset'] = detection(board.events.get('burnOn'), onset)
+    result['deployment'] = _deploy_latency(board, capture, polled)
+    return result
+
+def flow_faults(args) -> Dict:
+    """Timer flow with PSU timeouts injected, to time PsuSession.recover()."""
+    faults = [(1.0 + i * 1.5, args.fault_length) for i in range(args.faults)]
+    rig = Rig(args, SimulatedBoard(timerDelay=None), errorRate=args.error_rate, faults=faults)
+    rig.power_on()
+    rig.wait_until(lambda s: False, faults[-1][0] + args.fault_length + 1.5 if faults else 3.0)
+    result = rig.finish()
+    times = rig.psu.recoveryTimes
+    result.update(injected=rig.sim.injected, psuErrors=rig.psu.errors, reopens=rig.psu.reopens,
+                  failedRecoveries=rig.psu.failedRecoveries, recovery=percentiles(times))
+    return result
+
+def _ms(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value * 1000:.2f} ms"
+
+def print_result(name: str, result: Dict):
+    print(f"{name}:")
+    print(f"  samples: {result['samples']} ({result['samplesPerSecond']:.1f}/s), "
+          f"late: {result['timing']['overruns']}, max gap: {_ms(result['maxSampleGap'])}")
+    lat = result['queryLatency']
+    if lat:
+        print(f"  query latency p50/p90/p99/max: {_ms(lat['p50'])} / {_ms(lat['p90'])} / {_ms(lat['p99'])} / {_ms(lat['max'])}")
+    for key, label in (('rbfRemoval', 'RBF removal'), ('burnOnset', 'burn onset')):
+        if key in result:
+            d = result[key]
+            print(f"  {label} detected: sample {_ms(d['sample'])}, noticed {_ms(d['noticed'])}")
+    for det, d in result.get('deployment', {}).items():
+        print(f"  {det} deployment detected: edge capture {_ms(d['edgeCapture'])}, polled {_ms(d['polled'])}")
+    if 'recovery' in result:
+        rec = result['recovery']
+        print(f"  injected faults: {result['injected']}, PSU errors: {result['psuErrors']}, "
+              f"reopens: {result['reopens']}, failed recoveries: {result['failedRecoveries']}")
+        if rec:
+            print(f"  recovery p50/max: {_ms(rec['p50'])} / {_ms(rec['max'])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition loop on simulated hardware.")
+    parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+    parser.add_argument('--period', type=float, default=0.05, help="sample period in s (0 = as fast as possible)")
+    parser.add_argument('--latency', type=float, default=0.002, help="simulated PSU query latency in s")
+    parser.add_argument('--jitter', type=float, default=0.0005, help="standard deviation of the query latency")
+    parser.add_argument('--timeout', type=int, default=200, help="VISA timeout in ms for the session")
+    parser.add_argument('--timer-delay', type=float, default=2.0, help="board timer delay in s")
+    parser.add_argument('--deploy', type=float, nargs=2, default=(0.5, 0.8), help="DET1/DET2 release after burn onset, s")
+    parser.add_argument('--dio-rate', type=float, default=1e5, help="edge capture sample rate in Hz")
+    parser.add_argument('--faults', type=int, default=3, help="fault windows in the faults flow")
+    parser.add_argument('--fault-length', type=float, default=0.3, help="seconds every query times out per window")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="probability of a random query timeout")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.flows:
+        results[name] = globals()[f"flow_{name}"](args)
+        print_result(name, results[name])
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -1,177 +1,244 @@
-import pyvisa
-from pyvisa.errors import VisaIOError
-import dwfpy as dwf
+from adbPsu import PsuSession
+from adbBatch import Batch, CycleFailed, station_checks
+from adbDio import DioDevice, DwfpyBackend
+from adbAcquisition import Acquisition, Display, report_psu_error
+from adbScheduler import AdaptiveRate
+from adbRunIndex import register_run
+from adbStats import StreamStats
+from adbStreamWriter import CsvSink, RunSink, atomic_open
+from adbPyramid import LiveView
+from adbProfile import STARTUP, profiled
+from adbEdgeCapture import DwfRecorder, EdgeCapture, format_latency, load_dwf
+from adbTrigger import All, Level, Trigger, script_trigger, trigger_settings
 import time
-import csv
 from datetime import datetime
 import sys
 
-psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-ad = dwf.Device()
-if ad is None:
-    print("failed to open DWF device")
-    sys.exit(1)
-io = ad.digital_io
-if io is None:
-    print("failed to open DWF digital IO")
-    sys.exit(1)
-io[0].setup(enabled = True, state = False)
-io[1].setup(enabled = False, configure = True)
-io[2].setup(enabled = False, configure = True)
-
 def format_time(seconds: float) -> str:
     minutes = int(seconds) // 60
     secs = seconds - minutes * 60
     return f"{minutes:02d}:{secs:06.3f}"  # MM:SS.mmm
 
-def ask(prompt: str):
-    print("-> " + prompt + " [y/n]")
-    while True:
-        resp = input().strip().lower()
-        if not resp or resp == 'n':
-            print("Verification failed, aborting...\n")
-            psu.write('INST:NSEL 1'); psu.write('OUTP OFF')
-            psu.write('INST:NSEL 2'); psu.write('OUTP OFF')
-            sys.exit(0)
-        else:
-            if resp == 'y':
-                break
-            else:
-                print("Please respond with 'y' or 'n'.")
-
-def read_DIO(pin: int) -> bool:
-    io.read_status()
-    return io[pin].input_state
-
-def burn(burn: bool):
-    io[0].output_state = burn
-
-
 chan1 = 1
 volt7V2 = 7.2
 currLim = 3.0
-errors = 0
+burnCurrThreshold = 0.5 # burn onset, for the timing in the results file
+samplePeriod = 0.05 # 20 Hz while quiescent; bursts near burnCurrThreshold run as fast as VISA allows
 
+BURN = 0
 DET1 = 1
 DET2 = 2
+DETS = {'DET1': DET1, 'DET2': DET2}
+
+def main(argv=None):
+    runner = Batch.from_args('burn_test', argv) # --sequence/--cycles: unattended, see adbBatch
+
+    psu = PsuSession() # address found or cached, timeout from adbConfig
+    import dwfpy as dwf # loaded only when a burn test runs
+    ad = dwf.Device()
+    if ad is None:
+        print("failed to open DWF device")
+        sys.exit(1)
+    if ad.digital_io is None:
+        print("failed to open DWF digital IO")
+        sys.exit(1)
+    # DIO0 = BURN (output, starts low), DIO1/DIO2 = DET1/DET2 (inputs); status reads timed with ADB_PROFILE
+    device = DioDevice(profiled(DwfpyBackend(ad), 'dio'))
+    STARTUP.mark('dwf open')
+
+    def ask(prompt: str):
+        if runner.unattended:
+            runner.ask(prompt) # from the sequence file; CycleFailed instead of 'n'
+            return
+        print("-> " + prompt + " [y/n]")
+        while True:
+            resp = input().strip().lower()
+            if not resp or resp == 'n':
+                print("Verification failed, aborting...\n")
+                psu.write('INST:NSEL 1'); psu.write('OUTP OFF')
+                psu.write('INST:NSEL 2'); psu.write('OUTP OFF')
+                sys.exit(0)
+            else:
+                if resp == 'y':
+                    break
+                else:
+                    print("Please respond with 'y' or 'n'.")
 
-psu.write('*RST') # resets to default state
-psu.write(f'INST:NSEL {chan1}') # select channel 1
-psu.write(f'VOLT {volt7V2}') # set voltage
-psu.write(f'CURR {currLim}') # set current limit
-
-time.sleep(0.2)
-
-print("Starting burn wire consistency test...\n")
-
-print("Ensure the following before proceeding:")
-print("*  GND is connected to EGSE GND.")
-print("*  DIO0 is connected to EGSE BURN.")
-print("*  DIO1 is connected to EGSE DET_1.")
-print("*  DIO2 is connected to EGSE DET_2.")
-print("*  ADB is NOT connected to the EGSE.")
-ask("Connections verified?")
-
-print("Testing BURN functionality...")
-burn(True)
-ask("Verified EGSE BURN is ON?")
-burn(False)
-
-print("*  Set up and tension burn wires.\n")
-
-ask("Verified stability of burn wires?")
-
-print("*  Connect ADB to EGSE.")
-
-ask("ADB connected to EGSE?")
-
-print("Turning on EGSE...")
-
-psu.write(f'INST:NSEL {chan1}')
-psu.write('OUTP ON')
-
-print("*  Set up antennas, and depress SW1 and SW2.")
-ask("Ready to begin burn test?")
-
-burn(True)
-
-print("Burn test started. Monitoring deployment...\n")
-
-t0 = time.time() #start time
-
-testing = True
-
-timeElapsed = 0.0
-pollTime = []
-curr = []
-volt = []
-power = []
-errors = 0
-burnStartIndex = 0
-burnTime = 0.0
-
-psu.write(f'INST:NSEL {chan1}')
-while testing:
-    try:
-        curr_val = float(psu.query('MEAS:CURR?'))
-        volt_val = float(psu.query('MEAS:VOLT?'))
-        pow_val = float(psu.query('MEAS:POWE?'))
-    except VisaIOError:
-        psu.clear()          # clears IO buffers
-        time.sleep(1)
-        errors += 1
-        if errors > 5:
-            psu.close()
-            time.sleep(2)
-            psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-            print("PSU connection reset due to repeated timeouts")
-            psu.timeout = 1000
-            psu.write('*RST') # resets to default state
-            psu.write(f'INST:NSEL {chan1}') # select channel 1
-            psu.write(f'VOLT {volt7V2}') # set voltage
-            psu.write(f'CURR {currLim}') # set current limit
-            psu.write(f'INST:NSEL {chan1}')
-            psu.write('OUTP ON')
-        continue             # retry loop
-    timeElapsed = time.time() - t0
+    def read_DIO(pin: int) -> bool:
+        return device.read(pin, fresh=True)
+
+    def burn(burn: bool):
+        device.set(BURN, burn)
+
+    def read_currents(n: int):
+        psu.write(f'INST:NSEL {chan1}')
+        return [float(psu.query('MEAS:CURR?')) for _ in range(n)]
 
-    print(f"Time: {format_time(timeElapsed)}, Voltage: {volt_val:.3f}V, Current: {curr_val:.6f} A, Power: {pow_val:.6f} W")
+    psu.write('*RST') # resets to default state
+    psu.write(f'INST:NSEL {chan1}') # select channel 1
+    psu.write(f'VOLT {volt7V2}') # set voltage
+    psu.write(f'CURR {currLim}') # set current limit
 
-    if (read_DIO(DET1) and read_DIO(DET2)):
-        print("Both deployments detected. Ending test.")
-        testing = False
+    time.sleep(0.2)
 
-    curr.append(curr_val)
-    volt.append(volt_val)
-    power.append(pow_val)
-    pollTime.append(timeElapsed)
-    if (timeElapsed % 60) < 0.25:
-        err = psu.query('SYST:ERR?')
-        if not err.startswith('0'):
-            print("PSU error:", err)
+    print("Starting burn wire consistency test...\n")
 
+    runner.checks.update(station_checks(read_DIO, read_currents)) # check:burn-on etc. in a sequence file
 
-print("Shutting off power...\n")
-burn(False)
-psu.write('INST:NSEL 1')
-psu.write('OUTP OFF')
+    cycle = 1
+    while cycle <= runner.cycles:
+        runner.start_cycle(cycle)
+        try:
+            runner.step('checks')
+            print("Ensure the following before proceeding:")
+            print("*  GND is connected to EGSE GND.")
+            print("*  DIO0 is connected to EGSE BURN.")
+            print("*  DIO1 is connected to EGSE DET_1.")
+            print("*  DIO2 is connected to EGSE DET_2.")
+            print("*  ADB is NOT connected to the EGSE.")
+            ask("Connections verified?")
 
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20260112_153045
+            print("Testing BURN functionality...")
+            burn(True)
+            ask("Verified EGSE BURN is ON?")
+            burn(False)
 
-with open(f"burn_test_{timestamp}_data.csv", 'w', newline='') as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(['Time (MM:SS.mmm)', 'Current (A)', 'Power (W)'])
-    for t, c, p in zip(pollTime, curr, power):
-        writer.writerow([format_time(t), f"{c:.6f}", f"{p:.6f}"])
+            print("*  Set up and tension burn wires.\n")
 
-print("Data saved to " + f"burn_test_{timestamp}_data.csv")
+            ask("Verified stability of burn wires?")
 
-with open(f"burn_test_{timestamp}.txt", "w") as f:
-    f.write(f"Final Results for test {timestamp}\n")
-    f.write(f"Total time elapsed: {format_time(timeElapsed)}\n")
-    f.write(f"Overall average voltage: {sum(volt)/len(volt):.6f} V\n")
-    f.write(f"Overall average current: {sum(curr)/len(curr):.6f} A\n")
-    f.write(f"Overall average power: {sum(power)/len(power):.6f} W\n")
-    f.write(f"Total energy consumed: {sum(power)*timeElapsed/len(power):.3f} J\n")
+            print("*  Connect ADB to EGSE.")
 
-print("Final results saved to " + f"full_functional_test_{timestamp}.txt")
+            ask("ADB connected to EGSE?")
+
+            runner.step('power on')
+            print("Turning on EGSE...")
+
+            psu.write(f'INST:NSEL {chan1}')
+            psu.write('OUTP ON')
+
+            print("*  Set up antennas, and depress SW1 and SW2.")
+            ask("Ready to begin burn test?")
+        except CycleFailed as e:
+            print(f"Verification failed: {e}\n")
+            burn(False)
+            psu.write('INST:NSEL 1'); psu.write('OUTP OFF')
+            runner.end_cycle(False, str(e))
+        else:
+            runner.step('burn')
+            # hardware-timed BURN/DET edges, recorded from before the burn starts
+            capture = EdgeCapture(DwfRecorder(load_dwf(), device.handle))
+            capture.start()
+
+            burn(True)
+
+            print("Burn test started. Monitoring deployment...\n")
+
+            testing = True
+            failure = None
+
+            timeElapsed = 0.0
+            stats = StreamStats(segment='idle')
+            burnStartIndex = 0
+            burnTime = 0.0
+
+            psu.write(f'INST:NSEL {chan1}')
+            engine = Acquisition(psu, chan1, adaptive=AdaptiveRate.from_config(samplePeriod, burnCurrThreshold))
+            samples = engine.reader()
+            display = Display(engine, lambda s: f"Time: {format_time(s.t)}, Voltage: {s.volt:.3f}V, Current: {s.curr:.6f} A, Power: {s.power:.6f} W, Energy: {stats.overall.energy:.3f} J, Avg power: {stats.overall.power_avg:.4f} W")
+            engine.every(60, 'SYST:ERR?', report_psu_error) # fitted into idle slack
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20260112_153045
+            sink = CsvSink(engine, f"burn_test_{timestamp}_data.csv", ['Time (MM:SS.mmm)', 'Current (A)', 'Power (W)'],
+                           lambda s: [format_time(s.t), f"{s.curr:.6f}", f"{s.power:.6f}"])
+            runSink = RunSink(engine, f"burn_test_{timestamp}_data.adbrun", ['t', 'volt', 'curr', 'power', 'errors'],
+                              lambda s: (s.t, s.volt, s.curr, s.power, engine.errors), header={'test': 'burn_test', 'burnCurrThreshold': burnCurrThreshold, 'volt': volt7V2, **trigger_settings()})
+            view = LiveView(runSink.pyramid) # whole-run overview every ADB_LIVE_VIEW_S seconds, if set
+
+            dio = {'DET1': False, 'DET2': False}
+            burnOnset = script_trigger('burn_test', burnCurrThreshold)
+            deployed = Trigger(All(Level('DET1'), Level('DET2')))
+            burning = False
+
+            engine.start()
+            display.start()
+            sink.start()
+            runSink.start()
+            view.start()
+            while testing:
+                batch = samples.get_all(timeout=0.1)
+                # one DIO status read per batch, off the sampling thread
+                if device.tick().changed & ((1 << DET1) | (1 << DET2)):
+                    engine.burst() # sample the deployment at full rate
+                dio = device.levels(DETS)
+                for s in batch:
+                    stats.feed(s)
+                    timeElapsed = s.t
+                    hit = burnOnset.feed(s)
+                    if hit:
+                        stats.mark('burn', at=hit.index, t=hit.t)
+                        burnStartIndex = hit.index
+                        burnTime = hit.t
+                        burning = True
+                    if deployed.feed(s, dio):
+                        print("Both deployments detected. Ending test.")
+                        testing = False
+                        break
+                if testing:
+                    engine.check() # the acquisition thread died: stop here with its error
+                if testing and runner.runTimeout is not None and timeElapsed > runner.runTimeout:
+                    failure = f"no deployment within {runner.runTimeout:g} s"
+                    print(f"Test aborted: {failure}.")
+                    testing = False
+
+            runner.step('results')
+            engine.stop()
+            display.stop()
+            view.stop()
+            sink.stop()
+            runSink.header.update(burnStartIndex=burnStartIndex if burning else None, burnTime=burnTime if burning else None)
+            runSink.header.update(timing=engine.timing(), rateChanges=engine.rateLog) # (t, period) per rate switch
+            runSink.stop()
+            print(engine.report())
+            print(psu.recovery_report())
+
+            print("Shutting off power...\n")
+            burn(False)
+            capture.stop()
+            psu.write('INST:NSEL 1')
+            psu.write('OUTP OFF')
+
+            print("Data saved to " + f"burn_test_{timestamp}_data.csv")
+
+            stats.finish()
+            summary = stats.summary('burn_test', burnSegment=None) # burn runs count the whole run
+            register_run(runSink.path)
+            overall = summary['overall']
+
+            with atomic_open(f"burn_test_{timestamp}.txt") as f:
+                f.write(f"Final Results for test {timestamp}\n")
+                f.write(f"Total time elapsed: {format_time(timeElapsed)}\n")
+                f.write(f"Overall average voltage: {overall['volt_avg']:.6f} V\n")
+                f.write(f"Overall average current: {overall['curr_avg']:.6f} A\n")
+                f.write(f"Overall average power: {overall['power_avg']:.6f} W\n")
+                f.write(f"Peak current: {overall['curr_peak']:.6f} A\n")
+                f.write(f"Total energy consumed: {overall['energy']:.3f} J\n")
+                if burning:
+                    f.write(f"Burn current onset at: {burnTime:.6f} s\n")
+                for line in format_latency(capture, t0=engine.t0):
+                    f.write(line + "\n")
+                if failure:
+                    f.write(f"Failed: {failure}\n")
+
+            print("Final results saved to " + f"burn_test_{timestamp}.txt")
+            runner.end_cycle(failure is None, failure or '', f"burn_test_{timestamp}.txt")
+
+        cycle += 1
+        if cycle <= runner.cycles:
+            print(f"Power-cycling: output off for {runner.offTime:g} s...\n")
+            time.sleep(runner.offTime)
+
+    runner.write_report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+
+# Station settings shared by the test scripts; the environment overrides them per station.
+PSU_ADDRESS = os.environ.get('ADB_PSU_ADDRESS', 'USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
+# Without ADB_PSU_ADDRESS, PsuSession looks for the PSU: the address cached in PSU_CACHE, then
+# PSU_ADDRESS, each checked with one *IDN? (must name PSU_MODEL); only if neither answers is the
+# bus scanned with list_resources(), and what it finds is cached for the next start
+PSU_ADDRESS_FIXED = 'ADB_PSU_ADDRESS' in os.environ
+PSU_CACHE = os.environ.get('ADB_PSU_CACHE', os.path.join(os.path.expanduser('~'), '.adb_psu.json'))
+PSU_MODEL = 'DP8'
+PSU_IDN_TIMEOUT_MS = 500
+PSU_TIMEOUT_MS = int(os.environ.get('ADB_PSU_TIMEOUT_MS', '1000'))
+# 'visa' (pyvisa, USB-TMC or LAN) or 'socket' (raw SCPI on port 5555, see adbSocket); with
+# socket, set the address to TCPIP0::<ip>::5555::SOCKET or <ip>
+PSU_TRANSPORT = os.environ.get('ADB_PSU_TRANSPORT', 'visa')
+
+# VisaIOError recovery: probe with a short timeout, back off 10 ms, 20 ms, ... up to 200 ms
+RECOVERY_PROBE_TIMEOUT_MS = 50
+RECOVERY_BACKOFF_S = 0.01
+RECOVERY_MAX_BACKOFF_S = 0.2
+RECOVERY_CLEAR_ATTEMPTS = 2   # then reopen the resource
+RECOVERY_MAX_ATTEMPTS = 6
+
+# Current triggers: a crossing must hold for this many samples, and the level has to fall
+# back by this fraction of the threshold before the trigger can fire again
+TRIGGER_DEBOUNCE = int(os.environ.get('ADB_TRIGGER_DEBOUNCE', '2'))
+TRIGGER_HYSTERESIS = float(os.environ.get('ADB_TRIGGER_HYSTERESIS', '0.1'))
+
+# Adaptive sampling: scripts poll at their quiescent period and switch to the burst period
+# (0 = as fast as VISA allows) once current reaches APPROACH x the burn threshold or a DET
+# line changes, for at least HOLD seconds. PRETRIGGER > 0 polls fast throughout and keeps
+# that many seconds of full-rate samples before each event, thinning the rest.
+ADAPTIVE_BURST_PERIOD = float(os.environ.get('ADB_BURST_PERIOD', '0'))
+ADAPTIVE_APPROACH = float(os.environ.get('ADB_ADAPTIVE_APPROACH', '0.5'))
+ADAPTIVE_HOLD_S = float(os.environ.get('ADB_ADAPTIVE_HOLD_S', '2.0'))
+ADAPTIVE_PRETRIGGER_S = float(os.environ.get('ADB_PRETRIGGER_S', '0'))
+
+# Multi-DUT runs (adbMulti): a channel whose queries fail is skipped for 1, 2, 4, ... rounds, up
+# to MAX_SKIP, so its timeouts don't stall the other DUTs; after FAULT_LIMIT failures in a row
+# its DUT is aborted and the others carry on
+MULTI_MAX_SKIP = int(os.environ.get('ADB_MULTI_MAX_SKIP', '32'))
+MULTI_FAULT_LIMIT = int(os.environ.get('ADB_MULTI_FAULT_LIMIT', '8'))
+
+# ADB_PROFILE=1 times every instrument call and loop phase and writes <result>_profile.json
+# at exit (see adbProfile)
+PROFILE = os.environ.get('ADB_PROFILE', '') not in ('', '0')
+
+# Unattended batch runs (adbBatch, --sequence): a wait on a DET line or the current that an
+# operator would have watched fails the cycle after STEP_TIMEOUT_S, an acquisition after
+# RUN_TIMEOUT_S; the output stays off for OFF_S between cycles. DS1 counts as lit while the
+# quiescent current is at least DS1_ON_CURRENT amps.
+BATCH_STEP_TIMEOUT_S = float(os.environ.get('ADB_BATCH_STEP_TIMEOUT_S', '120'))
+BATCH_RUN_TIMEOUT_S = float(os.environ.get('ADB_BATCH_RUN_TIMEOUT_S', '3600'))
+BATCH_OFF_S = float(os.environ.get('ADB_BATCH_OFF_S', '3.0'))
+DS1_ON_CURRENT = float(os.environ.get('ADB_DS1_ON_CURRENT', '0.003'))
+
+# Timer iterations (adbTimer): after OUTP OFF the next iteration starts once the rail voltage at
+# the output terminals (held up by the DUT's capacitance; the current reads 0 A as soon as the
+# output is off) has stayed below RESET_VOLT_V for RESET_HOLD_MS, after RESET_TIMEOUT_S at the latest
+TIMER_RESET_VOLT_V = float(os.environ.get('ADB_RESET_VOLT_V', '0.5'))
+TIMER_RESET_HOLD_MS = float(os.environ.get('ADB_RESET_HOLD_MS', '500'))
+TIMER_RESET_TIMEOUT_S = float(os.environ.get('ADB_RESET_TIMEOUT_S', '10'))
+
+# Decimation pyramid beside each .adbrun (adbPyramid): level k keeps min/max/mean over FACTOR**k
+# samples; writers keep the last LIVE_ROWS bins of each level in memory for the live view, which
+# prints an overview PIXELS wide every LIVE_VIEW_S seconds (0 = off)
+PYRAMID_FACTOR = int(os.environ.get('ADB_PYRAMID_FACTOR', '10'))
+PYRAMID_LIVE_ROWS = 20000
+PYRAMID_PIXELS = int(os.environ.get('ADB_PYRAMID_PIXELS', '80'))
+LIVE_VIEW_S = float(os.environ.get('ADB_LIVE_VIEW_S', '0'))
@@ -0,0 +1,227 @@
+"""One digital-IO layer for the Analog Discovery, whichever library drives it.
+
+    device = DioDevice(CtypesBackend(dwf, hdwf))      # WaveForms SDK through ctypes
+    device = DioDevice(DwfpyBackend(dwfpy.Device()))  # dwfpy
+    device = DioDevice(SimulatedBackend(board))       # adbSim.SimulatedBoard, no hardware
+
+tick() reads every pin in one status transaction and returns a Snapshot
+(t, state, changed): the bitmask of all pins and the bitmask of the pins
+that changed since the previous tick. read() and levels() answer from the
+latest snapshot, so a loop that ticks once and then looks at DET1 and DET2
+pays for one USB transaction, not one per pin. tick(maxAge) hands back a
+snapshot that is recent enough instead of reading again, for several
+threads sharing the device. Every change is kept in changes.
+
+wait_for(pin, level, timeout) blocks until the pin reads level. While the
+watcher runs (start()/stop()) it ticks every poll seconds and waiters sleep
+on a condition until it sees a change; otherwise wait_for ticks at the poll
+interval itself. It returns when the level was first seen and raises
+TimeoutError if timeout passes first.
+
+Neither dwfpy nor a WaveForms handle may be used from two threads at once,
+so every device access holds the device's lock.
+"""
+import threading
+import time
+from collections import namedtuple
+from ctypes import byref, c_int, c_uint32
+from typing import Callable, Dict, List, Optional
+
+# state: all pins as a bitmask; changed: the pins that differ from the previous snapshot
+Snapshot = namedtuple('Snapshot', ['t', 'state', 'changed'])
+
+BURN_PIN = 0
+DET1_PIN = 1
+DET2_PIN = 2
+# the scripts' wiring: DIO0 drives EGSE BURN, DIO1/DIO2 read DET_1/DET_2
+OUTPUTS = 1 << BURN_PIN
+INPUTS = (1 << DET1_PIN) | (1 << DET2_PIN)
+
+def _pins(mask: int) -> List[int]:
+    return [pin for pin in range(32) if mask & (1 << pin)]
+
+class CtypesBackend:
+    """The WaveForms SDK through ctypes (cdll.dwf, or adbSim.SimulatedDwf) on an open handle."""
+    def __init__(self, dwf, hdwf):
+        self.dwf = dwf
+        self.hdwf = hdwf if isinstance(hdwf, c_int) else c_int(int(hdwf))
+
+    @property
+    def handle(self) -> c_int:
+        return self.hdwf
+
+    def configure(self, outputs: int, inputs: int):
+        self.dwf.FDwfDigitalIOOutputEnableSet(self.hdwf, c_int(outputs))
+        self.dwf.FDwfDigitalIOInputEnableSet(self.hdwf, c_int(inputs))
+
+    def status(self) -> int:
+        dwRead = c_uint32() # io states returned as 32 bitmask
+        self.dwf.FDwfDigitalIOStatus(self.hdwf)
+        self.dwf.FDwfDigitalIOInputStatus(self.hdwf, byref(dwRead))
+        return dwRead.value
+
+    def set_outputs(self, mask: int, changed: int):
+        self.dwf.FDwfDigitalIOOutputSet(self.hdwf, c_int(mask))
+
+class DwfpyBackend:
+    """dwfpy's Device.digital_io (or adbSim.SimulatedDevice)."""
+    def __init__(self, device):
+        self.device = device
+        self.io = device.digital_io
+        self._inputs: List[int] = list(range(16))
+
+    @property
+    def handle(self):
+        return self.device.handle
+
+    def configure(self, outputs: int, inputs: int):
+        for pin in _pins(outputs):
+            self.io[pin].setup(enabled = True, state = False)
+        for pin in _pins(inputs):
+            self.io[pin].setup(enabled = False, configure = True)
+        self._inputs = _pins(outputs | inputs)
+
+    def status(self) -> int:
+        self.io.read_status() # the one USB transaction; input_state reads the cached status
+        state = 0
+        for pin in self._inputs:
+            if self.io[pin].input_state:
+                state |= 1 << pin
+        return state
+
+    def set_outputs(self, mask: int, changed: int):
+        for pin in _pins(changed):
+            self.io[pin].output_state = bool(mask & (1 << pin))
+
+class SimulatedBackend:
+    """A SimulatedBoard's pins, costing latency seconds per status read like a USB transaction."""
+    handle = None
+
+    def __init__(self, board, latency: float = 0.001):
+        self.board = board
+        self.latency = latency
+
+    def configure(self, outputs: int, inputs: int):
+        pass
+
+    def status(self) -> int:
+        time.sleep(self.latency)
+        return self.board.dio()
+
+    def set_outputs(self, mask: int, changed: int):
+        if changed & OUTPUTS:
+            self.board.set_burn(bool(mask & OUTPUTS))
+
+class DioDevice:
+    """Digital IO with one status snapshot per tick, change tracking and blocking waits.
+
+    outputs and inputs are pin bitmasks; outputs start low.
+    """
+    def __init__(self, backend, outputs: int = OUTPUTS, inputs: int = INPUTS, poll: float = 0.01,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.backend = backend
+        self.poll = poll
+        self.clock = clock
+        self.snapshot: Optional[Snapshot] = None
+        self.changes: List[Snapshot] = []
+        self.reads = 0 # status transactions
+        self.outputs = 0
+        self._cond = threading.Condition(threading.RLock())
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        with self._cond:
+            backend.configure(outputs, inputs)
+            backend.set_outputs(0, outputs)
+
+    @property
+    def handle(self):
+        """The backend's device handle, for DwfRecorder."""
+        return self.backend.handle
+
+    def tick(self, maxAge: float = 0.0) -> Snapshot:
+        """Read all pins at once; with maxAge, reuse a snapshot taken at most that many seconds ago."""
+        with self._cond:
+            if maxAge > 0 and self.snapshot is not None and self.clock() - self.snapshot.t <= maxAge:
+                return self.snapshot
+            before = self.clock()
+            state = self.backend.status()
+            t = (before + self.clock()) / 2
+            self.reads += 1
+            prev = self.snapshot
+            snap = Snapshot(t, state, 0 if prev is None else state ^ prev.state)
+            self.snapshot = snap
+            if snap.changed:
+                self.changes.append(snap)
+                self._cond.notify_all()
+            return snap
+
+    def read(self, pin: int, fresh: bool = False) -> bool:
+        """Level of pin in the latest snapshot (a new one if fresh or there is none yet)."""
+        snap = self.tick() if fresh or self.snapshot is None else self.snapshot
+        return bool(snap.state & (1 << pin))
+
+    def levels(self, pins: Dict[str, int]) -> Dict[str, bool]:
+        """Named levels from the latest snapshot: {'DET1': 1} -> {'DET1': True}."""
+        snap = self.snapshot or self.tick()
+        return {name: bool(snap.state & (1 << pin)) for name, pin in pins.items()}
+
+    def set_outputs(self, mask: int):
+        with self._cond:
+            changed = mask ^ self.outputs
+            self.backend.set_outputs(mask, changed)
+            self.outputs = mask
+
+    def set(self, pin: int, level: bool):
+        with self._cond:
+            bit = 1 << pin
+            self.set_outputs(self.outputs | bit if level else self.outputs & ~bit)
+
+    def wait_for(self, pin: int, level: bool, timeout: Optional[float] = None) -> float:
+        """Block until pin reads level (at once if it already does); return when that was first seen."""
+        deadline = None if timeout is None else self.clock() + timeout
+        bit = 1 << pin
+        want = bit if level else 0
+        with self._cond:
+            snap = self.snapshot if self.watching and self.snapshot is not None else self.tick()
+            if snap.state & bit == want:
+                return snap.t
+            while True:
+                left = None if deadline is None else deadline - self.clock()
+                if left is not None and left <= 0:
+                    raise TimeoutError(f"DIO{pin} not {'high' if level else 'low'} within {timeout:g} s")
+                seen = len(self.changes)
+                if self.watching:
+                    self._cond.wait(left)
+                else:
+                    self._cond.release()
+                    try:
+                        time.sleep(self.poll if left is None else min(self.poll, left))
+                    finally:
+                        self._cond.acquire()
+                    self.tick()
+                # the first of the changes since, in case the pin went on to change again
+                for snap in self.changes[seen:]:
+                    if snap.state & bit == want:
+                        return snap.t
+
+    @property
+    def watching(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Tick every poll seconds on a thread, waking waiters on every change."""
+        if self.watching:
+            return
+        self._done.clear()
+        self._thread = threading.Thread(target=self._watch, name="dio-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._done.set()
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._done.wait(self.poll):
+            self.tick()
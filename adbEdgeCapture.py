@@ -0,0 +1,232 @@
+import sys
+import threading
+import time
+from collections import namedtuple
+from ctypes import byref, c_double, c_int, c_ubyte, c_uint, cdll, create_string_buffer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from adbProfile import profiled
+
+# t is on the capture clock (time.perf_counter by default, same as the PSU samples)
+Edge = namedtuple('Edge', ['t', 'name', 'level'])
+
+DEFAULT_PINS = {'BURN': 0, 'DET1': 1, 'DET2': 2}
+
+# WaveForms SDK constants
+acqmodeRecord = c_int(3)
+trigsrcNone = c_ubyte(0)
+DwfStateConfig = 4
+DwfStatePrefill = 5
+DwfStateArmed = 1
+
+def load_dwf():
+    """Load the Digilent WaveForms SDK the same way adbFullFunctional.py does."""
+    if sys.platform.startswith("win"):
+        dwf = cdll.dwf
+    elif sys.platform.startswith("darwin"):
+        dwf = cdll.LoadLibrary("/Library/Frameworks/dwf.framework/dwf")
+    else:
+        dwf = cdll.LoadLibrary("libdwf.so")
+    return profiled(dwf, 'dwf') # timed with ADB_PROFILE
+
+class DwfRecorder:
+    """Digital-in recorder backend on a WaveForms device handle.
+
+    Works with a raw ctypes handle or dwfpy's Device.handle. Records DIO0-7 as
+    one byte per sample, free-running from configure() (no hardware trigger),
+    so every edge after arming is kept, including the pre-burn levels.
+    """
+    def __init__(self, dwf, hdwf):
+        self.dwf = dwf
+        self.hdwf = hdwf if isinstance(hdwf, c_int) else c_int(int(hdwf))
+        self._buf = create_string_buffer(0)
+
+    def configure(self, rate: float) -> float:
+        """Arm the recorder and return the actual sample rate in Hz."""
+        hz = c_double()
+        self.dwf.FDwfDigitalInReset(self.hdwf)
+        self.dwf.FDwfDigitalInInternalClockInfo(self.hdwf, byref(hz))
+        divider = max(1, int(hz.value / rate))
+        self.dwf.FDwfDigitalInDividerSet(self.hdwf, c_int(divider))
+        self.dwf.FDwfDigitalInSampleFormatSet(self.hdwf, c_int(8))
+        self.dwf.FDwfDigitalInAcquisitionModeSet(self.hdwf, acqmodeRecord)
+        self.dwf.FDwfDigitalInTriggerSourceSet(self.hdwf, trigsrcNone)
+        self.dwf.FDwfDigitalInTriggerPositionSet(self.hdwf, c_uint(0)) # 0 = record until stopped
+        self.dwf.FDwfDigitalInConfigure(self.hdwf, c_int(0), c_int(1))
+        return hz.value / divider
+
+    def read(self) -> Tuple[bytes, int]:
+        """Return (new samples, samples lost since the last read)."""
+        sts = c_ubyte()
+        available, lost, corrupted = c_int(), c_int(), c_int()
+        self.dwf.FDwfDigitalInStatus(self.hdwf, c_int(1), byref(sts))
+        if sts.value in (DwfStateConfig, DwfStatePrefill, DwfStateArmed):
+            return b'', 0
+        self.dwf.FDwfDigitalInStatusRecord(self.hdwf, byref(available), byref(lost), byref(corrupted))
+        n = available.value
+        if n == 0:
+            return b'', lost.value
+        if len(self._buf) < n:
+            self._buf = create_string_buffer(n)
+        self.dwf.FDwfDigitalInStatusData(self.hdwf, self._buf, c_int(n))
+        return self._buf.raw[:n], lost.value + corrupted.value
+
+    def stop(self):
+        self.dwf.FDwfDigitalInConfigure(self.hdwf, c_int(0), c_int(0))
+
+class SimulatedRecorder:
+    """Stand-in for DwfRecorder that plays back scripted edges.
+
+    script is a list of (seconds after arming, pin, level); initial is the
+    DIO bitmask before the first edge. Samples are produced at the configured
+    rate as real time passes, so the capture thread sees the same data flow.
+    """
+    def __init__(self, script: Sequence[Tuple[float, int, bool]] = (), initial: int = 0,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.script = sorted(script)
+        self.initial = initial
+        self.clock = clock
+        self.rate = 0.0
+        self._armed = 0.0
+        self._sent = 0
+
+    def configure(self, rate: float) -> float:
+        self.rate = rate
+        self._armed = self.clock()
+        self._sent = 0
+        return rate
+
+    def _state_at(self, index: int) -> int:
+        state = self.initial
+        for t, pin, level in self.script:
+            if int(t * self.rate) > index:
+                break
+            state = state | (1 << pin) if level else state & ~(1 << pin)
+        return state
+
+    def read(self) -> Tuple[bytes, int]:
+        end = int((self.clock() - self._armed) * self.rate)
+        start = self._sent
+        if end <= start:
+            return b'', 0
+        # cut the span at every scripted edge and fill each run in one go
+        cuts = [int(t * self.rate) for t, _, _ in self.script if start < t * self.rate < end]
+        out = bytearray()
+        pos = start
+        for cut in cuts + [end]:
+            out += bytes([self._state_at(pos)]) * (cut - pos)
+            pos = cut
+        self._sent = end
+        return bytes(out), 0
+
+    def stop(self):
+        pass
+
+class EdgeCapture:
+    """Hardware-timed edge capture of BURN/DET1/DET2 from a recorder backend.
+
+    A thread drains the recorder every poll seconds and keeps only the edges,
+    timestamped as arm time + sample index / rate, i.e. to 1 us at the default
+    1 MHz. Lost samples still advance the index so later edges stay on time.
+    """
+    def __init__(self, recorder, pins: Optional[Dict[str, int]] = None, rate: float = 1e6,
+                 poll: float = 0.01, clock: Callable[[], float] = time.perf_counter):
+        self.recorder = recorder
+        self.pins = dict(pins or DEFAULT_PINS)
+        self.rate = rate
+        self.poll = poll
+        self.clock = clock
+        self.edges: List[Edge] = []
+        self.initial: Dict[str, bool] = {}
+        self.lost = 0
+        self.armTime = 0.0
+        self._mask = 0
+        for pin in self.pins.values():
+            self._mask |= 1 << pin
+        self._table = bytes(b & self._mask for b in range(256))
+        self._state = None
+        self._index = 0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dio-edge-capture", daemon=True)
+
+    def start(self):
+        self.rate = self.recorder.configure(self.rate)
+        self.armTime = self.clock()
+        self._thread.start()
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+        self.recorder.stop()
+
+    def level(self, name: str) -> Optional[bool]:
+        """Latest recorded level of a pin, or None before the first sample."""
+        if self._state is None:
+            return None
+        return bool(self._state & (1 << self.pins[name]))
+
+    def first_edge(self, name: str, level: bool, after: float = float('-inf')) -> Optional[float]:
+        """Time of the first edge of name to level at or after the given time."""
+        for e in list(self.edges):
+            if e.name == name and e.level == level and e.t >= after:
+                return e.t
+        return None
+
+    def latency(self, start: Optional[float] = None, level: bool = True) -> Dict[str, Optional[float]]:
+        """Seconds from start (default: BURN rising) to each DET line reaching level."""
+        if start is None:
+            start = self.first_edge('BURN', True)
+        if start is None:
+            return {}
+        out = {}
+        for name in self.pins:
+            if name.startswith('DET'):
+                t = self.first_edge(name, level, start)
+                out[name] = None if t is None else t - start
+        return out
+
+    def _scan(self, data: bytes):
+        data = data.translate(self._table)
+        if self._state is None and data:
+            self._state = data[0]
+            self.initial = {name: bool(self._state & (1 << pin)) for name, pin in self.pins.items()}
+        offset = 0
+        while data:
+            rest = data.lstrip(bytes([self._state]))
+            offset += len(data) - len(rest)
+            if not rest:
+                break
+            new = rest[0]
+            t = self.armTime + (self._index + offset) / self.rate
+            for name, pin in self.pins.items():
+                bit = 1 << pin
+                if (new ^ self._state) & bit:
+                    self.edges.append(Edge(t, name, bool(new & bit)))
+            self._state = new
+            data = rest
+        self._index += offset
+
+    def _run(self):
+        while True:
+            stopping = self._done.wait(self.poll)
+            data, lost = self.recorder.read()
+            self.lost += lost
+            self._index += lost
+            self._scan(data)
+            if stopping:
+                return
+
+def format_latency(capture: EdgeCapture, start: Optional[float] = None, t0: float = 0.0) -> List[str]:
+    """Summary lines for the result .txt; times are shown relative to t0."""
+    lines = []
+    burnOn = capture.first_edge('BURN', True)
+    if burnOn is not None:
+        lines.append(f"BURN on at: {burnOn - t0:.6f} s")
+    for name, lat in capture.latency(start).items():
+        if lat is None:
+            lines.append(f"{name} deployment: not detected")
+        else:
+            lines.append(f"{name} deployed at: {(start if start is not None else burnOn) + lat - t0:.6f} s, "
+                         f"burn-to-deploy latency: {lat:.6f} s")
+    if capture.lost:
+        lines.append(f"DIO samples lost: {capture.lost}")
+    return lines
@@ -1,317 +1,357 @@
-import pyvisa
-from pyvisa.errors import VisaIOError
+from adbPsu import PsuSession
+from adbAcquisition import Acquisition, Display, report_psu_error
+from adbAsync import AsyncStation
+from adbBatch import Batch, CycleFailed, station_checks
+from adbDio import CtypesBackend, DioDevice
+from adbProfile import STARTUP, profiled
+from adbScheduler import AdaptiveRate
+from adbRunIndex import register_run
+from adbStats import SegmentStats, StreamStats
+from adbStreamWriter import CsvSink, RunSink, atomic_open
+from adbPyramid import LiveView
+from adbEdgeCapture import DwfRecorder, EdgeCapture, format_latency
+from adbTrigger import All, Any, Level, Trigger, current_trigger, script_trigger, trigger_settings
+import asyncio
 import time
-import csv
 from datetime import datetime
 import sys
 from ctypes import *
 
-# Load Digilent WaveForms SDK
-if sys.platform.startswith("win"):
-    dwf = cdll.dwf
-elif sys.platform.startswith("darwin"):
-    dwf = cdll.LoadLibrary("/Library/Frameworks/dwf.framework/dwf")
-else:
-    dwf = cdll.LoadLibrary("libdwf.so")
-
-hdwf = c_int()
-
-if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
-    print("failed to open DWF device")
-    sys.exit(1)
-
-psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-
-#chat changes-----
-# DIO configuration
-# DIO0 = BURN (output)
-# DIO1 = DET1 (input)
-# DIO2 = DET2 (input)
-
-dwf.FDwfDigitalIOOutputEnableSet(hdwf, c_int(0b00000001))  # DIO0 output
-dwf.FDwfDigitalIOOutputSet(hdwf, c_int(0))                # BURN LOW
-
-dwf.FDwfDigitalIOInputEnableSet(hdwf, c_int(0b00000110))  # DIO1, DIO2 inputs
-#------
-
 def format_time(seconds: float) -> str:
     minutes = int(seconds) // 60
     secs = seconds - minutes * 60
     return f"{minutes:02d}:{secs:06.3f}"  # MM:SS.mmm
 
-def ask(prompt: str):
-    print("-> " + prompt + " [y/n]")
-    while True:
-        resp = input().strip().lower()
-        if not resp or resp == 'n':
-            print("Verification failed, aborting...\n")
-            psu.write('INST:NSEL 1'); psu.write('OUTP OFF')
-            psu.write('INST:NSEL 2'); psu.write('OUTP OFF')
-            sys.exit(0)
-        else:
-            break
-
-def read_DIO(pin: int) -> bool:
-    dwRead = c_uint32() #io states returned as 32 bitmask
-    dwf.FDwfDigitalIOStatus(hdwf) #sub for io.read_status
-    dwf.FDwfDigitalIOInputStatus(hdwf, byref(dwRead)) #writes pin logic levels to dwRead
-    return bool(dwRead.value & (1 << pin)) #extracts the pin we want
-
-def burn(state: bool):
-    dwf.FDwfDigitalIOOutputSet(
-        hdwf, 
-        c_int(1 if state else 0)
-    )
-
-
 chan1 = 1
 volt7V2 = 7.2
 rbfCurrThreshold = 0.004
 burnCurrThreshold = 0.5
 currLim = 3.0
-errors = 0
+samplePeriod = 0.25 # quiescent polling interval (sets the timer resolution); bursts near burnCurrThreshold run as fast as VISA allows
 
 DET1 = 1
 DET2 = 2
+DETS = {'DET1': DET1, 'DET2': DET2}
+
+def main(argv=None):
+    runner = Batch.from_args('full_functional_test', argv) # --sequence/--cycles: unattended, see adbBatch
+
+    # Load Digilent WaveForms SDK
+    if sys.platform.startswith("win"):
+        dwf = cdll.dwf
+    elif sys.platform.startswith("darwin"):
+        dwf = cdll.LoadLibrary("/Library/Frameworks/dwf.framework/dwf")
+    else:
+        dwf = cdll.LoadLibrary("libdwf.so")
+    dwf = profiled(dwf, 'dwf') # every FDwf* call timed with ADB_PROFILE
+
+    hdwf = c_int()
+
+    if dwf.FDwfDeviceOpen(c_int(-1), byref(hdwf)) == 0:
+        print("failed to open DWF device")
+        sys.exit(1)
+
+    psu = PsuSession() # address found or cached, timeout from adbConfig
+
+    # DIO configuration
+    # DIO0 = BURN (output, starts LOW)
+    # DIO1 = DET1 (input)
+    # DIO2 = DET2 (input)
+    device = DioDevice(CtypesBackend(dwf, hdwf), outputs=0b00000001, inputs=0b00000110)
+    STARTUP.mark('dwf open')
+
+    def ask(prompt: str):
+        if runner.unattended:
+            runner.ask(prompt) # from the sequence file; CycleFailed instead of 'n'
+            return
+        print("-> " + prompt + " [y/n]")
+        while True:
+            resp = input().strip().lower()
+            if not resp or resp == 'n':
+                print("Verification failed, aborting...\n")
+                psu.write('INST:NSEL 1'); psu.write('OUTP OFF')
+                psu.write('INST:NSEL 2'); psu.write('OUTP OFF')
+                sys.exit(0)
+            else:
+                break
+
+    psu.write('*RST') # resets to default state
+    psu.write(f'INST:NSEL {chan1}') # select channel 1
+    psu.write(f'VOLT {volt7V2}') # set voltage
+    psu.write(f'CURR {currLim}') # set current limit
+
+    time.sleep(0.2)
+
+    print("Starting full functional test...\n")
+
+    async def set_burn(state: bool):
+        await station.dio.set_outputs(1 if state else 0)
+
+    async def ask_async(prompt: str):
+        if runner.unattended:
+            await runner.ask_async(prompt) # checks go through the station's workers
+        else:
+            await station.run(ask, prompt) # input() on a worker thread; the DIO watcher keeps running
+
+    async def wait_dio(pin: int, level: bool):
+        """DIO wait; unattended, an operator step that never happens fails the cycle."""
+        try:
+            await station.dio.wait_for(pin, level, timeout=runner.timeout)
+        except asyncio.TimeoutError:
+            raise CycleFailed(f"DET{pin} not {'high' if level else 'low'} within {runner.timeout:g} s")
+
+    async def wait_current(threshold: float, what: str):
+        try:
+            await station.psu.wait_for(Trigger(current_trigger(threshold)), timeout=runner.timeout)
+        except asyncio.TimeoutError:
+            raise CycleFailed(f"no {what} within {runner.timeout:g} s")
+
+    async def read_pin(pin: int) -> bool:
+        return await station.dio.read(pin)
+
+    async def read_currents(n: int):
+        return [(await station.psu.measure()).curr for _ in range(n)]
+
+    runner.checks.update(station_checks(read_pin, read_currents)) # check:ds1-on etc. in a sequence file
+
+    async def preflight():
+        """Operator checks up to RBF removal; DIO and current are awaited, not polled in sleep loops."""
+        runner.step('connections')
+        print("Ensure the following before proceeding:")
+        print("*  GND is connected to EGSE GND.")
+        print("*  DIO0 is connected to EGSE BURN.")
+        print("*  DIO1 is connected to EGSE DET_1.")
+        print("*  DIO2 is connected to EGSE DET_2.")
+        print("*  ADB is NOT connected to the EGSE.")
+        await ask_async("Connections verified?")
+
+        print("Testing BURN signal connection...")
+        await set_burn(True)
+        await ask_async("Verified EGSE BURN is ON?")
+        await set_burn(False)
+
+        print("*  Set up and tension burn wires.\n")
+
+        await ask_async("Verified stability of burn wires?")
+
+        print("*  Connect ADB to EGSE.")
+
+        await ask_async("ADB connected to EGSE?")
+
+        runner.step('power on')
+        print("Turning on EGSE...")
+
+        await station.psu.write(f'INST:NSEL {chan1}')
+        await station.psu.write('OUTP ON')
+
+        await ask_async("Verified DS1 is ON and EGSE BURN is OFF?")
+
+        runner.step('switches')
+        print("*  Depress SW1.")
+        print("Waiting for DET1 to go low...")
+        await wait_dio(DET1, False)
+        print("DET1 went low.")
+        await ask_async("Verified DS2 is ON and EGSE DET1 is OFF?")
+
+        print("*  Release SW1.")
+        print("Waiting for DET1 to go high...")
+        await wait_dio(DET1, True)
+        print("DET1 went high.")
+
+        print("*  Depress SW2.")
+        print("Waiting for DET2 to go low...")
+        await wait_dio(DET2, False)
+        await ask_async("Verified DS2 is ON and EGSE DET2 is OFF?")
+
+        print("*  Release SW2.")
+        print("Waiting for DET2 to release...")
+        await wait_dio(DET2, True)
+        print("DET2 released.")
+
+        print("*  Depress both SW1 and SW2.")
+        await ask_async("Ready to test burn signal functionality?")
+        runner.step('burn signal')
+        print("Testing BURN signal functionality...")
+        await set_burn(True)
+        await wait_current(burnCurrThreshold, 'burn current')
+        await set_burn(False)
+        print("Burn signal functionality verified.\n")
+        print("*  Release SW1 and SW2.")
+
+        runner.step('rbf')
+        print("*  Connect RBF to J2")
+        await ask_async("Verified DS1 is OFF?")
+
+        print("*  Set up antennas, and depress SW1 and SW2.")
+        await ask_async("Ready to remove RBF?")
+
+        print("*  Remove RBF from J2")
+        print("Waiting for current spike indicating RBF removal...")
+        await wait_current(rbfCurrThreshold, 'RBF removal current spike')
+
+    async def run_preflight():
+        async with station: # DIO watcher and SYST:ERR? housekeeping run alongside
+            await preflight()
+
+    cycle = 1
+    while cycle <= runner.cycles:
+        runner.start_cycle(cycle)
+        # PSU, DIO and input() each on their own worker thread for the operator sequence;
+        # a fresh station per cycle, as each asyncio.run() has its own loop
+        station = AsyncStation(psu, device, chan1)
+        failure = None
+        try:
+            asyncio.run(run_preflight())
+        except CycleFailed as e:
+            failure = str(e)
+        finally:
+            station.close()
+
+        if failure is not None:
+            print(f"Verification failed: {failure}\n")
+            device.set_outputs(0) # BURN LOW
+            psu.write('INST:NSEL 1'); psu.write('OUTP OFF')
+            runner.end_cycle(False, failure)
+        else:
+            runner.step('timer')
+            print("RBF removal current spike detected. Starting timer...\n")
+
+            testing = True
+
+            timeElapsed = 0.0
+            stats = StreamStats(segment='timer')
+            burning = False
+            burnStartIndex = 0
+            burnTime = 0.0
+
+            # hardware-timed DET edges for the burn-to-deploy latency
+            capture = EdgeCapture(DwfRecorder(dwf, device.handle))
+            capture.start()
 
-psu.write('*RST') # resets to default state
-psu.write(f'INST:NSEL {chan1}') # select channel 1
-psu.write(f'VOLT {volt7V2}') # set voltage
-psu.write(f'CURR {currLim}') # set current limit
-
-time.sleep(0.2)
-
-print("Starting full functional test...\n")
-
-print("Ensure the following before proceeding:")
-print("*  GND is connected to EGSE GND.")
-print("*  DIO0 is connected to EGSE BURN.")
-print("*  DIO1 is connected to EGSE DET_1.")
-print("*  DIO2 is connected to EGSE DET_2.")
-print("*  ADB is NOT connected to the EGSE.")
-ask("Connections verified?")
-
-print("Testing BURN signal connection...")
-burn(True)
-ask("Verified EGSE BURN is ON?")
-burn(False)
-
-print("*  Set up and tension burn wires.\n")
-
-ask("Verified stability of burn wires?")
-
-print("*  Connect ADB to EGSE.")
-
-ask("ADB connected to EGSE?")
-
-print("Turning on EGSE...")
-
-psu.write(f'INST:NSEL {chan1}')
-psu.write('OUTP ON')
-
-ask("Verified DS1 is ON and EGSE BURN is OFF?")
-
-print("*  Depress SW1.")
-print("Waiting for DET1 to go low...")
-while read_DIO(DET1):
-    time.sleep(0.1)
-print("DET1 went low.")
-ask("Verified DS2 is ON and EGSE DET1 is OFF?")
-
-print("*  Release SW1.")
-print("Waiting for DET1 to go high...")
-while not read_DIO(DET1):
-    time.sleep(0.1)
-print("DET1 went high.")
-
-print("*  Depress SW2.")
-print("Waiting for DET2 to go low...")
-while read_DIO(DET2):
-    time.sleep(0.1)
-ask("Verified DS2 is ON and EGSE DET2 is OFF?")
-
-print("*  Release SW2.")
-print("Waiting for DET2 to release...")
-while not read_DIO(DET2):
-    time.sleep(0.1)
-print("DET2 released.")
-
-print("*  Depress both SW1 and SW2.")
-ask("Ready to test burn signal functionality?")
-print("Testing BURN signal functionality...")
-burn(True)
-while True:
-    try:
-        curr_val = float(psu.query('MEAS:CURR?'))
-    except VisaIOError: # this was chatgpt'd 
-        psu.clear()          # clears IO buffers
-        time.sleep(1)
-        errors += 1
-        if errors > 5:
-            psu.close()
-            time.sleep(2)
-            psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-            print("PSU connection reset due to repeated timeouts")
-            psu.timeout = 1000
-            psu.write('*RST') # resets to default state
-            psu.write(f'INST:NSEL {chan1}') # select channel 1
-            psu.write(f'VOLT {volt7V2}') # set voltage
-            psu.write(f'CURR {currLim}') # set current limit
-            psu.write(f'INST:NSEL {chan1}')
-            psu.write('OUTP ON')
-        continue             # retry loop
-    if curr_val >= burnCurrThreshold:
-        break
-burn(False)
-print("Burn signal functionality verified.\n")
-print("*  Release SW1 and SW2.")
-
-print("*  Connect RBF to J2")
-ask("Verified DS1 is OFF?")
-
-print("*  Set up antennas, and depress SW1 and SW2.")
-ask("Ready to remove RBF?")
-
-print("*  Remove RBF from J2")
-print("Waiting for current spike indicating RBF removal...")
-
-while True:
-    try:
-        curr_val = float(psu.query('MEAS:CURR?'))
-    except VisaIOError: # this was chatgpt'd 
-        psu.clear()          # clears IO buffers
-        time.sleep(1)
-        errors += 1
-        if errors > 5:
-            psu.close()
-            time.sleep(2)
-            psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-            print("PSU connection reset due to repeated timeouts")
-            psu.timeout = 1000
-            psu.write('*RST') # resets to default state
-            psu.write(f'INST:NSEL {chan1}') # select channel 1
-            psu.write(f'VOLT {volt7V2}') # set voltage
-            psu.write(f'CURR {currLim}') # set current limit
-            psu.write(f'INST:NSEL {chan1}')
-            psu.write('OUTP ON')
-        continue             # retry loop
-    if curr_val >= rbfCurrThreshold:
-        break
-
-print("RBF removal current spike detected. Starting timer...\n")
-
-t0 = time.time() #start time
-
-testing = True
-
-timeElapsed = 0.0
-pollTime = []
-curr = []
-volt = []
-power = []
-errors = 0
-burning = False
-burnStartIndex = 0
-burnTime = 0.0
-
-psu.write(f'INST:NSEL {chan1}')
-while testing:
-    try:
-        curr_val = float(psu.query('MEAS:CURR?'))
-        volt_val = float(psu.query('MEAS:VOLT?'))
-        pow_val = float(psu.query('MEAS:POWE?'))
-    except VisaIOError:
-        psu.clear()          # clears IO buffers
-        time.sleep(1)
-        errors += 1
-        if errors > 5:
-            psu.close()
-            time.sleep(2)
-            psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-            print("PSU connection reset due to repeated timeouts")
-            psu.timeout = 1000
-            psu.write('*RST') # resets to default state
-            psu.write(f'INST:NSEL {chan1}') # select channel 1
-            psu.write(f'VOLT {volt7V2}') # set voltage
-            psu.write(f'CURR {currLim}') # set current limit
             psu.write(f'INST:NSEL {chan1}')
-            psu.write('OUTP ON')
-        continue             # retry loop
-    timeElapsed = time.time() - t0
-
-    print(f"Time: {format_time(timeElapsed)}, Voltage: {volt_val:.4f}V, Current: {curr_val:.4f} A, Power: {pow_val:.4f} W")
-
-    if curr_val >= burnCurrThreshold and not burning:
-        print("Timer triggered at time:", format_time(timeElapsed))
-        burnStartIndex = len(curr)
-        burnTime = timeElapsed
-        burning = True
-
-    if not burning and (read_DIO(DET1) or read_DIO(DET2)):
-        print("Test aborted due to early deployment detection.")
-        testing = False
-        break
-
-    if burning and (read_DIO(DET1) and read_DIO(DET2)):
-        print("Both deployments detected. Ending test.")
-        testing = False
-        break
-
-    curr.append(curr_val)
-    volt.append(volt_val)
-    power.append(pow_val)
-    pollTime.append(timeElapsed)
-    time.sleep(0.25)
-    if (timeElapsed % 60) < 0.25:
-        err = psu.query('SYST:ERR?')
-        if not err.startswith('0'):
-            print("PSU error:", err)
-
-
-print("Shutting off power...\n")
-psu.write('INST:NSEL 1')
-psu.write('OUTP OFF')
-
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20260112_153045
-
-with open(f"full_functional_test_{timestamp}_data.csv", 'w', newline='') as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(['Time (MM:SS.mmm)', 'Voltage (V)', 'Current (A)', 'Power (W)'])
-    for t, v, c, p in zip(pollTime, volt, curr, power):
-        writer.writerow([format_time(t), f"{v:.4f}", f"{c:.4f}", f"{p:.4f}"])
-
-print("Data saved to " + f"full_functional_test_{timestamp}_data.csv")
-
-timer_segment_duration = burnTime
-burn_segment_duration = timeElapsed - burnTime
-
-def safe_avg(data):
-    return sum(data) / len(data) if data else 0
-
-timer_avg_power = safe_avg(power[:burnStartIndex])
-burn_avg_power = safe_avg(power[burnStartIndex:])
-
-with open(f"full_functional_test_{timestamp}.txt", "w") as f:
-    f.write(f"Final Results for test {timestamp}\n")
-    f.write("Timer segment:\n")
-    f.write(f"Time elapsed: {format_time(timer_segment_duration)}\n")
-    f.write(f"Average voltage: {safe_avg(volt[:burnStartIndex]):.5f} V\n")
-    f.write(f"Average current: {safe_avg(curr[:burnStartIndex]):.6f} A\n")
-    f.write(f"Average power: {timer_avg_power:.6f} W\n")
-    f.write(f"Energy consumed: {timer_avg_power * timer_segment_duration:.3f} J\n")
-    f.write("\n")
-    f.write("Burn segment:\n")
-    f.write(f"Time elapsed: {format_time(burn_segment_duration)}\n")
-    f.write(f"Average voltage: {safe_avg(volt[burnStartIndex:]):.5f} V\n")
-    f.write(f"Average current: {safe_avg(curr[burnStartIndex:]):.6f} A\n")
-    f.write(f"Average power: {burn_avg_power:.6f} W\n")
-    f.write(f"Energy consumed: {burn_avg_power * burn_segment_duration:.3f} J\n")
-    f.write("\n")
-    f.write("Overall Results:\n")
-    f.write(f"Total time elapsed: {format_time(timeElapsed)}\n")
-    f.write(f"Overall average voltage: {safe_avg(volt):.5f} V\n")
-    f.write(f"Overall average current: {safe_avg(curr):.6f} A\n")
-    f.write(f"Overall average power: {safe_avg(power):.6f} W\n")
-    f.write(f"Total energy consumed: {safe_avg(power) * timeElapsed:.3f} J\n")
-
-print("Final results saved to " + f"full_functional_test_{timestamp}.txt")
+            engine = Acquisition(psu, chan1, adaptive=AdaptiveRate.from_config(samplePeriod, burnCurrThreshold))
+            samples = engine.reader()
+            display = Display(engine, lambda s: f"Time: {format_time(s.t)}, Voltage: {s.volt:.4f}V, Current: {s.curr:.4f} A, Power: {s.power:.4f} W, Energy: {stats.overall.energy:.3f} J, Avg power: {stats.overall.power_avg:.4f} W")
+            engine.every(60, 'SYST:ERR?', report_psu_error) # fitted into idle slack
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20260112_153045
+            sink = CsvSink(engine, f"full_functional_test_{timestamp}_data.csv", ['Time (MM:SS.mmm)', 'Voltage (V)', 'Current (A)', 'Power (W)'],
+                           lambda s: [format_time(s.t), f"{s.volt:.4f}", f"{s.curr:.4f}", f"{s.power:.4f}"])
+            runSink = RunSink(engine, f"full_functional_test_{timestamp}_data.adbrun", ['t', 'volt', 'curr', 'power', 'errors'],
+                              lambda s: (s.t, s.volt, s.curr, s.power, engine.errors), header={'test': 'full_functional_test', 'rbfCurrThreshold': rbfCurrThreshold, 'burnCurrThreshold': burnCurrThreshold, 'volt': volt7V2, **trigger_settings()})
+            view = LiveView(runSink.pyramid) # whole-run overview every ADB_LIVE_VIEW_S seconds, if set
+
+            # burn onset only counts while both antennas are still stowed
+            dio = {'DET1': False, 'DET2': False}
+            burnOnset = script_trigger('full_functional_test', burnCurrThreshold)
+            earlyDeployment = Trigger(Any(Level('DET1'), Level('DET2')))
+            deployed = Trigger(All(Level('DET1'), Level('DET2')))
+
+            engine.start()
+            display.start()
+            sink.start()
+            runSink.start()
+            view.start()
+            while testing:
+                batch = samples.get_all(timeout=0.25)
+                # one DIO status read per batch, off the sampling thread
+                if device.tick().changed & ((1 << DET1) | (1 << DET2)):
+                    engine.burst() # sample the deployment at full rate
+                dio = device.levels(DETS)
+                for s in batch:
+                    timeElapsed = s.t
+                    stats.feed(s)
+
+                    if not burning:
+                        hit = burnOnset.feed(s, dio)
+                        if hit:
+                            print("Timer triggered at time:", format_time(hit.t))
+                            burnStartIndex = hit.index
+                            burnTime = hit.t
+                            burning = True
+                            stats.mark('burn', at=hit.index, t=hit.t)
+                        elif earlyDeployment.feed(s, dio):
+                            print("Test aborted due to early deployment detection.")
+                            failure = "early deployment"
+                            testing = False
+                            break
+                    elif deployed.feed(s, dio):
+                        print("Both deployments detected. Ending test.")
+                        testing = False
+                        break
+                if testing:
+                    engine.check() # the acquisition thread died: stop here with its error
+                if testing and runner.runTimeout is not None and timeElapsed > runner.runTimeout:
+                    failure = f"no deployment within {runner.runTimeout:g} s"
+                    print(f"Test aborted: {failure}.")
+                    testing = False
+
+            runner.step('results')
+            engine.stop()
+            display.stop()
+            view.stop()
+            runSink.header.update(burnStartIndex=burnStartIndex if burning else None, burnTime=burnTime if burning else None)
+            sink.stop()
+            runSink.header.update(timing=engine.timing(), rateChanges=engine.rateLog) # (t, period) per rate switch
+            runSink.stop()
+            print(engine.report())
+            print(psu.recovery_report())
+
+            print("Shutting off power...\n")
+            capture.stop()
+            psu.write('INST:NSEL 1')
+            psu.write('OUTP OFF')
+
+            print("Data saved to " + f"full_functional_test_{timestamp}_data.csv")
+
+            timer_segment_duration = burnTime
+            burn_segment_duration = timeElapsed - burnTime
+
+            stats.finish()
+            summary = stats.summary('full_functional_test', triggerTime=burnTime if burning else None)
+            register_run(runSink.path)
+            overall = summary['overall']
+            timerSeg = stats.segment('timer')
+            burnSeg = stats.segment('burn') if burning else SegmentStats().stats() # no burn: empty segment
+
+            with atomic_open(f"full_functional_test_{timestamp}.txt") as f:
+                f.write(f"Final Results for test {timestamp}\n")
+                f.write("Timer segment:\n")
+                f.write(f"Time elapsed: {format_time(timer_segment_duration)}\n")
+                f.write(f"Average voltage: {timerSeg['volt_avg']:.5f} V\n")
+                f.write(f"Average current: {timerSeg['curr_avg']:.6f} A\n")
+                f.write(f"Average power: {timerSeg['power_avg']:.6f} W\n")
+                f.write(f"Energy consumed: {timerSeg['energy']:.3f} J\n")
+                f.write("\n")
+                f.write("Burn segment:\n")
+                f.write(f"Time elapsed: {format_time(burn_segment_duration)}\n")
+                f.write(f"Average voltage: {burnSeg['volt_avg']:.5f} V\n")
+                f.write(f"Average current: {burnSeg['curr_avg']:.6f} A\n")
+                f.write(f"Average power: {burnSeg['power_avg']:.6f} W\n")
+                f.write(f"Energy consumed: {burnSeg['energy']:.3f} J\n")
+                f.write(f"Peak current: {burnSeg['curr_peak']:.6f} A\n")
+                if burning:
+                    for line in format_latency(capture, start=engine.t0 + burnTime, t0=engine.t0):
+                        f.write(line + "\n")
+                f.write("\n")
+                f.write("Overall Results:\n")
+                f.write(f"Total time elapsed: {format_time(timeElapsed)}\n")
+                f.write(f"Overall average voltage: {overall['volt_avg']:.5f} V\n")
+                f.write(f"Overall average current: {overall['curr_avg']:.6f} A\n")
+                f.write(f"Overall average power: {overall['power_avg']:.6f} W\n")
+                f.write(f"Total energy consumed: {overall['energy']:.3f} J\n")
+                if failure:
+                    f.write(f"Failed: {failure}\n")
+
+            print("Final results saved to " + f"full_functional_test_{timestamp}.txt")
+            runner.end_cycle(failure is None, failure or '', f"full_functional_test_{timestamp}.txt")
+
+        cycle += 1
+        if cycle <= runner.cycles:
+            print(f"Power-cycling: output off for {runner.offTime:g} s...\n")
+            time.sleep(runner.offTime)
+
+    runner.write_report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,545 @@
+"""Timer or burn tests on up to three ADBs at once, one per DP832 channel.
+
+All DUTs share one PsuSession. MultiAcquisition's thread reads the channels
+round-robin with MEAS:ALL? CH<n> on one drift-free schedule, so no query
+needs an INST:NSEL first, and hands each sample to that channel's
+ChannelTap. A tap is used like an Acquisition (reader(), start(), stop(),
+timing()), so every DUT gets its own Display, CsvSink, RunSink, summary and
+result .txt, named after the channel, e.g.
+
+    timer_test_ch2_1_20260112_153045_data.adbrun, final_results_ch2_20260112_153045.txt
+
+Faults stay with their DUT: a channel whose queries fail is skipped for a
+growing number of rounds and dropped after cfg.MULTI_FAULT_LIMIT failures in
+a row, and each DUT runs on its own thread, so an exception aborts that
+board only (its output is switched off) while the others carry on.
+
+    python adbMulti.py timer --channels 1 2 3 --iterations 2
+    python adbMulti.py burn --channels 1 2 --pins 0,1,2 3,4,5
+"""
+import argparse
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from adbAcquisition import Acquisition, Display, Sample, SampleQueue, report_psu_error
+from adbDio import DioDevice, DwfpyBackend
+from adbProfile import STARTUP, phases, profiled
+from adbPsu import PsuSession, measure_all, visa_error, wait_discharged
+from adbRunIndex import register_run
+from adbStats import StreamStats
+from adbStreamWriter import CsvSink, RunSink, atomic_open
+from adbTrigger import All, Level, Trigger, script_trigger, trigger_settings
+import adbConfig as cfg
+
+CHANNELS = (1, 2, 3)
+
+volt7V2 = 7.2
+currLim = 3.0
+currThreshold = 0.5      # timer end
+burnCurrThreshold = 0.5  # burn onset
+SHARED_SNAPSHOT_S = 0.01 # DUT threads reading the DIO within this share one status read
+
+def format_time(seconds: float) -> str:
+    minutes = int(seconds) // 60
+    secs = seconds - minutes * 60
+    return f"{minutes:02d}:{secs:06.3f}"  # MM:SS.mmm
+
+class ChannelFault(Exception):
+    """The DUT's channel kept failing and was dropped from the round."""
+
+class _ChannelState:
+    def __init__(self):
+        self.tap: Optional["ChannelTap"] = None
+        self.failures = 0   # in a row
+        self.skip = 0       # rounds still to sit out
+        self.skipped = 0
+        self.errors = 0
+        self.failed = False
+
+class ChannelTap:
+    """One DUT's samples from a MultiAcquisition, used like an Acquisition.
+
+    Sample times count from start(), the DUT's own t0, so its files look like
+    a single-DUT run. Only one tap per channel can be running at a time.
+    """
+    def __init__(self, engine: "MultiAcquisition", chan: int):
+        self.engine = engine
+        self.chan = chan
+        self.readers: List[SampleQueue] = []
+        self.samples = 0
+        self.errors = 0
+        self.t0 = 0.0
+
+    def reader(self) -> SampleQueue:
+        q = SampleQueue(self.engine.maxQueue)
+        self.readers.append(q)
+        return q
+
+    def start(self):
+        self.t0 = self.engine.scheduler.clock()
+        self.engine._attach(self)
+
+    def stop(self):
+        self.engine._detach(self)
+
+    def burst(self):
+        pass # the round-robin runs at one rate
+
+    @property
+    def failed(self) -> bool:
+        return self.engine.state[self.chan].failed
+
+    @property
+    def running(self) -> bool:
+        return self.engine.running and not self.failed
+
+    @property
+    def dropped(self) -> int:
+        return sum(q.dropped for q in self.readers)
+
+    def query(self, cmd: str) -> str:
+        return self.engine.query(cmd)
+
+    def write(self, cmd: str):
+        self.engine.write(cmd)
+
+    def timing(self) -> Dict[str, float]:
+        """The shared schedule's statistics plus this channel's counts."""
+        stats = self.engine.scheduler.stats()
+        stats.update(samples=self.samples, dropped=self.dropped, psuErrors=self.errors, channel=self.chan,
+                     channels=len(self.engine.channels), skippedRounds=self.engine.state[self.chan].skipped)
+        return stats
+
+    def report(self) -> str:
+        return (f"CH{self.chan} samples: {self.samples}, dropped: {self.dropped}, PSU errors: {self.errors}, "
+                f"skipped rounds: {self.engine.state[self.chan].skipped}")
+
+    def _put(self, mid: float, volt: float, curr: float, power: float):
+        sample = Sample(mid - self.t0, volt, curr, power)
+        for q in self.readers:
+            q.put(sample)
+        if not self.samples:
+            STARTUP.mark('first sample')
+        self.samples += 1
+
+class MultiAcquisition(Acquisition):
+    """Samples several channels of one PSU round-robin on a single thread.
+
+    Every period each channel with a running tap is read once with
+    MEAS:ALL? CH<n>, each sample timed at the middle of its own query.
+    every(), query() and write() are shared by all DUTs and serialized with
+    sampling as in Acquisition. A VisaIOError recovers the session and puts
+    that channel on probation: it sits out 1, 2, 4, ... rounds (up to
+    cfg.MULTI_MAX_SKIP) and is dropped after cfg.MULTI_FAULT_LIMIT failures
+    in a row, so a board that keeps timing out doesn't stall the others.
+    """
+    def __init__(self, psu, channels: Sequence[int], period: float = 0.25,
+                 recover: Optional[Callable] = None, maxQueue: int = 8192):
+        channels = list(dict.fromkeys(channels))
+        if not channels or any(chan not in CHANNELS for chan in channels):
+            raise ValueError(f"channels must be among {CHANNELS}: {channels}")
+        super().__init__(psu, channels[0], period, recover, maxQueue)
+        self.channels = channels
+        self.state = {chan: _ChannelState() for chan in channels}
+        self._thread.name = "psu-multi-acquisition"
+
+    def tap(self, chan: int) -> ChannelTap:
+        if chan not in self.state:
+            raise ValueError(f"CH{chan} is not sampled by this engine")
+        return ChannelTap(self, chan)
+
+    def _attach(self, tap: ChannelTap):
+        st = self.state[tap.chan]
+        if st.tap is not None and st.tap is not tap:
+            raise RuntimeError(f"CH{tap.chan} already has a running tap")
+        st.tap = tap
+
+    def _detach(self, tap: ChannelTap):
+        st = self.state[tap.chan]
+        if st.tap is tap:
+            st.tap = None
+
+    def report(self) -> str:
+        lines = [super().report()]
+        for chan in self.channels:
+            st = self.state[chan]
+            lines.append(f"  CH{chan}: PSU errors: {st.errors}, skipped rounds: {st.skipped}"
+                         + (", dropped after repeated failures" if st.failed else ""))
+        return "\n".join(lines)
+
+    def _fault(self, chan: int, st: _ChannelState, tap: ChannelTap):
+        self._recover()
+        st.errors += 1
+        st.failures += 1
+        tap.errors += 1
+        if st.failures >= cfg.MULTI_FAULT_LIMIT:
+            st.failed = True
+            print(f"CH{chan}: {st.failures} failed queries in a row, dropping the channel")
+        else:
+            st.skip = min(2 ** (st.failures - 1), cfg.MULTI_MAX_SKIP)
+
+    def _sample(self, chan: int, clock):
+        st = self.state[chan]
+        tap = st.tap
+        if tap is None or st.failed:
+            return  # no DUT running: leave the bus to the others
+        if st.skip:
+            st.skip -= 1
+            st.skipped += 1
+            return
+        before = clock()
+        try:
+            with self.lock:
+                reading = measure_all(self.psu, chan)
+        except visa_error():
+            self._fault(chan, st, tap)
+            return
+        after = clock()
+        st.failures = 0
+        self.samples += 1
+        tap._put((before + after) / 2, *reading)
+
+    def _loop(self, clock):
+        phase = phases('loop.') # timed with ADB_PROFILE
+        while True:
+            self.scheduler.wait(self._wake)
+            phase.mark('wait')
+            if self._stop.is_set():
+                return
+            self.scheduler.tick(clock())
+            phase.lap()
+            for chan in self.channels:
+                self._sample(chan, clock)
+            phase.mark('measure')
+            if self.housekeeping:
+                self._housekeep()
+                phase.mark('housekeep')
+
+class DioBank:
+    """The Analog Discovery's digital IO, shared by the DUTs of a burn run.
+
+    Each channel has its own (BURN, DET1, DET2) pin triple on one DioDevice
+    over backend. The DUT threads share status snapshots: dets() only reads
+    the pins again once the last snapshot is older than SHARED_SNAPSHOT_S.
+    """
+    def __init__(self, backend, pins: Dict[int, Tuple[int, int, int]]):
+        self.pins = pins
+        outputs = inputs = 0
+        for burnPin, det1, det2 in pins.values():
+            outputs |= 1 << burnPin
+            inputs |= (1 << det1) | (1 << det2)
+        self.device = DioDevice(backend, outputs, inputs)
+
+    def burn(self, chan: int, on: bool):
+        self.device.set(self.pins[chan][0], on)
+
+    def dets(self, chan: int) -> Dict[str, bool]:
+        _, det1, det2 = self.pins[chan]
+        self.device.tick(SHARED_SNAPSHOT_S)
+        return self.device.levels({'DET1': det1, 'DET2': det2})
+
+class _Recording:
+    """Tap, statistics, console and data files of one DUT run.
+
+    Used as a context manager; on the way out the files are finalized, also
+    when the run is aborted (the .adbrun header then says why).
+    """
+    def __init__(self, engine: MultiAcquisition, chan: int, stem: str, segment: str,
+                 csvHeader: Sequence[str], csvRow: Callable[[Sample, ChannelTap], List], header: Dict):
+        self.chan = chan
+        self.tap = tap = engine.tap(chan)
+        self.samples = tap.reader()
+        self.stats = StreamStats(segment=segment)
+        self.display = Display(tap, lambda s: f"CH{chan} Time: {format_time(s.t)}, Voltage: {s.volt:.3f}V, Current: {s.curr:.6f} A, Power: {s.power:.6f} W, Errors: {tap.errors}, Energy: {self.stats.overall.energy:.3f} J")
+        self.sink = CsvSink(tap, f"{stem}_data.csv", csvHeader, lambda s: csvRow(s, tap))
+        self.runSink = RunSink(tap, f"{stem}_data.adbrun", ['t', 'volt', 'curr', 'power', 'errors'],
+                               lambda s: (s.t, s.volt, s.curr, s.power, tap.errors), header=dict(header, channel=chan))
+
+    @property
+    def header(self) -> Dict:
+        return self.runSink.header
+
+    def __enter__(self) -> "_Recording":
+        self.tap.start() # t0 is taken here
+        self.display.start()
+        self.sink.start()
+        self.runSink.start()
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        self.tap.stop()
+        self.display.stop()
+        self.sink.stop()
+        if exc is not None:
+            self.header['aborted'] = f"{excType.__name__}: {exc}"
+        self.header['timing'] = self.tap.timing()
+        self.runSink.stop()
+        self.stats.finish()
+        print(self.tap.report())
+
+    def batch(self, timeout: float) -> List[Sample]:
+        if self.tap.failed:
+            raise ChannelFault(f"CH{self.chan} stopped answering")
+        self.tap.engine.check()
+        return self.samples.get_all(timeout=timeout)
+
+    def feed(self, s: Sample):
+        self.stats.feed(s)
+
+    def mark(self, name: str, at: int, t: Optional[float] = None):
+        self.stats.mark(name, at=at, t=t)
+
+    def summary(self, test: str, **kwargs) -> Dict:
+        summary = self.stats.summary(test, **kwargs)
+        register_run(self.runSink.path)
+        return summary
+
+class DutRun(threading.Thread):
+    """One DUT's test on its own thread; an exception ends this DUT only."""
+    def __init__(self, engine: MultiAcquisition, chan: int, timestamp: str):
+        super().__init__(name=f"dut-ch{chan}", daemon=True)
+        self.engine = engine
+        self.chan = chan
+        self.timestamp = timestamp
+        self.error: Optional[str] = None
+
+    def run_test(self):
+        raise NotImplementedError
+
+    def power(self, on: bool):
+        self.engine.write(f"OUTP CH{self.chan},{'ON' if on else 'OFF'}")
+
+    def run(self):
+        try:
+            self.run_test()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"CH{self.chan}: aborted, {self.error}")
+        finally:
+            try:
+                self.power(False)
+            except visa_error():
+                print(f"CH{self.chan}: could not switch the output off")
+
+class TimerDut(DutRun):
+    """adbTimer's iterations on one channel."""
+    def __init__(self, engine: MultiAcquisition, chan: int, timestamp: str, iterations: int = 2):
+        super().__init__(engine, chan, timestamp)
+        self.iterations = iterations
+        self.results: List[Tuple[float, Dict]] = [] # (time elapsed, timer segment stats) per iteration
+
+    def run_test(self):
+        for iteration in range(1, self.iterations + 1):
+            self.power(True)
+            stem = f"timer_test_ch{self.chan}_{iteration}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            rec = _Recording(self.engine, self.chan, stem, 'timer',
+                             ['Time (MM:SS.mmm)', 'Current (A)', 'Power (W)', 'Voltage (V)', 'Errors/Interrupts Total'],
+                             lambda s, tap: [format_time(s.t), f"{s.curr:.6f}", f"{s.power:.6f}", f"{s.volt:.6f}", tap.errors],
+                             {'test': 'timer_test', 'iteration': iteration, 'currThreshold': currThreshold, 'volt': volt7V2, **trigger_settings()})
+            trigger = script_trigger('timer_test', currThreshold)
+            hit = None
+            with rec:
+                while hit is None:
+                    for s in rec.batch(timeout=1.0):
+                        rec.feed(s)
+                        hit = trigger.feed(s)
+                        if hit:
+                            rec.mark('burn', at=hit.index, t=hit.t)
+                            break
+                rec.header.update(triggerIndex=hit.index, triggerTime=hit.t)
+            print(f"CH{self.chan}: test #{iteration} complete; current spike after {format_time(hit.t)}")
+            self.power(False)
+            # through the engine's lock, between the other channels' reads
+            waited, discharged = wait_discharged(self.engine, self.chan)
+            if discharged:
+                print(f"CH{self.chan}: output discharged after {waited * 1000:.0f} ms")
+            summary = rec.summary('timer_test', triggerTime=hit.t)
+            self.results.append((hit.t, summary['timer']))
+        self.write_results(f"final_results_ch{self.chan}_{self.timestamp}.txt")
+
+    def write_results(self, path: str):
+        n = len(self.results)
+        times = [t for t, _ in self.results]
+        segs = [seg for _, seg in self.results]
+        with atomic_open(path) as f:
+            f.write(f"Final Results (channel {self.chan}):\n")
+            f.write(f"average time: {format_time(sum(times) / n)}\n")
+            f.write(f"average voltage: {sum(seg['volt_avg'] for seg in segs) / n:.6f} V\n")
+            f.write(f"average current: {sum(seg['curr_avg'] for seg in segs) / n:.6f} A\n")
+            f.write(f"average power: {sum(seg['power_avg'] for seg in segs) / n:.6f} W\n")
+            f.write(f"average energy: {sum(seg['energy'] for seg in segs) / n:.6f} J\n\n")
+            f.write("Individual Iteration Results:\n")
+            for i, (t, seg) in enumerate(self.results):
+                f.write(f"Iteration {i+1}: Time = {format_time(t)}, ")
+                f.write(f"Average voltage = {seg['volt_avg']:.6f} V, ")
+                f.write(f"Average current = {seg['curr_avg']:.6f} A, ")
+                f.write(f"Average power = {seg['power_avg']:.6f} W, ")
+                f.write(f"Total energy = {seg['energy']:.6f} J\n")
+        print(f"CH{self.chan}: final results saved to {path}")
+
+class BurnDut(DutRun):
+    """adbBurnToDeploy's monitoring on one channel; the output is already on."""
+    def __init__(self, engine: MultiAcquisition, chan: int, timestamp: str, dio: DioBank):
+        super().__init__(engine, chan, timestamp)
+        self.dio = dio
+
+    def run_test(self):
+        stem = f"burn_test_ch{self.chan}_{self.timestamp}"
+        rec = _Recording(self.engine, self.chan, stem, 'idle', ['Time (MM:SS.mmm)', 'Current (A)', 'Power (W)'],
+                         lambda s, tap: [format_time(s.t), f"{s.curr:.6f}", f"{s.power:.6f}"],
+                         {'test': 'burn_test', 'burnCurrThreshold': burnCurrThreshold, 'volt': volt7V2, **trigger_settings()})
+        burnOnset = script_trigger('burn_test', burnCurrThreshold)
+        deployed = Trigger(All(Level('DET1'), Level('DET2')))
+        burnStart: Optional[Tuple[int, float]] = None
+        timeElapsed = 0.0
+        self.dio.burn(self.chan, True)
+        try:
+            with rec:
+                testing = True
+                while testing:
+                    batch = rec.batch(timeout=0.1)
+                    dio = self.dio.dets(self.chan) # once per batch
+                    for s in batch:
+                        rec.feed(s)
+                        timeElapsed = s.t
+                        hit = burnOnset.feed(s)
+                        if hit:
+                            rec.mark('burn', at=hit.index, t=hit.t)
+                            burnStart = (hit.index, hit.t)
+                        if deployed.feed(s, dio):
+                            print(f"CH{self.chan}: both deployments detected.")
+                            testing = False
+                            break
+                rec.header.update(burnStartIndex=burnStart[0] if burnStart else None,
+                                  burnTime=burnStart[1] if burnStart else None)
+        finally:
+            self.dio.burn(self.chan, False)
+        overall = rec.summary('burn_test', burnSegment=None)['overall']
+        path = f"{stem}.txt"
+        with atomic_open(path) as f:
+            f.write(f"Final Results for test {self.timestamp}, channel {self.chan}\n")
+            f.write(f"Total time elapsed: {format_time(timeElapsed)}\n")
+            f.write(f"Overall average voltage: {overall['volt_avg']:.6f} V\n")
+            f.write(f"Overall average current: {overall['curr_avg']:.6f} A\n")
+            f.write(f"Overall average power: {overall['power_avg']:.6f} W\n")
+            f.write(f"Peak current: {overall['curr_peak']:.6f} A\n")
+            f.write(f"Total energy consumed: {overall['energy']:.3f} J\n")
+            if burnStart:
+                f.write(f"Burn current onset at: {burnStart[1]:.6f} s\n")
+        print(f"CH{self.chan}: final results saved to {path}")
+
+def configure(psu, channels: Sequence[int]):
+    psu.write('*RST') # resets to default state
+    for chan in channels:
+        psu.write(f'INST:NSEL {chan}')
+        psu.write(f'VOLT {volt7V2}')
+        psu.write(f'CURR {currLim}')
+    time.sleep(0.2)
+
+def run_duts(engine: MultiAcquisition, duts: List[DutRun]) -> List[DutRun]:
+    """Start the engine and every DUT, wait for all of them; return the failed ones."""
+    engine.every(60, 'SYST:ERR?', report_psu_error) # fitted into idle slack
+    engine.start()
+    for dut in duts:
+        dut.start()
+    for dut in duts:
+        dut.join()
+    engine.stop()
+    print(engine.report())
+    print(engine.psu.recovery_report())
+    failed = [dut for dut in duts if dut.error]
+    for dut in duts:
+        print(f"CH{dut.chan}: " + (f"FAILED ({dut.error})" if dut.error else "done"))
+    return failed
+
+def parse_pins(specs: Sequence[str], channels: Sequence[int]) -> Dict[int, Tuple[int, int, int]]:
+    """['0,1,2', '3,4,5'] -> {chan: (BURN, DET1, DET2)} in channel order; default 3 pins per channel."""
+    if not specs:
+        return {chan: (3 * i, 3 * i + 1, 3 * i + 2) for i, chan in enumerate(channels)}
+    if len(specs) != len(channels):
+        raise ValueError(f"need one BURN,DET1,DET2 triple per channel ({len(channels)})")
+    pins = {}
+    for chan, spec in zip(channels, specs):
+        triple = tuple(int(p) for p in spec.split(','))
+        if len(triple) != 3:
+            raise ValueError(f"expected BURN,DET1,DET2: {spec!r}")
+        pins[chan] = triple
+    return pins
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run timer or burn tests on several ADBs, one per DP832 channel.")
+    parser.add_argument('test', choices=('timer', 'burn'))
+    parser.add_argument('--channels', type=int, nargs='+', default=list(CHANNELS), choices=CHANNELS)
+    parser.add_argument('--iterations', type=int, default=2, help="timer iterations per DUT")
+    parser.add_argument('--period', type=float, help="round-robin period in s (default 0.25 timer, 0.05 burn)")
+    parser.add_argument('--pins', nargs='+', default=[], metavar='BURN,DET1,DET2',
+                        help="DIO pins per channel for burn tests (default 0,1,2 3,4,5 6,7,8)")
+    args = parser.parse_args(argv)
+    channels = list(dict.fromkeys(args.channels))
+    try:
+        pins = parse_pins(args.pins, channels)
+    except ValueError as e:
+        parser.error(str(e))
+
+    psu = PsuSession() # address and timeout come from adbConfig
+    configure(psu, channels)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20260112_153045
+
+    if args.test == 'timer':
+        engine = MultiAcquisition(psu, channels, period=args.period if args.period is not None else 0.25)
+        print(f"Starting timer test on channels {', '.join(map(str, channels))}...\n")
+        duts = [TimerDut(engine, chan, timestamp, args.iterations) for chan in channels]
+    else:
+        import dwfpy as dwf
+
+        def ask(prompt: str):
+            print("-> " + prompt + " [y/n]")
+            while True:
+                resp = input().strip().lower()
+                if not resp or resp == 'n':
+                    print("Verification failed, aborting...\n")
+                    for chan in CHANNELS:
+                        psu.write(f'OUTP CH{chan},OFF')
+                    sys.exit(0)
+                if resp == 'y':
+                    break
+                print("Please respond with 'y' or 'n'.")
+
+        ad = dwf.Device()
+        if ad is None or ad.digital_io is None:
+            print("failed to open DWF digital IO")
+            sys.exit(1)
+        dio = DioBank(profiled(DwfpyBackend(ad), 'dio'), pins)
+        engine = MultiAcquisition(psu, channels, period=args.period if args.period is not None else 0.05)
+
+        print("Starting burn wire consistency test...\n")
+        print("Ensure the following before proceeding:")
+        print("*  GND is connected to EGSE GND on every EGSE.")
+        for chan, (burnPin, det1, det2) in pins.items():
+            print(f"*  CH{chan}: DIO{burnPin} to EGSE BURN, DIO{det1} to DET_1, DIO{det2} to DET_2.")
+        print("*  ADBs are NOT connected to the EGSEs.")
+        ask("Connections verified?")
+        print("Testing BURN functionality...")
+        for chan in channels:
+            dio.burn(chan, True)
+            ask(f"Verified EGSE BURN is ON for CH{chan}?")
+            dio.burn(chan, False)
+        print("*  Set up and tension burn wires.\n")
+        ask("Verified stability of burn wires?")
+        print("*  Connect ADBs to their EGSEs.")
+        ask("ADBs connected to EGSEs?")
+        print("Turning on EGSEs...")
+        for chan in channels:
+            psu.write(f'OUTP CH{chan},ON')
+        print("*  Set up antennas, and depress SW1 and SW2 on every ADB.")
+        ask("Ready to begin burn test?")
+        print("Burn test started. Monitoring deployment...\n")
+        duts = [BurnDut(engine, chan, timestamp, dio) for chan in channels]
+
+    failed = run_duts(engine, duts)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
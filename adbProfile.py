@@ -0,0 +1,230 @@
+"""Opt-in latency profile of instrument calls and acquisition loop phases.
+
+Set ADB_PROFILE=1 and run any of the scripts unchanged. VISA calls through
+PsuSession (query, write, clear, ...), WaveForms calls (FDwfDigitalIOStatus,
+dwfpy's io.read_status, ...), the acquisition loop phases, console prints
+and file writes are timed with perf_counter_ns into log-binned histograms,
+and exceptions are counted per call and type. At exit the profile goes to
+<result>_profile.json next to the last result .txt the run wrote (or
+adb_profile_<timestamp>.json), with count, total, mean, p50, p99 and max
+per call type, the sample loop period distribution and the time spent in
+PSU recovery.
+
+With ADB_PROFILE unset PROFILER is None and profiled()/timed() hand back
+the object or function itself, so nothing is added to the call path.
+
+STARTUP is on regardless: a handful of milestones (imports, PSU open, DWF
+open) from the adb CLI's entry, or this module's import, to the first sample
+any acquisition publishes. The CLI prints it at exit and the profile keeps
+it under 'startup'.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from time import perf_counter_ns
+from typing import Callable, Dict, Optional
+import adbConfig as cfg
+
+PERCENTILES = (50, 90, 99)
+
+class Profiler:
+    """Per-name latency histograms and per-name, per-type error counts; thread-safe."""
+    def __init__(self):
+        from adbStats import LogHistogram # only with ADB_PROFILE set: adbStats pulls in numpy
+        self._histogram = LogHistogram
+        self.started = time.time()
+        self.hist: Dict[str, LogHistogram] = {}
+        self.total: Dict[str, int] = {}  # ns
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.resultPath: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, name: str, ns: int):
+        with self._lock:
+            hist = self.hist.get(name)
+            if hist is None:
+                # 100 ns .. 100 s, ~2.3 % bins
+                hist = self.hist[name] = self._histogram(lo=1e-7, hi=100.0, binsPerDecade=100)
+                self.total[name] = 0
+            hist.add(ns * 1e-9)
+            self.total[name] += ns
+
+    def record_s(self, name: str, seconds: float):
+        self.record(name, int(seconds * 1e9))
+
+    def error(self, name: str, exc: BaseException):
+        kind = type(exc).__name__
+        code = getattr(exc, 'abbreviation', None) # VisaIOError: VI_ERROR_TMO, ...
+        if code:
+            kind = f"{kind}({code})"
+        with self._lock:
+            counts = self.errors.setdefault(name, {})
+            counts[kind] = counts.get(kind, 0) + 1
+
+    def timed(self, name: str, fn: Callable) -> Callable:
+        def call(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                self.error(name, e)
+                raise
+            finally:
+                self.record(name, perf_counter_ns() - start)
+        return call
+
+    def stats(self, name: str) -> Dict[str, float]:
+        hist = self.hist[name]
+        out = {'count': hist.count, 'total': self.total[name] * 1e-9,
+               'mean': self.total[name] * 1e-9 / hist.count if hist.count else 0.0}
+        for q in PERCENTILES:
+            out[f'p{q}'] = hist.percentile(q)
+        out['max'] = hist.max
+        return out
+
+    def report(self) -> Dict:
+        with self._lock:
+            calls = {name: self.stats(name) for name in sorted(self.hist)}
+            errors = {name: dict(counts) for name, counts in self.errors.items()}
+        recovery = calls.get('psu.recover', {})
+        return {
+            'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'duration': time.time() - self.started,
+            'calls': calls,
+            'errors': errors,
+            'loopPeriod': calls.get('loop.period'),
+            'recovery': {'count': recovery.get('count', 0), 'total': recovery.get('total', 0.0),
+                         'max': recovery.get('max', 0.0)},
+            'startup': {name: t - STARTUP.t0 for name, t in STARTUP.marks.items()},
+        }
+
+    def path(self) -> str:
+        if self.resultPath:
+            return os.path.splitext(self.resultPath)[0] + '_profile.json'
+        return f"adb_profile_{datetime.fromtimestamp(self.started).strftime('%Y%m%d_%H%M%S')}.json"
+
+    def write(self, path: Optional[str] = None) -> str:
+        path = path or self.path()
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+class Startup:
+    """Cold-start milestones up to the first sample; a perf_counter call each."""
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def begin(self, t0: float):
+        """Count from t0 (the CLI's first line) rather than this module's import."""
+        self.t0 = t0
+
+    def mark(self, name: str):
+        """Note when name was first reached; later calls are ignored."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter()
+
+    @property
+    def firstSample(self) -> Optional[float]:
+        """Seconds from start to the first sample, None before it."""
+        t = self.marks.get('first sample')
+        return None if t is None else t - self.t0
+
+    def report(self) -> str:
+        steps = []
+        last = self.t0
+        for name, t in sorted(self.marks.items(), key=lambda kv: kv[1]):
+            steps.append(f"{name} +{(t - last) * 1000:.0f} ms")
+            last = t
+        total = self.firstSample
+        head = "no sample taken" if total is None else f"{total * 1000:.0f} ms"
+        return f"Cold start to first sample: {head}" + (f" ({', '.join(steps)})" if steps else "")
+
+class Phases:
+    """Splits a loop iteration into named phases.
+
+    mark(name) records the time since the previous mark as name; lap(name)
+    records the time since the previous lap, i.e. the loop period.
+    """
+    def __init__(self, profiler: Profiler, prefix: str):
+        self.profiler = profiler
+        self.prefix = prefix
+        self._last = perf_counter_ns()
+        self._lap: Optional[int] = None
+
+    def mark(self, name: str):
+        now = perf_counter_ns()
+        self.profiler.record(self.prefix + name, now - self._last)
+        self._last = now
+
+    def lap(self, name: str = 'period'):
+        now = perf_counter_ns()
+        if self._lap is not None:
+            self.profiler.record(self.prefix + name, now - self._lap)
+        self._lap = now
+
+class _NoPhases:
+    def mark(self, name: str):
+        pass
+
+    def lap(self, name: str = 'period'):
+        pass
+
+class _Profiled:
+    """Proxy timing every callable attribute of an instrument object."""
+    def __init__(self, target, prefix: str, profiler: Profiler):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_prefix', prefix)
+        object.__setattr__(self, '_profiler', profiler)
+        object.__setattr__(self, '_wrapped', {})
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value) or name.startswith('_'):
+            return value
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            # bound methods are made per access, so the wrapper looks the method up again
+            wrapped = self._wrapped[name] = self._profiler.timed(f"{self._prefix}.{name}",
+                                                                 lambda *a, **k: getattr(self._target, name)(*a, **k))
+        return wrapped
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __getitem__(self, key):
+        return self._target[key]
+
+STARTUP = Startup()
+PROFILER: Optional[Profiler] = Profiler() if cfg.PROFILE else None
+
+def profiled(target, prefix: str):
+    """target with its calls timed as prefix.<method>, or target itself when profiling is off."""
+    if PROFILER is None or target is None:
+        return target
+    return _Profiled(target, prefix, PROFILER)
+
+def timed(name: str, fn: Callable) -> Callable:
+    """fn timed as name, or fn itself when profiling is off."""
+    return fn if PROFILER is None else PROFILER.timed(name, fn)
+
+def phases(prefix: str):
+    """Phases for a loop, or a no-op stand-in when profiling is off."""
+    return _NoPhases() if PROFILER is None else Phases(PROFILER, prefix)
+
+def note_result(path: str):
+    """Remember a result .txt, so the profile is written next to it."""
+    if PROFILER is not None and path.endswith('.txt'):
+        PROFILER.resultPath = path
+
+def _write_at_exit():
+    path = PROFILER.write()
+    print("Profile saved to " + path)
+
+if PROFILER is not None:
+    atexit.register(_write_at_exit)
@@ -0,0 +1,320 @@
+import json
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from adbProfile import PROFILER, STARTUP, profiled
+import adbConfig as cfg
+
+# resource name -> whether the PSU answers MEAS:ALL? (missing = not probed yet)
+_measAllSupported: Dict[str, bool] = {}
+
+def visa_error() -> type:
+    """pyvisa's VisaIOError, imported on first use.
+
+    Used as `except visa_error():`, which Python only evaluates once an
+    exception is being matched, so importing the scripts, `adb --help` and
+    runs on the simulator don't load pyvisa.
+    """
+    from pyvisa.errors import VisaIOError
+    return VisaIOError
+
+def visa_io_error(status: str) -> Exception:
+    """VisaIOError for pyvisa.constants.StatusCode.<status>, e.g. 'error_timeout'."""
+    from pyvisa import constants
+    return visa_error()(getattr(constants.StatusCode, status))
+
+def _chan_arg(chan: Optional[int]) -> str:
+    return f" CH{chan}" if chan is not None else ""
+
+def parse_meas_all(reply: str) -> Tuple[float, float, float]:
+    """Parse a DP8xx 'V,I,P' reply into (volt, curr, power)."""
+    fields = reply.strip().split(',')
+    if len(fields) != 3:
+        raise ValueError(f"unexpected MEAS:ALL? reply: {reply!r}")
+    volt, curr, power = (float(x) for x in fields)
+    return volt, curr, power
+
+def measure_each(psu, chan: Optional[int] = None) -> Tuple[float, float, float]:
+    """Read (volt, curr, power) with one query per quantity.
+
+    That is three round-trips, or one where the transport pipelines queries
+    (see adbSocket).
+    """
+    ch = _chan_arg(chan)
+    queries = [f'MEAS:VOLT?{ch}', f'MEAS:CURR?{ch}', f'MEAS:POWE?{ch}']
+    queryMany = getattr(psu, 'query_many', None)
+    replies = queryMany(queries) if queryMany is not None else [psu.query(q) for q in queries]
+    volt, curr, power = (float(r) for r in replies)
+    return volt, curr, power
+
+def clear_errors(psu, limit: int = 20):
+    """Read SYST:ERR? until the error queue is empty ('0,No error') or limit entries are gone."""
+    for _ in range(limit):
+        if psu.query('SYST:ERR?').startswith('0'):
+            return
+
+def measure_all(psu, chan: Optional[int] = None) -> Tuple[float, float, float]:
+    """Read (volt, curr, power) in a single MEAS:ALL? round-trip.
+
+    Falls back to measure_each() for instruments that don't know MEAS:ALL?,
+    i.e. that answer the first query with -113 "Undefined header"; errors
+    queued before it are flushed first so they aren't taken for that.
+    VisaIOError is passed on to the caller's recovery logic as before.
+    """
+    key = getattr(psu, 'resource_name', str(id(psu)))
+    supported = _measAllSupported.get(key)
+    if supported is False:
+        return measure_each(psu, chan)
+    if supported is None:
+        clear_errors(psu)
+
+    try:
+        reading = parse_meas_all(psu.query(f'MEAS:ALL?{_chan_arg(chan)}'))
+    except ValueError:
+        _measAllSupported[key] = False
+        return measure_each(psu, chan)
+    except visa_error():
+        if supported:
+            raise
+        # first use: an unknown header just times out, so ask the error queue why
+        psu.clear()
+        err = psu.query('SYST:ERR?')
+        if not err.startswith('-113'):
+            raise
+        print("PSU does not support MEAS:ALL?, using per-quantity queries:", err.strip())
+        _measAllSupported[key] = False
+        return measure_each(psu, chan)
+
+    _measAllSupported[key] = True
+    return reading
+
+def read_cached_address(path: str = cfg.PSU_CACHE) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return json.load(f).get('address')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def write_cached_address(address: str, idn: str, path: str = cfg.PSU_CACHE):
+    try:
+        with open(path, 'w') as f:
+            json.dump({'address': address, 'idn': idn, 'time': time.time()}, f)
+    except OSError as e:
+        print("Could not cache the PSU address:", e)
+
+def wait_discharged(psu, chan: Optional[int] = None, threshold: float = cfg.TIMER_RESET_VOLT_V,
+                    hold: float = cfg.TIMER_RESET_HOLD_MS / 1000, timeout: float = cfg.TIMER_RESET_TIMEOUT_S,
+                    period: float = 0.02) -> Tuple[float, bool]:
+    """Poll the rail voltage of a switched-off output until it has stayed below threshold for hold seconds.
+
+    With the output off the PSU reads 0 A at once, so the current says
+    nothing; the terminal voltage decays only as the DUT's capacitance
+    discharges.
+
+    Returns (seconds waited, whether it discharged); gives up after timeout.
+    VisaIOError goes through psu.recover() where psu has one (a PsuSession
+    or an Acquisition engine).
+    """
+    start = time.perf_counter()
+    below = None
+    volt = float('nan')
+    while True:
+        try:
+            volt = float(psu.query(f'MEAS:VOLT?{_chan_arg(chan)}'))
+        except visa_error():
+            if not callable(getattr(psu, 'recover', None)):
+                raise
+            psu.recover()
+            continue
+        now = time.perf_counter()
+        if volt < threshold:
+            if below is None:
+                below = now
+            if now - below >= hold:
+                return now - start, True
+        else:
+            below = None
+        if now - start >= timeout:
+            print(f"Output still at {volt:.3f} V after {timeout:g} s, going on")
+            return now - start, False
+        time.sleep(period)
+
+class PsuSession:
+    """One PSU connection for the whole run, with fast, state-preserving recovery.
+
+    Behaves like the pyvisa resource the scripts used (write/query/clear/close)
+    but also records the channel, voltage, current limit and output state set
+    through it. recover() clears the link, or reopens it on the shared
+    ResourceManager and replays that state; it never sends *RST.
+
+    Without an address (and without ADB_PSU_ADDRESS) the PSU is looked up:
+    the cached address is checked with one *IDN?, and the bus is only
+    scanned when that fails.
+    """
+    _rm = None
+
+    def __init__(self, address: Optional[str] = None, timeout: int = cfg.PSU_TIMEOUT_MS, rm=None):
+        self.address = address or cfg.PSU_ADDRESS
+        self.rm = rm or self.resource_manager()
+        self.timeout = timeout
+        self.idn = ''
+        self.chan = 1
+        self.state: Dict[int, Dict[str, str]] = {}
+        # recovery metrics
+        self.errors = 0
+        self.reopens = 0
+        self.failedRecoveries = 0
+        self.recoveryTimes: List[float] = []
+        self._resource = None
+        if address is None and not cfg.PSU_ADDRESS_FIXED:
+            self._discover()
+        else:
+            self.open()
+        STARTUP.mark('psu open')
+
+    @classmethod
+    def resource_manager(cls):
+        if cls._rm is None:
+            if cfg.PSU_TRANSPORT == 'socket':
+                from adbSocket import SocketResourceManager
+                cls._rm = SocketResourceManager()
+            else:
+                import pyvisa
+                cls._rm = pyvisa.ResourceManager()
+        return cls._rm
+
+    @property
+    def resource_name(self) -> str:
+        return self.address
+
+    def open(self):
+        resource = self.rm.open_resource(self.address)
+        # timed as visa.query, socket.query, ... with ADB_PROFILE
+        self._resource = profiled(resource, getattr(resource, 'transport', 'visa'))
+        self._resource.timeout = self.timeout
+
+    def _identify(self, address: str) -> bool:
+        """Open address and check that a DP8xx answers *IDN?; left open if so."""
+        self.address = address
+        try:
+            self.open()
+            self._resource.timeout = cfg.PSU_IDN_TIMEOUT_MS
+            self.idn = self._resource.query('*IDN?').strip()
+            self._resource.timeout = self.timeout
+        except (visa_error(), OSError, ValueError):
+            self.idn = ''
+        if cfg.PSU_MODEL in self.idn.upper():
+            return True
+        try:
+            self.close()
+        except (visa_error(), OSError):
+            pass
+        return False
+
+    def _discover(self):
+        """Open the PSU at the cached address, falling back to a list_resources() scan."""
+        cached = read_cached_address()
+        candidates = list(dict.fromkeys(a for a in (cached, cfg.PSU_ADDRESS) if a))
+        for address in candidates:
+            if self._identify(address):
+                break
+        else:
+            print("No PSU at " + ", ".join(candidates) + ", scanning for it...")
+            for address in self.rm.list_resources():
+                if address not in candidates and self._identify(address):
+                    break
+            else:
+                raise visa_io_error('error_resource_not_found')
+        if address != cached:
+            write_cached_address(address, self.idn)
+
+    def close(self):
+        if self._resource is not None:
+            self._resource.close()
+            self._resource = None
+
+    def clear(self):
+        self._resource.clear()
+
+    def query(self, cmd: str) -> str:
+        return self._resource.query(cmd)
+
+    def query_many(self, cmds: Sequence[str]) -> List[str]:
+        """Replies to several queries, in one round-trip if the transport pipelines them."""
+        queryMany = getattr(self._resource, 'query_many', None)
+        if queryMany is None:
+            return [self._resource.query(cmd) for cmd in cmds]
+        return queryMany(cmds)
+
+    def write(self, cmd: str):
+        self._resource.write(cmd)
+        self._track(cmd)
+
+    def _track(self, cmd: str):
+        parts = cmd.strip().upper().split()
+        if not parts:
+            return
+        if parts[0] == '*RST':
+            self.state.clear()
+            self.chan = 1
+        elif parts[0] in ('INST:NSEL', 'INST') and len(parts) > 1:
+            self.chan = int(parts[1].replace('CH', ''))
+        elif parts[0] == 'OUTP' and len(parts) > 1 and ',' in parts[1]:
+            # OUTP CH2,ON addresses a channel without selecting it
+            chan, value = parts[1].split(',', 1)
+            self.state.setdefault(int(chan.replace('CH', '')), {})['OUTP'] = value
+        elif parts[0] in ('VOLT', 'CURR', 'OUTP') and len(parts) > 1:
+            self.state.setdefault(self.chan, {})[parts[0]] = parts[1]
+
+    def _restore(self):
+        for chan, settings in self.state.items():
+            self._resource.write(f'INST:NSEL {chan}')
+            for key in ('VOLT', 'CURR', 'OUTP'):
+                if key in settings:
+                    self._resource.write(f'{key} {settings[key]}')
+        self._resource.write(f'INST:NSEL {self.chan}')
+
+    def _probe(self):
+        """Cheap round-trip with a short timeout, so a dead link fails fast."""
+        self._resource.timeout = cfg.RECOVERY_PROBE_TIMEOUT_MS
+        try:
+            self._resource.query('*OPC?')
+        finally:
+            self._resource.timeout = self.timeout
+
+    def recover(self) -> "PsuSession":
+        """Get the link working again after a VisaIOError, with bounded backoff."""
+        start = time.perf_counter()
+        self.errors += 1
+        delay = cfg.RECOVERY_BACKOFF_S
+        for attempt in range(cfg.RECOVERY_MAX_ATTEMPTS):
+            try:
+                if attempt < cfg.RECOVERY_CLEAR_ATTEMPTS:
+                    self._resource.clear()
+                else:
+                    try:
+                        self.close()
+                    except visa_error():
+                        pass
+                    self.open()
+                    self.reopens += 1
+                    self._restore()
+                self._probe()
+                break
+            except visa_error():
+                time.sleep(delay)
+                delay = min(delay * 2, cfg.RECOVERY_MAX_BACKOFF_S)
+        else:
+            self.failedRecoveries += 1
+            print("PSU did not recover; will retry on the next error")
+        self.recoveryTimes.append(time.perf_counter() - start)
+        if PROFILER is not None:
+            PROFILER.record_s('psu.recover', self.recoveryTimes[-1])
+        return self
+
+    def recovery_report(self) -> str:
+        if not self.recoveryTimes:
+            return f"PSU errors: {self.errors}, no recoveries"
+        total = sum(self.recoveryTimes)
+        return (f"PSU errors: {self.errors}, reopens: {self.reopens}, failed recoveries: {self.failedRecoveries}, "
+                f"recovery time total {total * 1000:.1f} ms, max {max(self.recoveryTimes) * 1000:.1f} ms, "
+                f"mean {total / len(self.recoveryTimes) * 1000:.1f} ms")
@@ -0,0 +1,366 @@
+"""Min/max/mean decimation pyramid next to each .adbrun, for overviews of long runs.
+
+Level k bins FACTOR**k samples: for each bin its first and last time, the
+sample count and, per column, the min, max and mean. RunSink builds the
+levels while the run is recorded (PyramidWriter, a few numpy reductions
+per flushed batch) and writes them beside the run file:
+
+    timer_test_1_..._data.adbrun -> timer_test_1_..._data.adbpyr
+
+query(column, start, end, pixels) returns the coarsest level that still
+has at least one bin per pixel in [start, end], falling back to the raw
+samples once the window is shorter than that. A plot of a 24 h run then
+reads about as many rows as one of a minute. The writer answers the same
+query from memory while the run goes on; LiveView uses that to redraw a
+text overview at most every LIVE_VIEW_S seconds.
+
+Layout of an .adbpyr file, like .adbrun: a 64-byte preamble (magic, raw
+row count, level count, header offset, header length), one row-major
+float64 block per level, and a UTF-8 JSON header with the columns, factor
+and each level's row count and offset.
+
+    python adbPyramid.py [run.adbrun ...]   # build pyramids for runs recorded before
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import namedtuple
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from adbRunFormat import DATA_OFFSET, EXTENSION as RUN_EXTENSION, RunFile
+import adbConfig as cfg
+
+MAGIC = b'ADBPYR01'
+PREAMBLE = struct.Struct('<8sQIQQ')
+EXTENSION = '.adbpyr'
+T0, T1, N = 0, 1, 2 # per-bin columns before the min/max/mean triples
+BARS = ' ▁▂▃▄▅▆▇█'
+
+# one column of a query: level 0 is the raw samples (min == max == mean, n == 1)
+Envelope = namedtuple('Envelope', ['level', 't0', 't1', 'n', 'min', 'max', 'mean'])
+
+def pyramid_path(runPath: str) -> str:
+    """timer_test_1_..._data.adbrun -> timer_test_1_..._data.adbpyr"""
+    return os.path.splitext(runPath)[0] + EXTENSION
+
+def _expand(t: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Raw samples as one-sample bins: (rows,) times and (rows, columns) values -> bin rows."""
+    rows, ncols = values.shape
+    out = np.empty((rows, 3 + 3 * ncols))
+    out[:, T0] = t
+    out[:, T1] = t
+    out[:, N] = 1
+    for j in range(3):
+        out[:, 3 + j::3] = values
+    return out
+
+def _reduce(bins: np.ndarray, factor: int) -> np.ndarray:
+    """Merge every factor consecutive bins; len(bins) must be a multiple of factor."""
+    groups = bins.reshape(-1, factor, bins.shape[1])
+    n = groups[:, :, N]
+    out = np.empty((groups.shape[0], bins.shape[1]))
+    out[:, T0] = groups[:, 0, T0]
+    out[:, T1] = groups[:, -1, T1]
+    out[:, N] = n.sum(axis=1)
+    out[:, 3::3] = groups[:, :, 3::3].min(axis=1)
+    out[:, 4::3] = groups[:, :, 4::3].max(axis=1)
+    out[:, 5::3] = (groups[:, :, 5::3] * n[:, :, None]).sum(axis=1) / out[:, N, None]
+    return out
+
+def _window(bins: np.ndarray, start: float, end: float) -> slice:
+    """Rows of bins overlapping [start, end]."""
+    return slice(int(np.searchsorted(bins[:, T1], start, 'left')), int(np.searchsorted(bins[:, T0], end, 'right')))
+
+def _select(levels: List[Optional[np.ndarray]], raw, start: Optional[float], end: Optional[float], pixels: int):
+    """(level, bins) to draw [start, end] at pixels wide.
+
+    levels[k] is None where level k doesn't reach back to start; raw(start,
+    end) gives the level 0 bins, or None likewise.
+    """
+    start = -np.inf if start is None else start
+    end = np.inf if end is None else end
+    finest = None
+    for k in range(len(levels) - 1, 0, -1):
+        if levels[k] is None:
+            continue
+        bins = levels[k][_window(levels[k], start, end)]
+        if len(bins) >= pixels:
+            return k, bins
+        finest = (k, bins)
+    bins = raw(start, end)
+    if bins is None:
+        return finest
+    return 0, bins
+
+class _Level:
+    """One level's bins: spilled to a temp file, the last tail rows kept for live queries."""
+    def __init__(self, path: str, tail: int):
+        self.spill = open(path, 'wb')
+        self.tail = tail
+        self.blocks: List[np.ndarray] = []
+        self.kept = 0
+        self.rows = 0
+
+    def append(self, bins: np.ndarray):
+        bins.tofile(self.spill)
+        self.rows += len(bins)
+        self.blocks.append(bins)
+        self.kept += len(bins)
+        while self.kept - len(self.blocks[0]) >= self.tail:
+            self.kept -= len(self.blocks.pop(0))
+
+    def recent(self) -> np.ndarray:
+        return np.concatenate(self.blocks) if len(self.blocks) > 1 else self.blocks[0]
+
+class PyramidWriter:
+    """Builds the pyramid from rows as they are recorded and writes it on close().
+
+    columns are the run's columns, one of them 't'; rows are appended in
+    batches. Only the bins still to be merged into the next level and the
+    last tail rows per level stay in memory; query() answers from those,
+    with the bins still filling up merged into a last partial bin.
+    """
+    def __init__(self, path: str, columns: Sequence[str], factor: int = cfg.PYRAMID_FACTOR,
+                 tail: int = cfg.PYRAMID_LIVE_ROWS):
+        self.path = path
+        self.columns = [c for c in columns if c != 't']
+        self.factor = factor
+        self.tail = tail
+        self.rows = 0
+        self._t = list(columns).index('t')
+        self._v = [i for i, c in enumerate(columns) if c != 't']
+        self._raw: List[np.ndarray] = [] # recent raw samples, as level 0 bins
+        self._rawKept = 0
+        self._pending: List[np.ndarray] = [np.empty((0, 3 + 3 * len(self.columns)))] # per level, bins not merged yet
+        self._levels: List[Optional[_Level]] = [None] # level 0 is the .adbrun itself
+        self._lock = threading.Lock()
+
+    def extend(self, rows: Sequence[Sequence[float]]):
+        if not len(rows):
+            return
+        rows = np.asarray(rows, dtype=float)
+        bins = _expand(rows[:, self._t], rows[:, self._v])
+        with self._lock:
+            self.rows += len(bins)
+            self._raw.append(bins)
+            self._rawKept += len(bins)
+            while self._rawKept - len(self._raw[0]) >= self.tail:
+                self._rawKept -= len(self._raw.pop(0))
+            self._add(0, bins)
+
+    def _add(self, k: int, bins: np.ndarray):
+        if k > 0:
+            if k == len(self._levels):
+                self._levels.append(_Level(f"{self.path}.{k}.tmp", self.tail))
+                self._pending.append(self._pending[0][:0])
+            self._levels[k].append(bins)
+        pending = np.concatenate((self._pending[k], bins))
+        full = len(pending) - len(pending) % self.factor
+        self._pending[k] = pending[full:]
+        if full:
+            self._add(k + 1, _reduce(pending[:full], self.factor))
+
+    def _partial(self, k: int) -> Optional[np.ndarray]:
+        """One bin for everything not in level k yet, or None."""
+        below = self._partial(k - 1) if k > 1 else None
+        pending = self._pending[k - 1] if below is None else np.concatenate((self._pending[k - 1], below))
+        return _reduce(pending, len(pending)) if len(pending) else None
+
+    def query(self, column: str, start: Optional[float] = None, end: Optional[float] = None,
+              pixels: int = cfg.PYRAMID_PIXELS) -> Envelope:
+        """The run so far, from memory; start before the oldest row a level keeps moves to a coarser one."""
+        with self._lock:
+            if not self.rows:
+                return _envelope(0, np.empty((0, 3 + 3 * len(self.columns))), 0)
+            levels: List[Optional[np.ndarray]] = [None]
+            for k in range(1, len(self._levels)):
+                level = self._levels[k]
+                recent = level.recent()
+                covers = level.rows == level.kept or (start is not None and start >= recent[0, T0])
+                partial = self._partial(k)
+                levels.append(None if not covers else recent if partial is None else np.concatenate((recent, partial)))
+
+            def raw(lo, hi):
+                bins = np.concatenate(self._raw)
+                if self.rows > self._rawKept and lo < bins[0, T0]:
+                    return None
+                return bins[_window(bins, lo, hi)]
+            level, bins = _select(levels, raw, start, end, pixels)
+            return _envelope(level, bins, self.columns.index(column))
+
+    def close(self, header: Optional[Dict] = None):
+        """Merge the partly filled bins and write the file; no levels for runs under factor samples."""
+        with self._lock:
+            k = 0
+            while k < len(self._pending): # merging a partial bin can fill one above it
+                if len(self._pending[k]) and k + 1 < len(self._levels):
+                    pending, self._pending[k] = self._pending[k], self._pending[k][:0]
+                    self._add(k + 1, _reduce(pending, len(pending)))
+                k += 1
+            levels = self._levels[1:]
+            meta = dict(header or {})
+            meta.update(columns=self.columns, factor=self.factor, rows=self.rows, byteorder=sys.byteorder, levels=[])
+            offset = DATA_OFFSET
+            for k, level in enumerate(levels, 1):
+                meta['levels'].append({'level': k, 'rows': level.rows, 'offset': offset})
+                offset += 8 * level.rows * (3 + 3 * len(self.columns))
+            blob = json.dumps(meta).encode('utf-8')
+
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as out:
+                out.write(PREAMBLE.pack(MAGIC, self.rows, len(levels), offset, len(blob)).ljust(DATA_OFFSET, b'\0'))
+                for level in levels:
+                    level.spill.close()
+                    with open(level.spill.name, 'rb') as f:
+                        while True:
+                            block = f.read(1 << 20)
+                            if not block:
+                                break
+                            out.write(block)
+                    os.remove(level.spill.name)
+                out.write(blob)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, self.path)
+
+def _envelope(level: int, bins: np.ndarray, j: int) -> Envelope:
+    return Envelope(level, bins[:, T0], bins[:, T1], bins[:, N], bins[:, 3 + 3 * j], bins[:, 4 + 3 * j], bins[:, 5 + 3 * j])
+
+class Pyramid:
+    """Memory-mapped .adbpyr reader; query() reads only the rows of the level it picks.
+
+    The raw samples for short windows come from the .adbrun beside it,
+    opened on first need.
+    """
+    def __init__(self, path: str, runPath: Optional[str] = None):
+        self.path = path
+        self.runPath = runPath or os.path.splitext(path)[0] + RUN_EXTENSION
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, nlevels, headerOffset, headerLen = PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an {EXTENSION} file")
+        self.header = json.loads(self._mm[headerOffset:headerOffset + headerLen].decode('utf-8'))
+        if self.header.get('byteorder', 'little') != sys.byteorder:
+            raise ValueError(f"{path} was written with {self.header['byteorder']}-endian floats")
+        self.columns: List[str] = self.header['columns']
+        self.factor: int = self.header['factor']
+        width = 3 + 3 * len(self.columns)
+        self.levels: List[np.ndarray] = [None] + [
+            np.frombuffer(self._mm, dtype=float, count=level['rows'] * width, offset=level['offset']).reshape(-1, width)
+            for level in self.header['levels']]
+        self._run: Optional[RunFile] = None
+
+    def _raw(self, start: float, end: float) -> np.ndarray:
+        if self._run is None:
+            self._run = RunFile(self.runPath)
+        t = np.frombuffer(self._run.column('t'), dtype=float)
+        window = slice(int(np.searchsorted(t, start, 'left')), int(np.searchsorted(t, end, 'right')))
+        values = np.column_stack([np.frombuffer(self._run.column(c), dtype=float)[window] for c in self.columns])
+        return _expand(t[window], values.reshape(-1, len(self.columns)))
+
+    def query(self, column: str, start: Optional[float] = None, end: Optional[float] = None,
+              pixels: int = cfg.PYRAMID_PIXELS) -> Envelope:
+        """Bins for column over [start, end] (None = from the start / to the end), at least pixels of them where the run has that many."""
+        level, bins = _select(self.levels, self._raw, start, end, pixels)
+        return _envelope(level, np.array(bins), self.columns.index(column)) # a copy, not a view into the mmap
+
+    def close(self):
+        self.levels = [None]
+        if self._run is not None:
+            self._run.close()
+            self._run = None
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def build_pyramid(runPath: str, path: Optional[str] = None, chunkRows: int = 1 << 16) -> str:
+    """Write the pyramid for an .adbrun recorded without one; returns its path."""
+    path = path or pyramid_path(runPath)
+    with RunFile(runPath) as run:
+        writer = PyramidWriter(path, run.columns)
+        columns = [np.frombuffer(run.column(c), dtype=float) for c in run.columns]
+        for i in range(0, run.rows, chunkRows):
+            writer.extend(np.column_stack([c[i:i + chunkRows] for c in columns]))
+        del columns
+        writer.close({'source': os.path.basename(runPath)})
+    return path
+
+def open_pyramid(runPath: str) -> Pyramid:
+    """The pyramid beside runPath, built first if the run has none yet."""
+    path = pyramid_path(runPath)
+    if not os.path.exists(path):
+        build_pyramid(runPath, path)
+    return Pyramid(path, runPath)
+
+def sparkline(env: Envelope, width: int, start: Optional[float] = None, end: Optional[float] = None) -> str:
+    """One character per column of width: the highest max in that time slice, scaled to the window's range."""
+    if not len(env.t0):
+        return ''
+    start = env.t0[0] if start is None else start
+    end = env.t1[-1] if end is None else end
+    span = max(end - start, 1e-9)
+    cells = np.full(width, -np.inf)
+    index = np.clip(((env.t0 - start) / span * width).astype(int), 0, width - 1)
+    np.maximum.at(cells, index, env.max)
+    lo, hi = env.min.min(), env.max.max()
+    filled = np.isfinite(cells)
+    if hi > lo:
+        cells[filled] = (cells[filled] - lo) / (hi - lo) * (len(BARS) - 2) + 1
+    else:
+        cells[filled] = 1
+    return ''.join(BARS[int(round(c))] if f else ' ' for c, f in zip(cells, filled))
+
+class LiveView(threading.Thread):
+    """Prints an overview of the run so far from a PyramidWriter, at most every interval seconds.
+
+    Each redraw is one query() at width pixels, so it costs the same an hour
+    into a run as a minute in. With interval 0 (LIVE_VIEW_S unset) start()
+    does nothing.
+    """
+    def __init__(self, pyramid: PyramidWriter, column: str = 'curr', unit: str = 'A',
+                 interval: float = cfg.LIVE_VIEW_S, width: int = cfg.PYRAMID_PIXELS):
+        super().__init__(name="live-view", daemon=True)
+        self.pyramid = pyramid
+        self.column = column
+        self.unit = unit
+        self.interval = interval
+        self.width = width
+        self._done = threading.Event()
+
+    def start(self):
+        if self.interval > 0:
+            super().start()
+
+    def stop(self):
+        self._done.set()
+        if self.is_alive():
+            self.join()
+
+    def draw(self) -> str:
+        env = self.pyramid.query(self.column, pixels=self.width)
+        if not len(env.t0):
+            return f"{self.column}: no samples yet"
+        return (f"{self.column} {env.min.min():.6f}..{env.max.max():.6f} {self.unit} over {env.t1[-1] - env.t0[0]:.1f} s "
+                f"|{sparkline(env, self.width)}|")
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            print(self.draw())
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or [p for p in glob.glob(f"*_data{RUN_EXTENSION}") if not os.path.exists(pyramid_path(p))]
+    if not paths:
+        print(f"No runs without a pyramid (use filenames or let it glob *_data{RUN_EXTENSION})")
+        sys.exit(1)
+    for p in paths:
+        print(f"{p} -> {build_pyramid(p)}")
@@ -0,0 +1,200 @@
+"""Replay recorded runs through the scripts' trigger and segmentation logic.
+
+A run (.adbrun or *_data.csv) is streamed sample by sample, as fast as
+possible or paced at N x real time, into the same adbTrigger current
+triggers the acquisition scripts use live (adbTrigger.script_trigger,
+debounce and hysteresis included) and the same segmentation as the
+summaries. DET lines are not recorded; runs are replayed as if both
+antennas stayed stowed. Many parameter sets
+are evaluated in one pass per run and runs are fanned out over a process
+pool, so a new threshold can be checked against the whole archive:
+
+    python adbReplay.py --all --set burnCurrThreshold=0.3,0.4,0.5 --set debounce=1,2,3
+    python adbReplay.py timer_test_1_20260112_153045_data.adbrun --set currThreshold=0.45 --speed 10
+
+Each run is compared with the thresholds it was recorded with and reported
+as triggering earlier, later, falsely (no trigger in the recording) or not
+at all.
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from adbAcquisition import Sample
+from adbAnalysis import summarize
+from adbRunFormat import CSV_COLUMNS, EXTENSION, RunFile, parse_time, test_type
+from adbTrigger import SCRIPT_TRIGGERS, STOWED, script_trigger
+import adbConfig as cfg
+
+# what the scripts use when a recording doesn't say
+DEFAULT_PARAMS = {'currThreshold': 0.5, 'burnCurrThreshold': 0.5,
+                  'debounce': cfg.TRIGGER_DEBOUNCE, 'hysteresis': cfg.TRIGGER_HYSTERESIS}
+
+def read_run(path: str) -> Tuple[Dict[str, Sequence[float]], Dict]:
+    """Return ({'t', 'volt', 'curr', 'power'} columns, header); volt is None if not recorded."""
+    if path.endswith(EXTENSION):
+        with RunFile(path) as run: # columns copied out, so the mapping is closed again
+            cols = {name: np.array(run.column(name)) if name in run else None for name in ('t', 'volt', 'curr', 'power')}
+            return cols, run.header
+    cols = {'t': [], 'volt': [], 'curr': [], 'power': []}
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        names = [next((col for prefix, col in CSV_COLUMNS.items() if title.startswith(prefix)), None) for title in header]
+        for row in reader:
+            if not row or len(row) < len(names):
+                continue
+            for name, value in zip(names, row):
+                if name == 't':
+                    cols['t'].append(parse_time(value.strip()))
+                elif name in cols:
+                    cols[name].append(float(value))
+    if not cols['volt']:
+        cols['volt'] = None
+    return cols, {}
+
+def stream(cols: Dict[str, Sequence[float]], speed: Optional[float] = None) -> Iterator[Sample]:
+    """Yield the run as Samples; with speed, at speed x the recorded pace on absolute deadlines."""
+    times, volts, currents, powers = cols['t'], cols['volt'], cols['curr'], cols['power']
+    start = time.perf_counter()
+    for k in range(len(times)):
+        if speed:
+            delay = start + (times[k] - times[0]) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield Sample(times[k], volts[k] if volts is not None else 0.0, currents[k], powers[k])
+
+class Detector:
+    """One parameter set's copy of the script's trigger, fed one sample at a time like the live loop."""
+    def __init__(self, test: str, params: Dict[str, float]):
+        self.params = params
+        self.rules = []
+        if test in SCRIPT_TRIGGERS:
+            name, key = SCRIPT_TRIGGERS[test]
+            self.rules.append((name, script_trigger(test, params[key], debounce=int(params['debounce']),
+                                                    hysteresis=params['hysteresis'])))
+        self.hits: Dict[str, Tuple[int, float]] = {}
+
+    def feed(self, sample: Sample):
+        for name, trigger in self.rules:
+            if not trigger.fired:
+                hit = trigger.feed(sample, STOWED)
+                if hit:
+                    self.hits[name] = (hit.index, hit.t)
+
+def recorded_params(test: str, header: Dict) -> Dict[str, float]:
+    """Thresholds the run was recorded with (header values, else the script defaults)."""
+    return {key: header.get(key, default) for key, default in DEFAULT_PARAMS.items()}
+
+def classify(ref: Optional[Tuple[int, float]], new: Optional[Tuple[int, float]], tolerance: float) -> str:
+    if new is None:
+        return 'same' if ref is None else 'missed'
+    if ref is None:
+        return 'false'
+    delta = new[1] - ref[1]
+    if delta < -tolerance:
+        return 'earlier'
+    if delta > tolerance:
+        return 'later'
+    return 'same'
+
+def evaluate_file(path: str, paramSets: List[Dict[str, float]], speed: Optional[float] = None,
+                  tolerance: float = 0.0) -> Dict:
+    """Replay one run once through the recorded and every candidate parameter set."""
+    cols, header = read_run(path)
+    test = header.get('test', test_type(path))
+    reference = Detector(test, recorded_params(test, header))
+    candidates = [Detector(test, dict(recorded_params(test, header), **p)) for p in paramSets]
+    detectors = [reference] + candidates
+    for s in stream(cols, speed):
+        for d in detectors:
+            d.feed(s)
+
+    results = []
+    segmentTrigger = SCRIPT_TRIGGERS[test][0] if test in SCRIPT_TRIGGERS else None
+    for p, d in zip(paramSets, candidates):
+        triggers = {}
+        for name, _ in d.rules:
+            ref, new = reference.hits.get(name), d.hits.get(name)
+            triggers[name] = {
+                'outcome': classify(ref, new, tolerance),
+                'time': new[1] if new else None,
+                'delta': new[1] - ref[1] if new and ref else None,
+            }
+        onset = d.hits.get(segmentTrigger)
+        summary = summarize(cols['t'], cols['volt'], cols['curr'], cols['power'],
+                            index=onset[0] if onset else None, triggerTime=onset[1] if onset else None)
+        results.append({'params': p, 'triggers': triggers,
+                        'timer': summary.get('timer'), 'burn': summary.get('burn')})
+    return {'path': path, 'test': test, 'samples': len(cols['t']), 'results': results}
+
+def parse_grid(specs: Sequence[str]) -> List[Dict[str, float]]:
+    """['a=1,2', 'b=3'] -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]"""
+    axes = []
+    for spec in specs:
+        key, _, values = spec.partition('=')
+        if key not in DEFAULT_PARAMS or not values:
+            raise ValueError(f"expected one of {', '.join(DEFAULT_PARAMS)}=v1,v2,...: {spec!r}")
+        axes.append([(key, float(v)) for v in values.split(',')])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+def replay(paths: List[str], paramSets: List[Dict[str, float]], workers: int = 1,
+           speed: Optional[float] = None, tolerance: float = 0.0) -> Iterator[Dict]:
+    work = partial(evaluate_file, paramSets=paramSets, speed=speed, tolerance=tolerance)
+    if workers <= 1 or len(paths) <= 1:
+        yield from map(work, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(work, paths, chunksize=max(1, len(paths) // (workers * 4)))
+
+def describe_params(params: Dict[str, float]) -> str:
+    return ', '.join(f"{k}={v:g}" for k, v in params.items()) or "recorded thresholds"
+
+def print_report(paramSets: List[Dict[str, float]], runs: List[Dict], verbose: bool = True):
+    outcomes = ('same', 'earlier', 'later', 'false', 'missed')
+    for i, params in enumerate(paramSets):
+        counts = dict.fromkeys(outcomes, 0)
+        changed = []
+        for run in runs:
+            for name, trig in run['results'][i]['triggers'].items():
+                counts[trig['outcome']] += 1
+                if trig['outcome'] != 'same':
+                    changed.append((run['path'], name, trig))
+        print(f"{describe_params(params)}:")
+        print("  " + ", ".join(f"{k}: {counts[k]}" for k in outcomes))
+        if verbose:
+            for path, name, trig in changed:
+                delta = f" ({trig['delta']:+.3f} s)" if trig['delta'] is not None else ""
+                print(f"    {trig['outcome']:<8} {name:<11} {path}{delta}")
+
+if __name__ == "__main__":
+    from timerTestResultCalculator import TEST_TYPES, find_runs
+
+    parser = argparse.ArgumentParser(description="Replay recorded runs against new trigger thresholds.")
+    parser.add_argument('paths', nargs='*', help="run files; default globs timer_test_*_data.adbrun/.csv")
+    parser.add_argument('--all', action='store_true', help="also glob burn_test_* and full_functional_test_* runs")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=V1,V2',
+                        help=f"candidate values for {', '.join(DEFAULT_PARAMS)}; repeat for a grid")
+    parser.add_argument('--speed', type=float, help="replay at N x real time (default: as fast as possible)")
+    parser.add_argument('--tolerance', type=float, default=0.0, help="seconds of trigger shift still counted as the same")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1, help="worker processes (1 = no pool)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print the counts per parameter set")
+    args = parser.parse_args()
+
+    paths = args.paths or find_runs(TEST_TYPES if args.all else ('timer_test',))
+    if not paths:
+        print("No files found (use filenames or let it glob timer_test_*_data.adbrun / .csv)")
+        sys.exit(1)
+    try:
+        paramSets = parse_grid(args.set) or [{}]
+    except ValueError as e:
+        parser.error(str(e))
+
+    runs = list(replay(paths, paramSets, args.workers, args.speed, args.tolerance))
+    print_report(paramSets, runs, verbose=not args.quiet)
@@ -0,0 +1,179 @@
+"""Compact columnar binary run format (.adbrun).
+
+Layout:
+  64-byte preamble: magic, row count, column count, header offset, header length
+  one float64 block per column, nrows values each, back to back
+  UTF-8 JSON header (test type, columns, thresholds, segment indices, ...)
+
+The header goes last so it can hold values only known at the end of a test,
+and the columns stay 8-byte aligned for zero-copy views over an mmap.
+"""
+import csv
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+MAGIC = b'ADBRUN01'
+PREAMBLE = struct.Struct('<8sQIQQ')
+DATA_OFFSET = 64
+EXTENSION = '.adbrun'
+
+# CSV header prefix -> column name, for every *_data.csv the scripts write
+CSV_COLUMNS = {
+    'Time': 't',
+    'Voltage': 'volt',
+    'Current': 'curr',
+    'Power': 'power',
+    'Errors': 'errors',
+}
+
+def run_path(csvPath: str) -> str:
+    """timer_test_1_..._data.csv -> timer_test_1_..._data.adbrun"""
+    return os.path.splitext(csvPath)[0] + EXTENSION
+
+def test_type(path: str) -> str:
+    name = os.path.basename(path)
+    for prefix in ('timer_test', 'burn_test', 'full_functional_test'):
+        if name.startswith(prefix):
+            return prefix
+    return 'unknown'
+
+class RunWriter:
+    """Appends rows and assembles the .adbrun file on close().
+
+    Each column is spilled to its own temp file in chunks while the run is
+    recorded, so memory stays bounded; close() concatenates them behind the
+    preamble, appends the header and renames the result into place.
+    """
+    def __init__(self, path: str, columns: Sequence[str], header: Optional[Dict] = None,
+                 chunkRows: int = 4096):
+        self.path = path
+        self.columns = list(columns)
+        self.header = dict(header or {})
+        self.chunkRows = chunkRows
+        self.rows = 0
+        self._chunks = [array('d') for _ in self.columns]
+        self._spills = [open(f"{path}.{i}.tmp", 'wb') for i in range(len(self.columns))]
+
+    def append(self, row: Sequence[float]):
+        for chunk, value in zip(self._chunks, row):
+            chunk.append(value)
+        self.rows += 1
+        if len(self._chunks[0]) >= self.chunkRows:
+            self.flush()
+
+    def flush(self):
+        for chunk, spill in zip(self._chunks, self._spills):
+            chunk.tofile(spill)
+            del chunk[:]
+            spill.flush()
+
+    def fsync(self):
+        for spill in self._spills:
+            os.fsync(spill.fileno())
+
+    def close(self, header: Optional[Dict] = None):
+        self.flush()
+        self.header.update(header or {})
+        self.header['columns'] = self.columns
+        self.header['rows'] = self.rows
+        self.header['byteorder'] = sys.byteorder
+        meta = json.dumps(self.header).encode('utf-8')
+        headerOffset = DATA_OFFSET + 8 * self.rows * len(self.columns)
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as out:
+            out.write(PREAMBLE.pack(MAGIC, self.rows, len(self.columns), headerOffset, len(meta)).ljust(DATA_OFFSET, b'\0'))
+            for spill in self._spills:
+                spill.close()
+                with open(spill.name, 'rb') as f:
+                    while True:
+                        block = f.read(1 << 20)
+                        if not block:
+                            break
+                        out.write(block)
+                os.remove(spill.name)
+            out.write(meta)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+
+class RunFile:
+    """Memory-mapped .adbrun reader; column() returns zero-copy float views."""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, ncols, headerOffset, headerLen = PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an {EXTENSION} file")
+        self.header = json.loads(self._mm[headerOffset:headerOffset + headerLen].decode('utf-8'))
+        if self.header.get('byteorder', 'little') != sys.byteorder:
+            raise ValueError(f"{path} was written with {self.header['byteorder']}-endian floats")
+        self.columns: List[str] = self.header['columns']
+        self._views: Dict[str, memoryview] = {}
+
+    def column(self, name: str) -> memoryview:
+        if name not in self._views:
+            start = DATA_OFFSET + 8 * self.rows * self.columns.index(name)
+            self._views[name] = memoryview(self._mm)[start:start + 8 * self.rows].cast('d')
+        return self._views[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def parse_time(ts: str) -> float:
+    """Parse 'MM:SS.mmm' into seconds (float)."""
+    minutes, rest = ts.split(':')
+    return int(minutes) * 60 + float(rest)
+
+def convert_csv(csvPath: str, path: Optional[str] = None) -> str:
+    """Convert a *_data.csv written by the acquisition scripts to .adbrun."""
+    path = path or run_path(csvPath)
+    with open(csvPath, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = []
+        for title in header:
+            name = next((col for prefix, col in CSV_COLUMNS.items() if title.startswith(prefix)), None)
+            if name is None:
+                raise ValueError(f"{csvPath}: unknown column {title!r}")
+            columns.append(name)
+        writer = RunWriter(path, columns, {'test': test_type(csvPath), 'source': os.path.basename(csvPath)})
+        try:
+            for row in reader:
+                if not row or len(row) < len(columns):
+                    continue
+                writer.append([parse_time(row[0].strip())] + [float(x) for x in row[1:len(columns)]])
+        except BaseException:
+            writer.close()
+            os.remove(path)
+            raise
+    writer.close()
+    return path
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or glob.glob("timer_test_*_data.csv")
+    if not paths:
+        print("No files found (use filenames or let it glob timer_test_*_data.csv)")
+        sys.exit(1)
+    for p in paths:
+        print(f"{p} -> {convert_csv(p)}")
@@ -0,0 +1,135 @@
+"""Persistent SQLite index of run files and their computed summaries.
+
+A file is served from the index while its size and mtime are unchanged; if
+only the mtime moved, the content hash decides. Everything else is reparsed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_DB = 'adb_runs.sqlite'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    hash        TEXT NOT NULL,
+    test        TEXT,
+    samples     INTEGER,
+    duration    REAL,
+    triggerTime REAL,
+    volt_avg    REAL,
+    curr_avg    REAL,
+    power_avg   REAL,
+    energy      REAL,
+    gaps        INTEGER,
+    downtime    REAL,
+    indexed     REAL NOT NULL,
+    summary     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_test_mtime ON runs (test, mtime);
+'''
+
+def file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                return h.hexdigest()
+            h.update(block)
+
+class RunIndex:
+    def __init__(self, db: str = DEFAULT_DB):
+        self.conn = sqlite3.connect(db)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, path: str) -> Optional[Dict]:
+        """Stored summary for path if the file is unchanged, else None."""
+        path = os.path.abspath(path)
+        row = self.conn.execute('SELECT size, mtime, hash, summary FROM runs WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            return None
+        size, mtime, digest, summary = row
+        st = os.stat(path)
+        if st.st_size != size:
+            return None
+        if st.st_mtime != mtime:
+            # touched or copied: same bytes still count as unchanged
+            if file_hash(path) != digest:
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE runs SET mtime = ? WHERE path = ?', (st.st_mtime, path))
+        return json.loads(summary)
+
+    def register(self, path: str, summary: Dict, digest: Optional[str] = None):
+        """Store (or replace) the summary of a run file."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        overall = summary['overall']
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, st.st_size, st.st_mtime, digest or file_hash(path), summary.get('test'),
+                 summary.get('samples'), summary.get('finalTime'), summary.get('triggerTime'),
+                 overall['volt_avg'], overall['curr_avg'], overall['power_avg'], overall['energy'],
+                 summary['gaps'], summary['downtime'], time.time(), json.dumps(summary)))
+
+    def forget_missing(self) -> int:
+        """Drop entries whose file no longer exists; returns how many."""
+        gone = [(p,) for (p,) in self.conn.execute('SELECT path FROM runs') if not os.path.exists(p)]
+        with self.conn:
+            self.conn.executemany('DELETE FROM runs WHERE path = ?', gone)
+        return len(gone)
+
+    def stats(self, test: Optional[str] = None, since: Optional[float] = None) -> List[tuple]:
+        """(test, runs, avg trigger time, avg duration, avg energy, total downtime) per test type."""
+        sql = ('SELECT test, COUNT(*), AVG(triggerTime), AVG(duration), AVG(energy), SUM(downtime) '
+               'FROM runs WHERE (? IS NULL OR test = ?) AND (? IS NULL OR mtime >= ?) GROUP BY test ORDER BY test')
+        return self.conn.execute(sql, (test, test, since, since)).fetchall()
+
+def register_run(path: str, db: str = DEFAULT_DB):
+    """Called by the acquisition scripts once a test's .adbrun is closed.
+
+    The summary is computed from the finished file, as the calculator
+    computes it, not taken from the script's running statistics.
+    """
+    from adbAnalysis import summarize_run # numpy; not needed for querying the index
+    from adbRunFormat import RunFile, test_type
+    try:
+        with RunFile(path) as run:
+            volts = run.column('volt') if 'volt' in run else None
+            summary = summarize_run(run.column('t'), volts, run.column('curr'), run.column('power'),
+                                    run.header, run.header.get('test', test_type(path)))
+        summary['path'] = path
+        with RunIndex(db) as index:
+            index.register(path, summary)
+    except sqlite3.Error as e:
+        print("Could not update run index:", e)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the run index without rescanning run files.")
+    parser.add_argument('--db', default=DEFAULT_DB)
+    parser.add_argument('--test', help="timer_test, burn_test or full_functional_test")
+    parser.add_argument('--days', type=float, help="only runs recorded in the last N days")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else None
+    with RunIndex(args.db) as index:
+        print(f"{'test':<22} {'runs':>5} {'avg trigger (s)':>16} {'avg duration (s)':>17} {'avg energy (J)':>15} {'downtime (s)':>13}")
+        for test, runs, trig, dur, energy, down in index.stats(args.test, since):
+            print(f"{test:<22} {runs:>5} {trig:>16.3f} {dur:>17.3f} {energy:>15.3f} {down:>13.3f}")
@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+import adbConfig as cfg
+
+JITTER_BIN_S = 0.0001   # 0.1 ms histogram bins
+JITTER_BINS = 10000     # up to 1 s; anything later lands in the last bin
+
+class SampleScheduler:
+    """Ticks at absolute deadlines t0 + n * period on time.perf_counter.
+
+    Unlike sleep(period) after each read, query time never stretches the
+    period and the schedule cannot drift or be stepped by NTP. When a tick
+    is missed entirely it is skipped (counted as an overrun) instead of
+    bursting to catch up. period = 0 means run as fast as possible.
+    """
+    def __init__(self, period: float, clock: Callable[[], float] = time.perf_counter):
+        self.period = period
+        self.clock = clock
+        self.t0 = 0.0
+        self.deadline = 0.0
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self._n = 0
+        self._jitterSum = 0.0
+        self._jitterMax = 0.0
+        self._hist = [0] * JITTER_BINS
+
+    def start(self) -> float:
+        self.t0 = self.clock()
+        self.deadline = self.t0
+        self._n = 0
+        return self.t0
+
+    def wait(self, stop: Optional[threading.Event] = None) -> float:
+        """Sleep until the next deadline and return it."""
+        if self.period > 0:
+            now = self.clock()
+            if now > self.deadline and self.ticks:
+                # the previous tick ran past this deadline
+                self.overruns += 1
+                if now > self.deadline + self.period:
+                    # whole ticks were missed: skip ahead rather than burst
+                    missed = math.floor((now - self.deadline) / self.period)
+                    self.skipped += missed
+                    self._n += missed
+                    self.deadline = self.t0 + self._n * self.period
+            delay = self.deadline - self.clock()
+            if delay > 0:
+                if stop is not None:
+                    stop.wait(delay)
+                else:
+                    time.sleep(delay)
+        else:
+            self.deadline = self.clock()
+        return self.deadline
+
+    def tick(self, started: float):
+        """Record that the tick due at self.deadline started at started; advance."""
+        jitter = max(0.0, started - self.deadline)
+        self.ticks += 1
+        self._jitterSum += jitter
+        self._jitterMax = max(self._jitterMax, jitter)
+        self._hist[min(int(jitter / JITTER_BIN_S), JITTER_BINS - 1)] += 1
+        self._n += 1
+        self.deadline = self.t0 + self._n * self.period
+
+    def set_period(self, period: float, now: Optional[float] = None):
+        """Change the period; the new schedule starts at now (default: the next deadline)."""
+        self.period = period
+        self.t0 = self.deadline if now is None else now
+        self.deadline = self.t0
+        self._n = 0
+
+    def slack(self) -> float:
+        """Seconds left before the next deadline (0 when free-running)."""
+        if self.period <= 0:
+            return 0.0
+        return max(0.0, self.deadline - self.clock())
+
+    def jitter_percentile(self, q: float) -> float:
+        target = q / 100 * self.ticks
+        seen = 0
+        for i, count in enumerate(self._hist):
+            seen += count
+            if count and seen >= target:
+                return min((i + 1) * JITTER_BIN_S, self._jitterMax)
+        return 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Timing summary for the run metadata; jitter is start time minus deadline."""
+        return {
+            'period': self.period,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skippedTicks': self.skipped,
+            'jitterMean': self._jitterSum / self.ticks if self.ticks else 0.0,
+            'jitterP99': self.jitter_percentile(99),
+            'jitterMax': self._jitterMax,
+        }
+
+class AdaptiveRate:
+    """Slow polling while the DUT is quiescent, fastest polling around events.
+
+    Switches to fastPeriod when the watched quantity reaches approach *
+    level (e.g. half of burnCurrThreshold) or when burst() is called (a DET
+    line changed), and back to slowPeriod once hold seconds pass without
+    either. With preTrigger > 0 the PSU is polled at fastPeriod all the time
+    instead; quiescent samples are held back preTrigger seconds and thinned
+    to slowPeriod, and on an event the held samples are released at full
+    rate, so the data files get a high-rate pre-trigger history without
+    filling up with idle samples.
+    """
+    def __init__(self, slowPeriod: float, fastPeriod: float, level: float, approach: float = 0.5,
+                 hold: float = 2.0, preTrigger: float = 0.0, source: str = 'curr'):
+        self.slowPeriod = slowPeriod
+        self.fastPeriod = fastPeriod
+        self.level = level
+        self.approach = approach
+        self.hold = hold
+        self.preTrigger = preTrigger
+        self.source = source
+        self.fastUntil = float('-inf')
+
+    @classmethod
+    def from_config(cls, slowPeriod: float, level: float) -> "AdaptiveRate":
+        """The station's burst period, approach, hold and pre-trigger (adbConfig)."""
+        return cls(slowPeriod, cfg.ADAPTIVE_BURST_PERIOD, level, cfg.ADAPTIVE_APPROACH,
+                   cfg.ADAPTIVE_HOLD_S, cfg.ADAPTIVE_PRETRIGGER_S)
+
+    @property
+    def pollPeriod(self) -> float:
+        """Period to poll at while quiescent."""
+        return self.fastPeriod if self.preTrigger > 0 else self.slowPeriod
+
+    def burst(self, now: float):
+        self.fastUntil = now + self.hold
+
+    def fast(self, sample, now: float) -> bool:
+        """Whether to be in fast mode after seeing sample at time now."""
+        if getattr(sample, self.source) >= self.approach * self.level:
+            self.fastUntil = now + self.hold
+        return now < self.fastUntil
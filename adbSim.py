@@ -0,0 +1,496 @@
+"""Simulated DP832 and Analog Discovery for running the test flows without hardware.
+
+SimulatedBoard models the ADB on the EGSE: quiescent current, RBF, the
+internal burn timer, the EGSE BURN line and the two deployment switches.
+SimulatedPsu (a pyvisa resource stand-in) and SimulatedDwf (a stand-in for
+the WaveForms ctypes library) both read and drive the same board, so current
+jumps when BURN is asserted and DET1/DET2 rise when the wires release.
+"""
+import math
+import random
+import socket
+import socketserver
+import threading
+import time
+from ctypes import c_int
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from adbPsu import visa_error, visa_io_error
+
+BURN_PIN, DET1_PIN, DET2_PIN = 0, 1, 2
+
+class SimulatedBoard:
+    """Electrical model of an ADB; all times are on clock (perf_counter)."""
+    def __init__(self, idleCurrent: float = 0.005, rbfCurrent: float = 0.001, burnCurrent: float = 0.8,
+                 timerDelay: Optional[float] = 5.0, deployDelays: Sequence[float] = (0.8, 1.2),
+                 rbfInserted: bool = False, noise: float = 0.0002, dischargeTau: float = 0.3,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.idleCurrent = idleCurrent
+        self.rbfCurrent = rbfCurrent
+        self.burnCurrent = burnCurrent
+        self.timerDelay = timerDelay        # None: no internal timer, only EGSE BURN
+        self.deployDelays = tuple(deployDelays)
+        self.rbfInserted = rbfInserted
+        self.noise = noise
+        self.dischargeTau = dischargeTau    # s, the rail's RC decay once the output is off
+        self.clock = clock
+        self.volt = 0.0
+        self.powered = False
+        self._off: Optional[Tuple[float, float]] = None # (when, rail voltage) at switch-off
+        self.burnPin = False
+        self.switches = [True, True]        # depressed = antenna stowed = DET low
+        self.events: Dict[str, float] = {}  # true event times, for latency measurements
+        self.dioLog: List[Tuple[float, int]] = [(clock(), 0)]
+        self._timerStart: Optional[float] = None
+        self._lock = threading.Lock()
+
+    # --- inputs -----------------------------------------------------------
+    def set_output(self, on: bool, volt: float):
+        with self._lock:
+            if self.powered and not on:
+                self._off = (self.clock(), self.volt)
+            self.volt = volt
+            if on and not self.powered:
+                # a new power cycle: the wires are re-tensioned and the antennas stowed again
+                for name in ('burnOn', 'egseBurn', 'DET1', 'DET2'):
+                    self.events.pop(name, None)
+                self.switches = [True, True]
+                self.events['powerOn'] = self.clock()
+                if not self.rbfInserted:
+                    self._timerStart = self.events['powerOn']
+            if not on:
+                self._timerStart = None
+            self.powered = on
+        self.update()
+
+    def remove_rbf(self):
+        with self._lock:
+            self.rbfInserted = False
+            self.events['rbfRemoved'] = now = self.clock()
+            if self.powered:
+                self._timerStart = now
+
+    def set_burn(self, on: bool):
+        with self._lock:
+            self.burnPin = on
+        self.update()
+
+    def press(self, wire: int, pressed: bool = True):
+        with self._lock:
+            self.switches[wire] = pressed
+        self.update()
+
+    # --- state ------------------------------------------------------------
+    def _burn_start(self) -> Optional[float]:
+        """When the burn began (EGSE BURN or internal timer), or None."""
+        starts = []
+        if 'egseBurn' in self.events:
+            starts.append(self.events['egseBurn'])
+        if self._timerStart is not None and self.timerDelay is not None:
+            t = self._timerStart + self.timerDelay
+            if t <= self.clock():
+                starts.append(t)
+        return min(starts) if starts else None
+
+    def update(self):
+        """Advance the model to now and log any DIO change."""
+        with self._lock:
+            now = self.clock()
+            if self.burnPin and 'egseBurn' not in self.events:
+                self.events['egseBurn'] = now
+            start = self._burn_start() if self.powered else None
+            if start is not None and 'burnOn' not in self.events:
+                self.events['burnOn'] = start
+            if start is not None:
+                for i, name in enumerate(('DET1', 'DET2')):
+                    t = start + self.deployDelays[i]
+                    if t <= now and name not in self.events:
+                        # log the release at its true time, not when it was noticed
+                        self.events[name] = t
+                        self.switches[i] = False
+                        self._log(max(t, self.dioLog[-1][0]))
+            self._log(now)
+
+    def _log(self, t: float):
+        dio = self.dio_now()
+        if dio != self.dioLog[-1][1]:
+            self.dioLog.append((t, dio))
+
+    def dio_now(self) -> int:
+        bits = int(self.burnPin) << BURN_PIN
+        bits |= int(not self.switches[0]) << DET1_PIN
+        bits |= int(not self.switches[1]) << DET2_PIN
+        return bits
+
+    def dio(self) -> int:
+        self.update()
+        return self.dioLog[-1][1]
+
+    def burning(self) -> bool:
+        return 'burnOn' in self.events and not ('DET1' in self.events and 'DET2' in self.events)
+
+    def rail(self) -> float:
+        """Voltage at the board's supply pins; decays exponentially after switch-off."""
+        if self.powered:
+            return self.volt
+        if self._off is None:
+            return 0.0
+        t, volt = self._off
+        return volt * math.exp(-(self.clock() - t) / self.dischargeTau)
+
+    def current(self) -> float:
+        self.update()
+        if not self.powered:
+            return 0.0
+        if self.burning():
+            i = self.burnCurrent
+        elif self.rbfInserted:
+            i = self.rbfCurrent
+        else:
+            i = self.idleCurrent
+        return max(0.0, i + random.gauss(0.0, self.noise))
+
+class SimulatedPsu:
+    """Stand-in for the DP832 pyvisa resource.
+
+    Every query sleeps latency +- jitter. With errorRate a query fails with a
+    VisaIOError timeout (after sleeping the configured timeout, like the real
+    thing); fault windows [(start, duration), ...] relative to construction
+    make every query in them time out, to exercise recovery. boards puts
+    more ADBs on channels 2 and 3, and channelFaults {chan: windows} makes
+    only the queries for that channel time out.
+    """
+    def __init__(self, board: SimulatedBoard, latency: float = 0.002, jitter: float = 0.0005,
+                 errorRate: float = 0.0, faults: Sequence[Tuple[float, float]] = (),
+                 resource_name: str = 'SIM::DP832::INSTR',
+                 boards: Optional[Dict[int, SimulatedBoard]] = None,
+                 channelFaults: Optional[Dict[int, Sequence[Tuple[float, float]]]] = None):
+        self.board = board
+        self.boards = {1: board, **(boards or {})}
+        self.latency = latency
+        self.jitter = jitter
+        self.errorRate = errorRate
+        self.resource_name = resource_name
+        self.timeout = 1000
+        self.created = board.clock()
+        self.faults = [(self.created + start, self.created + start + length) for start, length in faults]
+        self.channelFaults = {chan: [(self.created + start, self.created + start + length) for start, length in windows]
+                              for chan, windows in (channelFaults or {}).items()}
+        self.chan = 1
+        self.channels = {n: {'VOLT': 0.0, 'CURR': 0.0, 'OUTP': False} for n in (1, 2, 3)}
+        self.errors: List[str] = []
+        self.queries = 0
+        self.injected = 0
+
+    def _in_fault(self, chan: Optional[int] = None) -> bool:
+        now = self.board.clock()
+        windows = self.faults + self.channelFaults.get(chan, [])
+        return any(start <= now < end for start, end in windows)
+
+    def _transact(self, chan: Optional[int] = None):
+        self.queries += 1
+        if self._in_fault(chan) or (self.errorRate and random.random() < self.errorRate):
+            self.injected += 1
+            time.sleep(self.timeout / 1000)
+            raise visa_io_error('error_timeout')
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    def _sync_board(self):
+        for chan, board in self.boards.items():
+            ch = self.channels[chan]
+            if ch['OUTP'] != board.powered or ch['VOLT'] != board.volt:
+                board.set_output(ch['OUTP'], ch['VOLT'])
+
+    def write(self, cmd: str):
+        time.sleep(self.latency / 2)
+        parts = cmd.strip().upper().split()
+        head = parts[0] if parts else ''
+        if head == '*RST':
+            for ch in self.channels.values():
+                ch.update(VOLT=0.0, CURR=0.0, OUTP=False)
+            self.chan = 1
+        elif head in ('INST:NSEL', 'INST'):
+            self.chan = int(parts[1].replace('CH', ''))
+        elif head in ('VOLT', 'CURR'):
+            self.channels[self.chan][head] = float(parts[1])
+        elif head == 'OUTP':
+            args = parts[1].split(',')
+            chan = int(args[0].replace('CH', '')) if len(args) > 1 else self.chan
+            self.channels[chan]['OUTP'] = args[-1] in ('ON', '1')
+        else:
+            self.errors.append('-113,"Undefined header"')
+        self._sync_board()
+
+    def _measure(self, chan: int) -> Tuple[float, float, float]:
+        ch = self.channels[chan]
+        if not ch['OUTP']:
+            # the terminals still see the board's rail as it discharges
+            return (self.boards[chan].rail() if chan in self.boards else 0.0), 0.0, 0.0
+        curr = self.boards[chan].current() if chan in self.boards else 0.0
+        return ch['VOLT'], curr, ch['VOLT'] * curr
+
+    def query(self, cmd: str) -> str:
+        parts = cmd.strip().upper().split()
+        head = parts[0]
+        chan = int(parts[1].replace('CH', '')) if len(parts) > 1 and parts[1].startswith('CH') else self.chan
+        self._transact(chan)
+        volt, curr, power = self._measure(chan)
+        if head == 'MEAS:ALL?':
+            return f"{volt:.4f},{curr:.4f},{power:.4f}\n"
+        if head == 'MEAS:VOLT?':
+            return f"{volt:.4f}\n"
+        if head == 'MEAS:CURR?':
+            return f"{curr:.4f}\n"
+        if head == 'MEAS:POWE?':
+            return f"{power:.4f}\n"
+        if head == 'SYST:ERR?':
+            return (self.errors.pop(0) if self.errors else '0,"No error"') + "\n"
+        if head == '*OPC?':
+            return "1\n"
+        if head == '*IDN?':
+            return "RIGOL TECHNOLOGIES,DP832,SIM0000000000,00.01.16\n"
+        self.errors.append('-113,"Undefined header"')
+        time.sleep(self.timeout / 1000)
+        raise visa_io_error('error_timeout')
+
+    def clear(self):
+        time.sleep(self.latency)
+
+    def close(self):
+        pass
+
+class SimulatedResourceManager:
+    """Hands out the simulated PSU; pass as PsuSession(rm=...)."""
+    def __init__(self, psu: SimulatedPsu):
+        self.psu = psu
+        self.opens = 0
+
+    def open_resource(self, address: str):
+        self.opens += 1
+        return self.psu
+
+    def list_resources(self):
+        return (self.psu.resource_name,)
+
+class _ScpiHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        psu = self.server.psu
+        for raw in self.rfile:
+            replies = []
+            try:
+                for cmd in raw.decode('ascii', 'replace').strip().split(';'):
+                    cmd = cmd.strip().lstrip(':')
+                    if not cmd:
+                        continue
+                    with self.server.lock:
+                        if cmd.split()[0].endswith('?'):
+                            replies.append(psu.query(cmd).strip())
+                        else:
+                            psu.write(cmd)
+            except visa_error():
+                continue   # injected fault or unknown header: no reply, the client times out
+            if replies:
+                try:
+                    self.wfile.write((';'.join(replies) + '\n').encode('ascii'))
+                except OSError:
+                    return # the client gave up on this connection (clear() reconnects)
+
+class ScpiServer(socketserver.ThreadingTCPServer):
+    """Raw-socket SCPI stand-in (the DP8xx's LAN port 5555) on a SimulatedPsu.
+
+    Newline-terminated commands; compound commands split on ';' are run in
+    order and their query replies joined with ';' on one line. Headers are
+    always taken from the root, so ';:' and ';' mean the same here.
+    port=0 picks a free port (see address).
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, psu: SimulatedPsu, host: str = '127.0.0.1', port: int = 5555):
+        self.psu = psu
+        self.lock = threading.Lock()
+        super().__init__((host, port), _ScpiHandler)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[:2]
+
+    def start(self):
+        """Serve on a background thread."""
+        threading.Thread(target=self.serve_forever, name="scpi-server", daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class SimulatedDwf:
+    """Stand-in for the WaveForms ctypes library (cdll.dwf) on a SimulatedBoard.
+
+    Covers the digital IO calls adbFullFunctional.py makes and the digital-in
+    recorder calls DwfRecorder makes. Each call costs latency seconds, like a
+    USB transaction.
+    """
+    def __init__(self, board: SimulatedBoard, latency: float = 0.001):
+        self.board = board
+        self.latency = latency
+        self.hz = 100e6
+        self.divider = 1
+        self.calls = 0
+        self._snapshot = 0
+        self._recording = False
+        self._recStart = 0.0
+        self._recSent = 0
+        self._pending = b''
+
+    def _usb(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    # device
+    def FDwfDeviceOpen(self, index, phdwf):
+        phdwf._obj.value = 1
+        return 1
+
+    def FDwfDeviceClose(self, hdwf):
+        return 1
+
+    # digital IO
+    def FDwfDigitalIOOutputEnableSet(self, hdwf, mask):
+        return 1
+
+    def FDwfDigitalIOInputEnableSet(self, hdwf, mask):
+        return 1
+
+    def FDwfDigitalIOOutputSet(self, hdwf, value):
+        self._usb()
+        self.board.set_burn(bool(value.value & (1 << BURN_PIN)))
+        return 1
+
+    def FDwfDigitalIOStatus(self, hdwf):
+        self._usb()
+        self._snapshot = self.board.dio()
+        return 1
+
+    def FDwfDigitalIOInputStatus(self, hdwf, pdw):
+        pdw._obj.value = self._snapshot
+        return 1
+
+    # digital-in recorder
+    def FDwfDigitalInReset(self, hdwf):
+        self._recording = False
+        return 1
+
+    def FDwfDigitalInInternalClockInfo(self, hdwf, phz):
+        phz._obj.value = self.hz
+        return 1
+
+    def FDwfDigitalInDividerSet(self, hdwf, divider):
+        self.divider = divider.value
+        return 1
+
+    def FDwfDigitalInSampleFormatSet(self, hdwf, bits):
+        return 1
+
+    def FDwfDigitalInAcquisitionModeSet(self, hdwf, mode):
+        return 1
+
+    def FDwfDigitalInTriggerSourceSet(self, hdwf, source):
+        return 1
+
+    def FDwfDigitalInTriggerPositionSet(self, hdwf, position):
+        return 1
+
+    def FDwfDigitalInConfigure(self, hdwf, reconfigure, start):
+        self._recording = bool(start.value)
+        self._recStart = self.board.clock()
+        self._recSent = 0
+        return 1
+
+    def FDwfDigitalInStatus(self, hdwf, readData, psts):
+        self._usb()
+        psts._obj.value = 3   # running
+        rate = self.hz / self.divider
+        self.board.update()
+        end = int((self.board.clock() - self._recStart) * rate)
+        # replay the board's DIO log as samples, one run per logged level
+        out = bytearray()
+        pos = self._recSent
+        log = self.board.dioLog
+        for i, (t, level) in enumerate(log):
+            lo = max(pos, int((t - self._recStart) * rate))
+            hi = min(end, int((log[i + 1][0] - self._recStart) * rate)) if i + 1 < len(log) else end
+            if hi > lo:
+                out += bytes([level]) * (hi - lo)
+        self._pending = bytes(out)
+        self._recSent = end
+        return 1
+
+    def FDwfDigitalInStatusRecord(self, hdwf, pAvailable, pLost, pCorrupted):
+        pAvailable._obj.value = len(self._pending)
+        pLost._obj.value = 0
+        pCorrupted._obj.value = 0
+        return 1
+
+    def FDwfDigitalInStatusData(self, hdwf, buffer, count):
+        n = count.value
+        buffer[:n] = self._pending[:n]
+        return 1
+
+class _SimPin:
+    def __init__(self, device: "SimulatedDevice", pin: int):
+        self.device = device
+        self.pin = pin
+
+    def setup(self, enabled: bool = False, state: bool = False, configure: bool = False):
+        if enabled:
+            self.output_state = state
+
+    @property
+    def output_state(self) -> bool:
+        return bool(self.device.outputs & (1 << self.pin))
+
+    @output_state.setter
+    def output_state(self, value: bool):
+        bit = 1 << self.pin
+        self.device.outputs = self.device.outputs | bit if value else self.device.outputs & ~bit
+        self.device.dwf.FDwfDigitalIOOutputSet(self.device.hdwf, c_int(self.device.outputs))
+
+    @property
+    def input_state(self) -> bool:
+        return bool(self.device.status & (1 << self.pin))
+
+class _SimDigitalIO:
+    def __init__(self, device: "SimulatedDevice"):
+        self.device = device
+        self._pins = [_SimPin(device, n) for n in range(16)]
+
+    def __getitem__(self, pin: int) -> _SimPin:
+        return self._pins[pin]
+
+    def read_status(self):
+        self.device.dwf.FDwfDigitalIOStatus(self.device.hdwf)
+        self.device.status = self.device.dwf._snapshot
+
+class SimulatedDevice:
+    """Stand-in for dwfpy.Device (the parts adbBurnToDeploy.py uses).
+
+    handle works with DwfRecorder(SimulatedDwf, device.handle).
+    """
+    def __init__(self, dwf: SimulatedDwf):
+        self.dwf = dwf
+        self.hdwf = c_int(1)
+        self.handle = 1
+        self.outputs = 0
+        self.status = 0
+        self.digital_io = _SimDigitalIO(self)
+
+    def close(self):
+        pass
+
+def open_simulated(board: Optional[SimulatedBoard] = None, **psuOptions):
+    """Return (board, SimulatedPsu, SimulatedDwf, hdwf) wired together."""
+    board = board or SimulatedBoard()
+    return board, SimulatedPsu(board, **psuOptions), SimulatedDwf(board), c_int(1)
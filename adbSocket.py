@@ -0,0 +1,225 @@
+"""Raw-socket SCPI transport for the DP8xx (LAN port 5555), an alternative to VISA.
+
+SocketResource behaves like the pyvisa resource PsuSession expects (query,
+write, clear, close, timeout) over one persistent TCP connection with
+TCP_NODELAY, and raises VisaIOError on timeouts and lost connections so
+PsuSession.recover() works unchanged. query_many() pipelines several
+queries in one write ('MEAS:CURR?;:MEAS:VOLT?;:MEAS:POWE?') and splits the
+one ';'-separated reply; measure_each() uses it when the transport has it.
+
+Use it with PsuSession(address, rm=SocketResourceManager()), or station-wide
+with ADB_PSU_TRANSPORT=socket and ADB_PSU_ADDRESS=TCPIP0::<ip>::5555::SOCKET.
+Compare the links of a station, or try it against adbSim's stand-in server:
+
+    python adbSocket.py compare --visa USB0::0x1AB1::0x0E11::DP8C234305873::INSTR --socket 192.168.1.50
+    python adbSocket.py compare --sim
+    python adbSocket.py serve --port 5555
+"""
+import argparse
+import json
+import socket
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from adbPsu import visa_io_error
+
+DEFAULT_PORT = 5555
+
+def parse_address(address: str, port: int = DEFAULT_PORT) -> Tuple[str, int]:
+    """'TCPIP0::10.0.0.5::5555::SOCKET', '10.0.0.5:5555' or '10.0.0.5' -> (host, port)."""
+    if '::' in address:
+        parts = address.split('::')
+        if len(parts) < 3 or not parts[0].upper().startswith('TCPIP') or parts[-1].upper() != 'SOCKET':
+            raise ValueError(f"not a TCPIP socket resource: {address!r}")
+        return parts[1], int(parts[2])
+    host, _, p = address.rpartition(':') if ':' in address else (address, '', '')
+    return host, int(p) if p else port
+
+class SocketResource:
+    """SCPI over a persistent raw TCP connection, newline-terminated both ways.
+
+    clear() reconnects rather than draining, so a late reply to a query that
+    timed out can never be taken for the answer to the next one.
+    """
+    transport = 'socket'
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, timeout: int = 1000):
+        self.host = host
+        self.port = port
+        self.resource_name = f"TCPIP::{host}::{port}::SOCKET"
+        self._timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._buf = b''
+        self.open()
+
+    @property
+    def timeout(self) -> int:
+        """In ms, as in pyvisa."""
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, ms: int):
+        self._timeout = ms
+        if self._sock is not None:
+            self._sock.settimeout(ms / 1000)
+
+    def open(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self._timeout / 1000)
+        except socket.timeout as e:
+            raise visa_io_error('error_timeout') from e
+        except OSError as e:
+            raise visa_io_error('error_connection_lost') from e
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._sock = sock
+        self._buf = b''
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def clear(self):
+        self.close()
+        self.open()
+
+    def _send(self, cmd: str):
+        if self._sock is None:
+            self.open()
+        try:
+            self._sock.sendall(cmd.encode('ascii') + b'\n')
+        except socket.timeout as e:
+            raise visa_io_error('error_timeout') from e
+        except OSError as e:
+            raise visa_io_error('error_connection_lost') from e
+
+    def _readline(self) -> str:
+        while b'\n' not in self._buf:
+            try:
+                chunk = self._sock.recv(4096)
+            except socket.timeout as e:
+                raise visa_io_error('error_timeout') from e
+            except OSError as e:
+                raise visa_io_error('error_connection_lost') from e
+            if not chunk:
+                raise visa_io_error('error_connection_lost')
+            self._buf += chunk
+        line, _, self._buf = self._buf.partition(b'\n')
+        return line.decode('ascii').rstrip('\r')
+
+    def write(self, cmd: str):
+        self._send(cmd)
+
+    def query(self, cmd: str) -> str:
+        self._send(cmd)
+        return self._readline()
+
+    def query_many(self, cmds: Sequence[str]) -> List[str]:
+        """Send queries as one compound command and return one reply each."""
+        self._send(';:'.join(c.strip().lstrip(':') for c in cmds))
+        replies = self._readline().split(';')
+        if len(replies) != len(cmds):
+            raise ValueError(f"expected {len(cmds)} replies, got {replies!r}")
+        return replies
+
+class SocketResourceManager:
+    """pyvisa ResourceManager stand-in handing out SocketResources; pass as PsuSession(rm=...)."""
+    def __init__(self, port: int = DEFAULT_PORT):
+        self.port = port
+        self.opened: List[str] = []
+
+    def open_resource(self, address: str) -> SocketResource:
+        host, port = parse_address(address, self.port)
+        resource = SocketResource(host, port)
+        self.opened.append(resource.resource_name)
+        return resource
+
+    def list_resources(self) -> Tuple[str, ...]:
+        return tuple(self.opened)
+
+def time_calls(fn, n: int) -> List[float]:
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def compare(sessions: Dict[str, object], n: int = 200, chan: int = 1) -> Dict[str, Dict]:
+    """Latency per transport of MEAS:ALL?, three separate queries and the same three pipelined."""
+    from adbBench import percentiles
+    from adbPsu import measure_all
+    ch = f" CH{chan}"
+    three = [f'MEAS:VOLT?{ch}', f'MEAS:CURR?{ch}', f'MEAS:POWE?{ch}']
+    results = {}
+    for name, psu in sessions.items():
+        modes = {
+            'MEAS:ALL?': lambda: measure_all(psu, chan),
+            'three queries': lambda: [psu.query(q) for q in three],
+            'three pipelined': lambda: psu.query_many(three),
+        }
+        results[name] = {mode: percentiles(time_calls(fn, n)) for mode, fn in modes.items()}
+    return results
+
+def print_comparison(results: Dict[str, Dict]):
+    for name, modes in results.items():
+        print(f"{name}:")
+        for mode, p in modes.items():
+            print(f"  {mode:<16} p50 {p['p50'] * 1000:7.3f} ms, p99 {p['p99'] * 1000:7.3f} ms, max {p['max'] * 1000:7.3f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raw-socket SCPI transport: compare links or run the stand-in server.")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    cmp = sub.add_parser('compare', help="latency per transport")
+    cmp.add_argument('--visa', help="VISA resource of the PSU")
+    cmp.add_argument('--socket', help="host[:port] or TCPIP::host::port::SOCKET of the same PSU")
+    cmp.add_argument('--sim', action='store_true', help="compare adbSim's PSU in-process and behind the stand-in server")
+    cmp.add_argument('--latency', type=float, default=0.0005, help="simulated instrument latency per query, s")
+    cmp.add_argument('-n', type=int, default=200, help="calls per mode")
+    cmp.add_argument('--chan', type=int, default=1)
+    cmp.add_argument('--json', help="also write the results to this file")
+    srv = sub.add_parser('serve', help="SCPI stand-in server on a simulated DP832")
+    srv.add_argument('--host', default='127.0.0.1')
+    srv.add_argument('--port', type=int, default=DEFAULT_PORT)
+    srv.add_argument('--latency', type=float, default=0.002, help="simulated instrument latency per query, s")
+    args = parser.parse_args()
+
+    from adbPsu import PsuSession
+    if args.cmd == 'serve':
+        from adbSim import ScpiServer, SimulatedBoard, SimulatedPsu
+        server = ScpiServer(SimulatedPsu(SimulatedBoard(), latency=args.latency, jitter=0.0), args.host, args.port)
+        print(f"Serving a simulated DP832 on {server.address[0]}:{server.address[1]} (Ctrl-C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    else:
+        sessions = {}
+        server = None
+        if args.sim:
+            from adbSim import ScpiServer, SimulatedBoard, SimulatedPsu, SimulatedResourceManager
+            sim = SimulatedPsu(SimulatedBoard(), latency=args.latency, jitter=0.0)
+            server = ScpiServer(sim, port=0)
+            server.start()
+            sessions['sim (in-process)'] = PsuSession(address=sim.resource_name, rm=SimulatedResourceManager(sim))
+            sessions['socket (stand-in)'] = PsuSession(address=f"127.0.0.1:{server.address[1]}", rm=SocketResourceManager())
+        if args.visa:
+            import pyvisa
+            sessions['visa'] = PsuSession(address=args.visa, rm=pyvisa.ResourceManager())
+        if args.socket:
+            sessions['socket'] = PsuSession(address=args.socket, rm=SocketResourceManager())
+        if not sessions:
+            parser.error("give --visa and/or --socket, or --sim")
+        for psu in sessions.values():
+            psu.write(f'INST:NSEL {args.chan}')
+            psu.write('OUTP ON')
+        results = compare(sessions, args.n, args.chan)
+        for psu in sessions.values():
+            psu.write('OUTP OFF')
+            psu.close()
+        if server is not None:
+            server.stop()
+        print_comparison(results)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,242 @@
+"""Streaming run statistics, updated per sample in O(1).
+
+StreamStats is fed every sample as it is consumed and keeps, per segment
+(timer, burn, ...) and for the whole run, Welford mean/variance, min/max
+and trapezoidal energy and charge, plus gap counts and log-binned current
+percentiles. summary() returns the same layout as adbAnalysis.run_summary,
+so the result files and the run index are written without another pass
+over the samples, and the running values can be shown while the test runs.
+"""
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from adbAnalysis import GAP_THRESHOLD, PERCENTILES
+import adbConfig as cfg
+
+class Running:
+    """Welford mean/variance with min and max for one quantity."""
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float):
+        self.count += 1
+        d = x - self.mean
+        self.mean += d / self.count
+        self.m2 += d * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+class LogHistogram:
+    """Counts on log-spaced bins (binsPerDecade per decade from lo to hi).
+
+    Percentiles come back to within one bin, ~1.2 % at the default 200 bins
+    per decade; values <= lo land in the first bin, values >= hi in the last.
+    """
+    def __init__(self, lo: float = 1e-6, hi: float = 10.0, binsPerDecade: int = 200):
+        self.lo = lo
+        self.scale = binsPerDecade
+        self.bins = [0] * (int(math.ceil(math.log10(hi / lo) * binsPerDecade)) + 1)
+        self.count = 0
+        self.max = -math.inf
+
+    def add(self, x: float):
+        k = int(math.log10(x / self.lo) * self.scale) if x > self.lo else 0
+        self.bins[min(k, len(self.bins) - 1)] += 1
+        self.count += 1
+        if x > self.max:
+            self.max = x
+
+    def percentile(self, q: float) -> float:
+        target = q / 100 * self.count
+        seen = 0
+        for k, n in enumerate(self.bins):
+            seen += n
+            if n and seen >= target:
+                # upper edge of the bin, never above what was actually seen
+                return min(self.lo * 10 ** ((k + 1) / self.scale), self.max)
+        return 0.0
+
+class SegmentStats:
+    """Running statistics of one segment."""
+    def __init__(self):
+        self.volt = Running()
+        self.curr = Running()
+        self.power = Running()
+        self.currHist = LogHistogram()
+        self.energy = 0.0
+        self.charge = 0.0
+        self.duration = 0.0
+        self.start: Optional[float] = None
+
+    def add_point(self, s):
+        if self.start is None:
+            self.start = s.t
+        self.volt.add(s.volt)
+        self.curr.add(s.curr)
+        self.power.add(s.power)
+        self.currHist.add(s.curr)
+
+    def add_interval(self, a, b, start: Optional[float] = None, end: Optional[float] = None):
+        """Trapezoid from sample a to b; split at a segment boundary, only this segment's part.
+
+        Up to the boundary (end) the quantity is held at a's level; from it
+        (start) the segment gets the rest of the trapezoid, as
+        adbAnalysis.segment_stats splits it.
+        """
+        dt = b.t - a.t
+        energy = 0.5 * dt * (a.power + b.power)
+        charge = 0.5 * dt * (a.curr + b.curr)
+        if end is not None:
+            dt = end - a.t
+            energy = a.power * dt
+            charge = a.curr * dt
+        elif start is not None:
+            held = start - a.t
+            dt -= held
+            energy -= a.power * held
+            charge -= a.curr * held
+        self.duration += dt
+        self.energy += energy
+        self.charge += charge
+
+    @property
+    def power_avg(self) -> float:
+        """Time-weighted average power so far (energy / duration)."""
+        return self.energy / self.duration if self.duration > 0 else self.power.mean
+
+    def stats(self) -> Dict[str, float]:
+        """Same keys as adbAnalysis.segment_stats, plus standard deviations.
+
+        power_avg is time-weighted, as live, so bursts of fast samples don't
+        pull it towards the burst.
+        """
+        n = self.curr.count
+        out = {
+            'samples': n,
+            'duration': self.duration,
+            'volt_avg': self.volt.mean,
+            'curr_avg': self.curr.mean,
+            'power_avg': self.power_avg,
+            'energy': self.energy,
+            'charge': self.charge,
+            'curr_peak': self.curr.max if n else 0.0,
+            'power_peak': self.power.max if n else 0.0,
+            'volt_std': self.volt.std,
+            'curr_std': self.curr.std,
+            'power_std': self.power.std,
+        }
+        if n:
+            for q in PERCENTILES:
+                out[f'curr_p{q}'] = self.currHist.percentile(q)
+        return out
+
+class StreamStats:
+    """Whole-run and per-segment statistics, fed one sample at a time.
+
+    Samples are committed lag samples late, so a debounced trigger can
+    start a segment at its first sample past the level (mark(name, at=index,
+    t=crossing time)) without undoing anything; finish() commits the rest.
+    The interval leading into that sample is split at t, as
+    adbAnalysis.summarize splits it.
+    """
+    def __init__(self, segment: str = 'run', lag: int = cfg.TRIGGER_DEBOUNCE, maxGap: float = GAP_THRESHOLD):
+        self.lag = lag
+        self.maxGap = maxGap
+        self.overall = SegmentStats()
+        self.segments: Dict[str, SegmentStats] = {segment: SegmentStats()}
+        self.order: List[str] = [segment]
+        self.starts: Dict[str, int] = {segment: 0}
+        self.gaps = 0
+        self.downtime = 0.0
+        self.samples = 0          # fed, committed or not
+        self.lastTime = 0.0
+        self._pending = deque()   # (index, sample) not yet committed
+        self._marks: Dict[int, Tuple[str, Optional[float]]] = {}
+        self._prev = None         # last committed sample
+        self._current = segment
+        self._committed = 0
+
+    def feed(self, s):
+        self._pending.append((self.samples, s))
+        self.samples += 1
+        self.lastTime = s.t
+        while len(self._pending) > self.lag:
+            self._commit(*self._pending.popleft())
+
+    def mark(self, name: str, at: Optional[int] = None, t: Optional[float] = None):
+        """Start segment name at sample index at (default: the next sample fed).
+
+        t is when it started, between samples at-1 and at (a trigger's
+        interpolated crossing); without it the whole interval goes to name.
+        """
+        at = self.samples if at is None else at
+        if at < self._committed:
+            raise ValueError(f"segment start {at} is more than lag={self.lag} samples back")
+        self._marks[at] = (name, t)
+        self.segments.setdefault(name, SegmentStats())
+        self.order.append(name)
+        self.starts[name] = at
+
+    def finish(self):
+        while self._pending:
+            self._commit(*self._pending.popleft())
+
+    def _commit(self, index: int, s):
+        prev = self._prev
+        mark = self._marks.pop(index, None)
+        if prev is not None:
+            if mark is None:
+                self.segments[self._current].add_interval(prev, s)
+            else:
+                split = prev.t if mark[1] is None else min(max(mark[1], prev.t), s.t)
+                self.segments[self._current].add_interval(prev, s, end=split)
+                self.segments[mark[0]].add_interval(prev, s, start=split)
+                self.segments[mark[0]].start = split
+            self.overall.add_interval(prev, s)
+            if s.t - prev.t > self.maxGap:
+                self.gaps += 1
+                self.downtime += s.t - prev.t
+        if mark is not None:
+            self._current = mark[0]
+        self.segments[self._current].add_point(s)
+        self.overall.add_point(s)
+        self._prev = s
+        self._committed = index + 1
+
+    def segment(self, name: str) -> Dict[str, float]:
+        return self.segments[name].stats()
+
+    def summary(self, test: str = 'unknown', burnSegment: Optional[str] = 'burn',
+                triggerTime: Optional[float] = None) -> Dict[str, object]:
+        """run_summary()-compatible dict; call finish() first."""
+        out: Dict[str, object] = {
+            'overall': self.overall.stats(),
+            'gaps': self.gaps,
+            'downtime': self.downtime,
+            'burnIndex': self.starts.get(burnSegment),
+            'test': test,
+            'samples': self.overall.curr.count,
+            'finalTime': self._prev.t if self._prev is not None else 0.0,
+        }
+        if out['burnIndex'] is not None:
+            out['timer'] = self.segments[self.order[0]].stats()
+            out['burn'] = self.segments[burnSegment].stats()
+        out['triggerTime'] = (triggerTime if triggerTime is not None else
+                              self.segments[burnSegment].start if out['burnIndex'] is not None else out['finalTime'])
+        return out
@@ -0,0 +1,141 @@
+import csv
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+from adbAcquisition import Acquisition, Sample
+from adbProfile import note_result, timed
+from adbPyramid import PyramidWriter, pyramid_path
+from adbRunFormat import RunWriter
+
+class _Sink(threading.Thread):
+    """Drains its own acquisition queue on a separate thread.
+
+    Subclasses format and write rows here, never on the sampling thread, and
+    flush every flushInterval / fsync every fsyncInterval seconds so a crash
+    or Ctrl-C loses at most the last interval.
+    """
+    def __init__(self, engine: Acquisition, flushInterval: float = 1.0, fsyncInterval: float = 10.0):
+        super().__init__(name=type(self).__name__, daemon=True)
+        self.queue = engine.reader()
+        self.flushInterval = flushInterval
+        self.fsyncInterval = fsyncInterval
+        self.rows = 0
+        self._done = threading.Event()
+        # timed as CsvSink.write, RunSink.fsync, ... with ADB_PROFILE
+        for step in ('write', 'flush', 'fsync'):
+            setattr(self, '_' + step, timed(f"{self.name}.{step}", getattr(self, '_' + step)))
+
+    def stop(self):
+        """Write everything still queued, fsync and close the file."""
+        self._done.set()
+        self.join()
+
+    def _write(self, samples: List[Sample]):
+        raise NotImplementedError
+
+    def _flush(self):
+        raise NotImplementedError
+
+    def _fsync(self):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+    def run(self):
+        lastSync = time.monotonic()
+        try:
+            while not self._done.is_set():
+                samples = self.queue.get_all(timeout=self.flushInterval)
+                self._write(samples)
+                self.rows += len(samples)
+                self._flush()
+                if time.monotonic() - lastSync >= self.fsyncInterval:
+                    self._fsync()
+                    lastSync = time.monotonic()
+            samples = self.queue.get_all()
+            self._write(samples)
+            self.rows += len(samples)
+        finally:
+            self._close()
+
+class CsvSink(_Sink):
+    """Streams samples to a CSV file while the test runs, instead of dumping lists at the end."""
+    def __init__(self, engine: Acquisition, path: str, header: Sequence[str],
+                 row: Callable[[Sample], List[str]], **kwargs):
+        super().__init__(engine, **kwargs)
+        self.path = path
+        self.row = row
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(header)
+
+    def _write(self, samples: List[Sample]):
+        self._writer.writerows(self.row(s) for s in samples)
+
+    def _flush(self):
+        self._file.flush()
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+
+    def _close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+class RunSink(_Sink):
+    """Streams samples to a columnar .adbrun file (see adbRunFormat).
+
+    Fill in header (thresholds, segment indices, ...) before stop(); it is
+    written when the file is finalized. The decimation pyramid is built
+    alongside and written next to it (see adbPyramid); pyramid.query()
+    works while the run goes on.
+    """
+    def __init__(self, engine: Acquisition, path: str, columns: Sequence[str],
+                 row: Callable[[Sample], Sequence[float]], header: Optional[Dict] = None, **kwargs):
+        super().__init__(engine, **kwargs)
+        self.path = path
+        self.row = row
+        self.header = dict(header or {})
+        self._writer = RunWriter(path, columns)
+        self.pyramid = PyramidWriter(pyramid_path(path), columns)
+
+    def _write(self, samples: List[Sample]):
+        rows = [self.row(s) for s in samples]
+        for row in rows:
+            self._writer.append(row)
+        self.pyramid.extend(rows)
+
+    def _flush(self):
+        self._writer.flush()
+
+    def _fsync(self):
+        self._writer.fsync()
+
+    def _close(self):
+        self._writer.close(self.header)
+        self.pyramid.close({'source': os.path.basename(self.path)})
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w', **kwargs):
+    """open() replacement that only makes the file appear once it is complete.
+
+    Writes to path + '.tmp', fsyncs and renames over path on success; on an
+    exception the partial file is removed and path is left untouched.
+    """
+    note_result(path) # the profile, if any, goes next to it
+    tmp = path + '.tmp'
+    f = open(tmp, mode, **kwargs)
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp, path)
+    except BaseException:
+        f.close()
+        os.remove(tmp)
+        raise
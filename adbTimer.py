@@ -1,11 +1,17 @@
-import pyvisa
+import argparse
+import os
 import time
-import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from pyvisa.errors import VisaIOError
-
-psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-psu.timeout = 1000
+from adbPsu import PsuSession, wait_discharged
+from adbAcquisition import Acquisition, Display, report_psu_error
+from adbScheduler import AdaptiveRate
+from adbRunIndex import register_run
+from adbStats import StreamStats
+from adbProfile import note_result
+from adbStreamWriter import CsvSink, RunSink
+from adbPyramid import LiveView
+from adbTrigger import script_trigger, trigger_settings
 
 def format_time(seconds: float) -> str:
     minutes = int(seconds) // 60
@@ -16,130 +22,167 @@ chan1 = 1
 volt7V2 = 7.2
 currThreshold = 0.5
 currLim = 3.0
-iterations = 1
+samplePeriod = 0.25 # quiescent polling interval (sets the timer resolution); bursts near currThreshold run as fast as VISA allows
 maxIterations = 2
 
-psu.write('*RST') # resets to default state
-psu.write(f'INST:NSEL {chan1}') # select channel 1
-psu.write(f'VOLT {volt7V2}') # set voltage
-psu.write(f'CURR {currLim}') # set current limit
-
-time.sleep(0.2)
-
-# keep cumulative results across iterations
-iterTime = []
-iterVolt = []
-iterCurr = []
-iterPower = []
-iterEnergy = []
-
-print("Starting timer test...\n")
-
-while iterations<=maxIterations:
-    psu.write(f'INST:NSEL {chan1}')
-    psu.write('OUTP ON')
-
-    t0 = time.time() #start time
-
-    print("Output enabled.\n")
-
-    testing = True
-
-    timeElapsed = 0.0
-    pollTime = []
-    curr = []
-    power = []
-    volt = []
-    errorLog = []
-    errors = 0
-    errorCountTotal = 0
-
-    psu.write(f'INST:NSEL {chan1}')
-    while testing:
-        try:
-            volt_val = float(psu.query('MEAS:VOLT?'))
-            curr_val = float(psu.query('MEAS:CURR?'))
-            pow_val = float(psu.query('MEAS:POWE?'))
-            time.sleep(0.25) #polling interval
-        except VisaIOError:
-            print("VisaIOError!")
-            psu.clear()          # clears IO buffers
-            time.sleep(0.01)
-            errors += 1
-            if errors > 5:
-                 psu.clear()
- #               psu.close()
- #               time.sleep(2)
- #               psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
-                 errorCountTotal += 1
-                 print("PSU connection reset due to repeated timeouts; error count updated to: " + str(errorCountTotal))
- #               psu.timeout = 1000
- #               psu.write('*RST') # resets to default state
- #               psu.write(f'INST:NSEL {chan1}') # select channel 1
- #               psu.write(f'VOLT {volt7V2}') # set voltage
- #               psu.write(f'CURR {currLim}') # set current limit
- #               psu.write(f'INST:NSEL {chan1}')
- #               psu.write('OUTP ON')
-            continue             # retry loop
-        timeElapsed = time.time() - t0
-
-        print(f"Time: {format_time(timeElapsed)}, Voltage: {volt_val:.3f}, Current: {curr_val:.3f} A, Power: {pow_val:.3f} W, Errors: {errorCountTotal}")
-
-        if curr_val >= currThreshold: testing = False
-
-        curr.append(curr_val)
-        power.append(pow_val)
-        volt.append(volt_val)
-        errorLog.append(errorCountTotal)
-        pollTime.append(timeElapsed)
-        if (timeElapsed % 60) < 0.25:
-            err = psu.query('SYST:ERR?')
-            if not err.startswith('0'):
-                print("PSU error:", err)
-
-    print(f"Test #{iterations} complete; Current spike detected\n")
-    print(f"Time elapsed: {format_time(timeElapsed)}\n")
-
-    print("Resetting...\n")
-    psu.write('INST:NSEL 1')
-    psu.write('OUTP OFF')
-    time.sleep(3)
-
-    # per-iteration file with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20260112_153045
-    filename = f"timer_test_{iterations}_{timestamp}_data.csv"
-
-    with open(filename, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Time (MM:SS.mmm)', 'Current (A)', 'Power (W)', 'Voltage (V)', 'Errors/Interrupts Total'])
-        for t, c, p, v, e in zip(pollTime, curr, power, volt, errorLog):
-            writer.writerow([format_time(t), f"{c:.6f}", f"{p:.6f}", f"{v:.6f}", e])
-
-    print("Data saved to " + filename)
-
-    iterTime.append(timeElapsed)
-    iterVolt.append((sum(volt)-curr[-1])/(len(volt)-1) if volt else 0)
-    iterCurr.append((sum(curr)-curr[-1])/(len(curr)-1) if curr else 0)
-    iterPower.append((sum(power)-power[-1])/(len(power)-1) if power else 0)
-    iterEnergy.append(iterPower[-1]*iterTime[-1])
-
-    iterations += 1
-
-final_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-results_filename = f"final_results_{final_ts}.txt"
-with open(results_filename, "w") as f:
-    f.write("Final Results:\n")
-    f.write(f"average time: {format_time(sum(iterTime)/len(iterTime))}\n")
-    f.write(f"average voltage: {sum(iterVolt)/len(iterVolt):.6f} V\n")
-    f.write(f"average current: {sum(iterCurr)/len(iterCurr):.6f} A\n")
-    f.write(f"average power: {sum(iterPower)/len(iterPower):.6f} W\n")
-    f.write(f"average energy: {sum(iterEnergy)/len(iterEnergy):.6f} J\n\n")
-    f.write("Individual Iteration Results:\n")
-    for i in range(len(iterTime)):
-        f.write(f"Iteration {i+1}: Time = {format_time(iterTime[i])}, ")
-        f.write(f"Average voltage = {iterVolt[i]:.6f} V, ")
-        f.write(f"Average current = {iterCurr[i]:.6f} A, ")
-        f.write(f"Average power = {iterPower[i]:.6f} W, ")
-        f.write(f"Total energy = {iterEnergy[i]:.6f} J\n")
-
-print("Final results saved to " + results_filename)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Timer test: time from power-on to the burn current, over several iterations.")
+    parser.add_argument('--iterations', type=int, default=maxIterations, help=f"power cycles to time (default {maxIterations})")
+    args = parser.parse_args(argv)
+
+    psu = PsuSession() # address found or cached, timeout from adbConfig
+    iterations = 1
+
+    psu.write('*RST') # resets to default state
+    psu.write(f'INST:NSEL {chan1}') # select channel 1
+    psu.write(f'VOLT {volt7V2}') # set voltage
+    psu.write(f'CURR {currLim}') # set current limit
+
+    time.sleep(0.2)
+
+    # keep cumulative results across iterations
+    iterTime = []
+    iterVolt = []
+    iterCurr = []
+    iterPower = []
+    iterEnergy = []
+
+    # per-iteration lines are appended (and fsynced) as each iteration's post-processing completes;
+    # the averages follow at the end
+    final_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_filename = f"final_results_{final_ts}.txt"
+    note_result(results_filename) # the profile, if any, goes next to it
+    results = open(results_filename, 'w')
+    results.write("Individual Iteration Results:\n")
+    results.flush()
+
+    def finish_iteration(iteration: int, engine: Acquisition, sink: CsvSink, runSink: RunSink,
+                         stats: StreamStats, hit, timeElapsed: float):
+        """Close iteration's files, summarize it and stream its line; runs on the post-processing worker."""
+        sink.stop()
+        runSink.header.update(triggerIndex=hit.index, triggerTime=hit.t)
+        runSink.header.update(timing=engine.timing(), rateChanges=engine.rateLog) # (t, period) per rate switch
+        runSink.stop()
+        print("Data saved to " + sink.path)
+
+        # averages and energy cover the timer segment, i.e. everything before the spike
+        stats.finish()
+        summary = stats.summary('timer_test', triggerTime=hit.t)
+        register_run(runSink.path)
+        timerSeg = summary['timer']
+        iterTime.append(timeElapsed)
+        iterVolt.append(timerSeg['volt_avg'])
+        iterCurr.append(timerSeg['curr_avg'])
+        iterPower.append(timerSeg['power_avg'])
+        iterEnergy.append(timerSeg['energy'])
+
+        results.write(f"Iteration {iteration}: Time = {format_time(timeElapsed)}, ")
+        results.write(f"Average voltage = {timerSeg['volt_avg']:.6f} V, ")
+        results.write(f"Average current = {timerSeg['curr_avg']:.6f} A, ")
+        results.write(f"Average power = {timerSeg['power_avg']:.6f} W, ")
+        results.write(f"Total energy = {timerSeg['energy']:.6f} J\n")
+        results.flush()
+        os.fsync(results.fileno())
+
+    # one worker, so iterations are finished in order; iteration N's files and stats are done
+    # there while the output discharges, and checked before N+1 powers up
+    post = ThreadPoolExecutor(max_workers=1, thread_name_prefix='timer-post')
+    pending = []
+    engine = None
+
+    print("Starting timer test...\n")
+
+    try:
+        while iterations<=args.iterations:
+            if pending:
+                # the last iteration was finished during the reset; its errors surface here
+                pending[-1].result()
+            psu.write(f'INST:NSEL {chan1}')
+            psu.write('OUTP ON')
+
+            print("Output enabled.\n")
+
+            testing = True
+
+            timeElapsed = 0.0
+            stats = StreamStats(segment='timer') # summary values, updated per sample
+
+            psu.write(f'INST:NSEL {chan1}')
+            engine = Acquisition(psu, chan1, adaptive=AdaptiveRate.from_config(samplePeriod, currThreshold))
+            samples = engine.reader()
+            display = Display(engine, lambda s: f"Time: {format_time(s.t)}, Voltage: {s.volt:.3f}, Current: {s.curr:.3f} A, Power: {s.power:.3f} W, Errors: {engine.errors}, Energy: {stats.overall.energy:.3f} J, Avg power: {stats.overall.power_avg:.3f} W")
+            engine.every(60, 'SYST:ERR?', report_psu_error) # fitted into idle slack
+
+            # per-iteration file with timestamp, written while the test runs
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20260112_153045
+            filename = f"timer_test_{iterations}_{timestamp}_data.csv"
+            sink = CsvSink(engine, filename, ['Time (MM:SS.mmm)', 'Current (A)', 'Power (W)', 'Voltage (V)', 'Errors/Interrupts Total'],
+                           lambda s: [format_time(s.t), f"{s.curr:.6f}", f"{s.power:.6f}", f"{s.volt:.6f}", engine.errors])
+            runSink = RunSink(engine, f"timer_test_{iterations}_{timestamp}_data.adbrun", ['t', 'volt', 'curr', 'power', 'errors'],
+                              lambda s: (s.t, s.volt, s.curr, s.power, engine.errors), header={'test': 'timer_test', 'iteration': iterations, 'currThreshold': currThreshold, 'volt': volt7V2, **trigger_settings()})
+
+            view = LiveView(runSink.pyramid) # whole-run overview every ADB_LIVE_VIEW_S seconds, if set
+            trigger = script_trigger('timer_test', currThreshold) # debounced, crossing time interpolated
+
+            engine.start() # t0 is taken here
+            display.start()
+            sink.start()
+            runSink.start()
+            view.start()
+            while testing:
+                for s in samples.get_all(timeout=1.0):
+                    timeElapsed = s.t
+                    stats.feed(s)
+                    hit = trigger.feed(s)
+                    if hit:
+                        timeElapsed = hit.t
+                        stats.mark('burn', at=hit.index, t=hit.t)
+                        testing = False
+                        break
+                if testing:
+                    engine.check() # the acquisition thread died: stop here with its error
+            engine.stop()
+            display.stop()
+            view.stop()
+            print(engine.report())
+            print(psu.recovery_report())
+
+            print(f"Test #{iterations} complete; Current spike detected\n")
+            print(f"Time elapsed: {format_time(timeElapsed)}\n")
+
+            pending.append(post.submit(finish_iteration, iterations, engine, sink, runSink, stats, hit, timeElapsed))
+
+            print("Resetting...\n")
+            psu.write(f'INST:NSEL {chan1}')
+            psu.write('OUTP OFF')
+            waited, discharged = wait_discharged(psu, chan1) # replaces a fixed 3 s sleep
+            if discharged:
+                print(f"Output discharged after {waited * 1000:.0f} ms\n")
+
+            iterations += 1
+
+        for f in pending:
+            f.result()
+    finally:
+        # also on a failed acquisition or Ctrl-C: the DUT is not left powered, and the
+        # post-processing already queued still finishes
+        if engine is not None and engine.running:
+            engine.stop()
+        psu.write(f'INST:NSEL {chan1}')
+        psu.write('OUTP OFF')
+        post.shutdown(wait=True)
+
+    results.write("\nFinal Results:\n")
+    results.write(f"average time: {format_time(sum(iterTime)/len(iterTime))}\n")
+    results.write(f"average voltage: {sum(iterVolt)/len(iterVolt):.6f} V\n")
+    results.write(f"average current: {sum(iterCurr)/len(iterCurr):.6f} A\n")
+    results.write(f"average power: {sum(iterPower)/len(iterPower):.6f} W\n")
+    results.write(f"average energy: {sum(iterEnergy)/len(iterEnergy):.6f} J\n")
+    results.flush()
+    os.fsync(results.fileno())
+    results.close()
+
+    print("Final results saved to " + results_filename)
+
+if __name__ == "__main__":
+    main()
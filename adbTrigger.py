@@ -0,0 +1,258 @@
+"""Trigger engine for the sample stream, live or replayed.
+
+Conditions look at one sample at a time (plus, optionally, the DIO levels
+read alongside it) and say whether they currently hold:
+
+  Threshold  rising/falling level crossing with hysteresis and N-sample debounce
+  Slope      rate of change (units per second) between consecutive samples
+  Level      a DIO line (DET1, DET2, BURN) at a given level
+  All / Any  combinations, e.g. All(Threshold(0.5), Level('DET1', False))
+
+A Trigger wraps a condition and reports the first time it holds as a
+Crossing. Threshold crossings are interpolated linearly between the last
+sample before and the first sample after the level was crossed, so the
+time does not depend on the sample period or on when the host got round to
+looking; index is the first sample past the level, as crossing_index() in
+adbAnalysis gives for an undebounced threshold.
+"""
+from collections import namedtuple
+from typing import Dict, Optional
+import adbConfig as cfg
+
+# t is on the sample clock, value is the triggering quantity (None for pure DIO conditions)
+Crossing = namedtuple('Crossing', ['t', 'index', 'value'])
+
+class Condition:
+    """Base class; subclasses implement update() and keep since/sinceIndex."""
+    def __init__(self):
+        self.active = False
+        self.since: Optional[float] = None
+        self.sinceIndex: Optional[int] = None
+        self.value: Optional[float] = None
+
+    def update(self, index: int, sample, dio: Optional[Dict[str, bool]]) -> bool:
+        raise NotImplementedError
+
+    def reset(self):
+        Condition.__init__(self)
+
+class Threshold(Condition):
+    """sample.<source> crossing level, upward (rising) or downward.
+
+    Fires once debounce consecutive samples are past the level. It then
+    stays active until the value is back by more than hysteresis, and only
+    arms once the value has been on the other side; armed=True (the
+    default) also fires when the very first sample is already past, as the
+    scripts' plain comparisons did.
+    """
+    def __init__(self, level: float, rising: bool = True, hysteresis: float = 0.0,
+                 debounce: int = 1, source: str = 'curr', armed: bool = True):
+        self.level = level
+        self.rising = rising
+        self.hysteresis = hysteresis
+        self.debounce = max(1, debounce)
+        self.source = source
+        self.startArmed = armed
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.armed = self.startArmed
+        self._count = 0
+        self._prev = None      # (t, value) of the last sample before the crossing
+        self._first = None     # (t, index, value) of the first sample past the level
+
+    def _past(self, v: float) -> bool:
+        return v >= self.level if self.rising else v <= self.level
+
+    def _released(self, v: float) -> bool:
+        return v < self.level - self.hysteresis if self.rising else v > self.level + self.hysteresis
+
+    def _interpolate(self) -> float:
+        t1, _, v1 = self._first
+        if self._prev is None:
+            return t1
+        t0, v0 = self._prev
+        if v1 == v0:
+            return t1
+        return t0 + (self.level - v0) / (v1 - v0) * (t1 - t0)
+
+    def update(self, index: int, sample, dio: Optional[Dict[str, bool]] = None) -> bool:
+        v = getattr(sample, self.source)
+        if self.active:
+            if self._released(v):
+                self.active = False
+                self.armed = True
+                self._count = 0
+            self._prev = (sample.t, v)
+            return self.active
+        if not self._past(v):
+            if self._released(v):
+                self.armed = True
+            self._count = 0
+            self._prev = (sample.t, v)
+            return False
+        if not self.armed:
+            self._prev = (sample.t, v)
+            return False
+        if self._count == 0:
+            self._first = (sample.t, index, v)
+        self._count += 1
+        if self._count < self.debounce:
+            return False
+        self.active = True
+        self.since = self._interpolate()
+        self.sinceIndex = self._first[1]
+        self.value = self._first[2]
+        return True
+
+class Slope(Condition):
+    """Rate of change of sample.<source> at or beyond rate per second (negative for falling)."""
+    def __init__(self, rate: float, debounce: int = 1, source: str = 'curr'):
+        self.rate = rate
+        self.debounce = max(1, debounce)
+        self.source = source
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self._count = 0
+        self._prev = None
+        self._first = None
+
+    def update(self, index: int, sample, dio: Optional[Dict[str, bool]] = None) -> bool:
+        v = getattr(sample, self.source)
+        prev, self._prev = self._prev, (sample.t, v)
+        if prev is None or sample.t <= prev[0]:
+            return self.active
+        slope = (v - prev[1]) / (sample.t - prev[0])
+        steep = slope >= self.rate if self.rate >= 0 else slope <= self.rate
+        if not steep:
+            self._count = 0
+            self.active = False
+            return False
+        if self._count == 0:
+            # the change happened somewhere in the interval; take its middle
+            self._first = ((prev[0] + sample.t) / 2, index, v)
+        self._count += 1
+        if self._count >= self.debounce and not self.active:
+            self.active = True
+            self.since, self.sinceIndex, self.value = self._first
+        return self.active
+
+class Level(Condition):
+    """A DIO line, looked up by name in the dio dict passed with each sample."""
+    def __init__(self, name: str, level: bool = True):
+        self.name = name
+        self.level = level
+        self.reset()
+
+    def update(self, index: int, sample, dio: Optional[Dict[str, bool]] = None) -> bool:
+        state = None if dio is None else dio.get(self.name)
+        holds = state is not None and bool(state) == self.level
+        if holds and not self.active:
+            self.since, self.sinceIndex = sample.t, index
+        self.active = holds
+        return holds
+
+class All(Condition):
+    """Holds while every part holds; since is when the last of them started to."""
+    def __init__(self, *parts: Condition):
+        self.parts = parts
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        for p in self.parts:
+            p.reset()
+
+    def update(self, index: int, sample, dio: Optional[Dict[str, bool]] = None) -> bool:
+        states = [p.update(index, sample, dio) for p in self.parts]
+        self.active = all(states)
+        if self.active:
+            last = max(self.parts, key=lambda p: p.since)
+            self.since, self.sinceIndex = last.since, last.sinceIndex
+            self.value = next((p.value for p in self.parts if p.value is not None), None)
+        return self.active
+
+class Any(Condition):
+    """Holds while at least one part holds; since is the earliest of those."""
+    def __init__(self, *parts: Condition):
+        self.parts = parts
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        for p in self.parts:
+            p.reset()
+
+    def update(self, index: int, sample, dio: Optional[Dict[str, bool]] = None) -> bool:
+        holding = [p for p in self.parts if p.update(index, sample, dio)]
+        self.active = bool(holding)
+        if self.active:
+            first = min(holding, key=lambda p: p.since)
+            self.since, self.sinceIndex, self.value = first.since, first.sinceIndex, first.value
+        return self.active
+
+class Trigger:
+    """Feeds samples to a condition and returns a Crossing the first time it holds.
+
+    Samples are counted from 0 by the trigger itself, so index lines up with
+    the recorded columns when every sample of the run is fed.
+    """
+    def __init__(self, condition: Condition):
+        self.condition = condition
+        self.crossing: Optional[Crossing] = None
+        self._index = 0
+
+    @property
+    def fired(self) -> bool:
+        return self.crossing is not None
+
+    def reset(self):
+        self.condition.reset()
+        self.crossing = None
+        self._index = 0
+
+    def feed(self, sample, dio: Optional[Dict[str, bool]] = None) -> Optional[Crossing]:
+        index = self._index
+        self._index += 1
+        if self.condition.update(index, sample, dio) and self.crossing is None:
+            c = self.condition
+            self.crossing = Crossing(c.since, c.sinceIndex, c.value)
+            return self.crossing
+        return None
+
+def current_trigger(threshold: float, rising: bool = True, debounce: Optional[int] = None,
+                    hysteresis: Optional[float] = None) -> Threshold:
+    """Current threshold condition with the station's debounce and hysteresis (adbConfig)."""
+    return Threshold(threshold, rising,
+                     hysteresis=threshold * (cfg.TRIGGER_HYSTERESIS if hysteresis is None else hysteresis),
+                     debounce=cfg.TRIGGER_DEBOUNCE if debounce is None else debounce)
+
+# test type -> (trigger name, threshold header key) of the current trigger its script ends
+# the timer segment with; adbReplay replays recordings through the same triggers
+SCRIPT_TRIGGERS = {
+    'timer_test': ('timerEnd', 'currThreshold'),
+    'burn_test': ('burnOnset', 'burnCurrThreshold'),
+    'full_functional_test': ('burnOnset', 'burnCurrThreshold'),
+}
+
+# DIO levels with both antennas stowed, for runs whose DET lines were not recorded
+STOWED = {'DET1': False, 'DET2': False}
+
+def script_trigger(test: str, threshold: float, debounce: Optional[int] = None,
+                   hysteresis: Optional[float] = None) -> Trigger:
+    """The current trigger of test's script (see SCRIPT_TRIGGERS).
+
+    The full functional burn onset only counts while DET1 and DET2 are
+    low, so it needs the DIO levels with each sample.
+    """
+    condition = current_trigger(threshold, debounce=debounce, hysteresis=hysteresis)
+    if test == 'full_functional_test':
+        condition = All(condition, Level('DET1', False), Level('DET2', False))
+    return Trigger(condition)
+
+def trigger_settings() -> Dict[str, float]:
+    """Debounce and hysteresis current_trigger() uses, for the run header."""
+    return {'debounce': cfg.TRIGGER_DEBOUNCE, 'hysteresis': cfg.TRIGGER_HYSTERESIS}
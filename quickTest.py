@@ -1,11 +1,7 @@
 # just to make sure script works with PSU
 
-import pyvisa
 import time
-
-pyvisa.ResourceManager().list_resources()
-
-psu = pyvisa.ResourceManager().open_resource('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
+from adbPsu import PsuSession
 
 def format_time(seconds: float) -> str:
     minutes = int(seconds) // 60
@@ -16,26 +12,34 @@ chan1 = 1
 volt3V3 = 3.3
 currLim = 3.0
 
-psu.write('*RST') # resets to default state
-psu.write(f'INST:NSEL {chan1}') # select channel 1
-psu.write(f'VOLT {volt3V3}') # set voltage
-psu.write(f'CURR {currLim}') # set current limit
+def main(argv=None):
+    psu = PsuSession() # cached address checked with *IDN?, the bus scanned only if that fails
+    print("PSU: " + (psu.idn or psu.address))
+
+    psu.write('*RST') # resets to default state
+    psu.write(f'INST:NSEL {chan1}') # select channel 1
+    psu.write(f'VOLT {volt3V3}') # set voltage
+    psu.write(f'CURR {currLim}') # set current limit
+
+    time.sleep(0.2)
 
-time.sleep(0.2)
+    psu.write(f'INST:NSEL {chan1}')
+    psu.write('OUTP ON')
 
-psu.write(f'INST:NSEL {chan1}')
-psu.write('OUTP ON')
+    t0 = time.time() #start time
+    print("output on\n")
 
-t0 = time.time() #start time
-print("output on\n")
+    while time.time() - t0 < 5.0:
+        timeElapsed = time.time() - t0
+        curr = float(psu.query('MEAS:CURR?'))
+        print(f"Time: {format_time(timeElapsed)}, Current: {curr:.3f} A")
+        time.sleep(0.5)
 
-while time.time() - t0 < 5.0:
-	timeElapsed = time.time() - t0
-	curr = float(psu.query('MEAS:CURR?'))
-	print(f"Time: {format_time(timeElapsed)}, Current: {curr:.3f} A")
-	time.sleep(0.5)
+    psu.write('INST:NSEL 1')
+    psu.write('OUTP OFF')
+    psu.write('*RST')
+    print("output off\n")
+    psu.close()
 
-psu.write('INST:NSEL 1')
-psu.write('OUTP OFF')
-psu.write('*RST')
-print("output off\n")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import numpy as np
+from adbAnalysis import run_summary, summarize
+
+def spike_run(spike: float, n: int = 15, k: int = 14, period: float = 0.1):
+    """A quiescent 0.01 A run that jumps to spike amps at sample k."""
+    t = np.arange(n) * period
+    curr = np.full(n, 0.01)
+    curr[k:] = spike
+    volt = np.full(n, 3.6)
+    return t, volt, curr, volt * curr
+
+def test_timer_energy_ignores_spike_after_crossing():
+    quiescent = 0.036 * 1.3 # 0.01 A at 3.6 V up to the last sample before the spike
+    for spike in (1.0, 100.0, 10000.0):
+        t, volt, curr, power = spike_run(spike)
+        summary = summarize(t, volt, curr, power, threshold=0.5)
+        assert quiescent <= summary['timer']['energy'] < quiescent + 0.036 * 0.1
+
+def test_segments_add_up_at_the_crossing():
+    t, volt, curr, power = spike_run(1000.0)
+    summary = run_summary(t, volt, curr, power, threshold=0.5, triggerTime=1.35, index=14)
+    timer, burn, overall = summary['timer'], summary['burn'], summary['overall']
+    assert summary['triggerTime'] == 1.35
+    assert abs(timer['duration'] - 1.35) < 1e-12
+    assert abs(timer['energy'] + burn['energy'] - overall['energy']) < 1e-9
+    assert abs(timer['duration'] + burn['duration'] - overall['duration']) < 1e-12
+
+def test_stream_stats_split_like_summarize():
+    from adbAcquisition import Sample
+    from adbStats import StreamStats
+    t, volt, curr, power = spike_run(1000.0)
+    stats = StreamStats(segment='timer')
+    for k in range(len(t)):
+        stats.feed(Sample(t[k], volt[k], curr[k], power[k]))
+        if k == 14:
+            stats.mark('burn', at=14, t=1.35)
+    stats.finish()
+    streamed = stats.summary('timer_test', triggerTime=1.35)
+    computed = run_summary(t, volt, curr, power, threshold=0.5, index=14, triggerTime=1.35)
+    for segment in ('timer', 'burn', 'overall'):
+        for key in ('energy', 'charge', 'duration', 'power_avg'):
+            assert abs(streamed[segment][key] - computed[segment][key]) < 1e-9, (segment, key)
+
+def test_power_avg_is_time_weighted():
+    from adbAcquisition import Sample
+    from adbStats import StreamStats
+    # 1 W for 10 s at 1 Hz, then a 1 s burst of 100 W sampled at 100 Hz
+    t = np.concatenate([np.arange(11.0), 10.0 + np.arange(1, 101) * 0.01])
+    power = np.where(t > 10.0, 100.0, 1.0)
+    volt = np.full(len(t), 1.0)
+    computed = run_summary(t, volt, power, power)['overall']
+    stats = StreamStats(lag=0)
+    for k in range(len(t)):
+        stats.feed(Sample(t[k], volt[k], power[k], power[k]))
+    stats.finish()
+    streamed = stats.summary()['overall']
+    expected = computed['energy'] / computed['duration']
+    assert abs(computed['power_avg'] - expected) < 1e-12
+    assert abs(streamed['power_avg'] - expected) < 1e-9
+    assert abs(streamed['power_avg'] - stats.overall.power_avg) < 1e-12
+    assert expected < 15.0 # the sample mean would be ~91 W
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import re
+import pytest
+from adbBatch import Batch, CycleFailed, Sequence, station_checks
+from adbSim import SimulatedBoard
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def write_seq(tmp_path, text):
+    path = tmp_path / 'test.seq'
+    path.write_text(text)
+    return str(path)
+
+def test_load(tmp_path):
+    seq = Sequence.load(write_seq(tmp_path, (
+        "# header comment\n"
+        "\n"
+        "Connections verified? = Y   # trailing comment\n"
+        "Verified DS? is ON* = check: ds1-on, burn-off\n"
+        "Ready to * = wait: 0.5\n"
+        "Ready to remove RBF? = n\n"
+        "a = b = y\n")))
+    assert seq.answer("CONNECTIONS VERIFIED?") == 'y'
+    assert seq.answer("Verified DS1 is ON and EGSE BURN is OFF?") == 'check:ds1-on,burn-off'
+    assert seq.answer("Verified DS2 is ON and EGSE DET1 is OFF?") == 'check:ds1-on,burn-off'
+    assert seq.answer("Ready to remove RBF?") == 'wait:0.5' # the first match wins
+    assert seq.answer("a = b") == 'y' # the last '=' separates the answer
+    assert seq.answer("Verified DS1 is OFF?") is None
+
+@pytest.mark.parametrize('line', ["Connections verified? = maybe", "Connections verified? = wait:soon",
+                                  "Connections verified? = check:"])
+def test_bad_answers(tmp_path, line):
+    with pytest.raises(ValueError, match='bad answer'):
+        Sequence.load(write_seq(tmp_path, line + "\n"))
+
+def test_line_without_answer(tmp_path):
+    with pytest.raises(ValueError, match=r'test\.seq:2:'):
+        Sequence.load(write_seq(tmp_path, "Connections verified? = y\nReady to begin burn test?\n"))
+
+@pytest.mark.parametrize('script, seq', [('adbBurnToDeploy.py', 'burn_test.seq'),
+                                         ('adbFullFunctional.py', 'full_functional_test.seq')])
+def test_shipped_sequences_answer_every_prompt(script, seq):
+    with open(os.path.join(HERE, script)) as f:
+        prompts = re.findall(r'\bask(?:_async)?\("([^"]+)"\)', f.read())
+    assert prompts
+    checks = station_checks(lambda pin: False, lambda n: [0.0] * n)
+    sequence = Sequence.load(os.path.join(HERE, seq))
+    for prompt in prompts:
+        answer = sequence.answer(prompt)
+        assert answer is not None, prompt
+        kind, _, arg = answer.partition(':')
+        if kind == 'check':
+            assert set(arg.split(',')) <= set(checks), prompt
+
+def board_checks(board):
+    return station_checks(lambda pin: bool(board.dio() >> pin & 1),
+                          lambda n: [board.current() for _ in range(n)])
+
+def test_checks_read_the_board():
+    board = SimulatedBoard(timerDelay=None, noise=0.0)
+    batch = Batch('burn_test', Sequence.load(os.path.join(HERE, 'burn_test.seq')))
+    batch.checks = board_checks(board)
+    batch.ask("Ready to begin burn test?") # both antennas stowed
+    with pytest.raises(CycleFailed, match='EGSE BURN reads low'):
+        batch.ask("Verified EGSE BURN is ON?")
+    board.set_burn(True)
+    batch.ask("Verified EGSE BURN is ON?")
+
+def test_unanswered_and_n_fail_the_cycle(tmp_path):
+    batch = Batch('burn_test', Sequence.load(write_seq(tmp_path, "Connections verified? = n\n")))
+    with pytest.raises(CycleFailed, match='answered n'):
+        batch.ask("Connections verified?")
+    with pytest.raises(CycleFailed, match='no answer'):
+        batch.ask("ADB connected to EGSE?")
+
+@pytest.mark.filterwarnings('ignore:coroutine .* was never awaited') # ask() drops the reader unawaited
+def test_async_checks_need_ask_async(tmp_path):
+    batch = Batch('full_functional_test', Sequence.load(write_seq(tmp_path, "Verified DS1 is OFF? = check:ds1-off\n")))
+
+    async def currents(n):
+        return [0.0] * n
+    batch.checks = station_checks(lambda pin: False, currents)
+    with pytest.raises(TypeError):
+        batch.ask("Verified DS1 is OFF?")
+    asyncio.run(batch.ask_async("Verified DS1 is OFF?"))
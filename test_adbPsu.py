@@ -0,0 +1,104 @@
+import pytest
+import adbPsu
+from adbPsu import measure_all, parse_meas_all, visa_error
+from adbSim import SimulatedBoard, SimulatedPsu
+
+class NoMeasAll(SimulatedPsu):
+    """A PSU that times out on MEAS:ALL? like any unknown header."""
+    def query(self, cmd):
+        if cmd.startswith('MEAS:ALL?'):
+            cmd = 'MEAS:BOGUS?'
+        return super().query(cmd)
+
+class Glitch(SimulatedPsu):
+    """A PSU whose MEAS:ALL? reply is lost on the bus; nothing goes to its error queue."""
+    def query(self, cmd):
+        if cmd.startswith('MEAS:ALL?'):
+            raise adbPsu.visa_io_error('error_timeout')
+        return super().query(cmd)
+
+def powered(cls=SimulatedPsu, name='SIM::A'):
+    psu = cls(SimulatedBoard(timerDelay=None, noise=0.0), latency=0.0, jitter=0.0, resource_name=name)
+    psu.timeout = 1 # ms, so the simulated timeouts are quick
+    adbPsu._measAllSupported.pop(name, None)
+    psu.write('VOLT 7.2')
+    psu.write('OUTP ON')
+    return psu
+
+def test_parse_meas_all():
+    assert parse_meas_all('7.2000,0.0050,0.0360\n') == (7.2, 0.005, 0.036)
+    with pytest.raises(ValueError):
+        parse_meas_all('7.2000,0.0050\n')
+
+def test_meas_all_used_when_supported():
+    psu = powered()
+    assert measure_all(psu, 1) == (7.2, 0.005, 0.036)
+    assert adbPsu._measAllSupported['SIM::A'] is True
+
+def test_stale_error_does_not_disable_meas_all():
+    psu = powered()
+    psu.errors += ['-222,"Data out of range"', '-113,"Undefined header"']
+    assert measure_all(psu, 1) == (7.2, 0.005, 0.036)
+    assert adbPsu._measAllSupported['SIM::A'] is True
+    assert psu.errors == []
+
+def test_undefined_header_falls_back_to_per_quantity_queries():
+    psu = powered(NoMeasAll, 'SIM::B')
+    assert measure_all(psu, 1) == (7.2, 0.005, 0.036)
+    assert adbPsu._measAllSupported['SIM::B'] is False
+    before = psu.queries
+    measure_all(psu, 1)
+    assert psu.queries - before == 3 # no second probe
+
+def test_other_timeouts_are_passed_on():
+    psu = powered(Glitch, 'SIM::C')
+    with pytest.raises(visa_error()):
+        measure_all(psu, 1)
+    assert 'SIM::C' not in adbPsu._measAllSupported
+
+def session(sim):
+    from adbPsu import PsuSession
+    from adbSim import SimulatedResourceManager
+    return PsuSession(address=sim.resource_name, rm=SimulatedResourceManager(sim))
+
+def outage(sim, seconds):
+    now = sim.board.clock()
+    sim.faults = [(now, now + seconds)]
+
+def test_recover_reopens_and_restores_the_state():
+    sim = powered(name='SIM::D')
+    psu = session(sim)
+    psu.write('INST:NSEL 2')
+    psu.write('VOLT 5.0')
+    psu.write('CURR 1.0')
+    psu.write('OUTP ON')
+    psu.write('INST:NSEL 1')
+    # the PSU drops off the bus for longer than the clear() attempts and comes back reset
+    outage(sim, 0.15)
+    for ch in sim.channels.values():
+        ch.update(VOLT=0.0, CURR=0.0, OUTP=False)
+    psu.recover()
+    assert psu.reopens >= 1 and psu.failedRecoveries == 0
+    assert sim.channels[2] == {'VOLT': 5.0, 'CURR': 1.0, 'OUTP': True}
+    assert sim.chan == 1
+
+def test_recover_gives_up_after_bounded_backoff():
+    import time
+    import adbConfig as cfg
+    sim = powered(name='SIM::E')
+    psu = session(sim)
+    outage(sim, 60.0)
+    start = time.perf_counter()
+    psu.recover()
+    elapsed = time.perf_counter() - start
+    assert psu.failedRecoveries == 1
+    bound = cfg.RECOVERY_MAX_ATTEMPTS * (cfg.RECOVERY_PROBE_TIMEOUT_MS / 1000 + cfg.RECOVERY_MAX_BACKOFF_S)
+    assert elapsed < bound + 0.2
+    assert psu.recovery_report().startswith("PSU errors: 1, reopens: ")
+
+def test_clear_is_enough_for_a_short_glitch():
+    sim = powered(name='SIM::F')
+    psu = session(sim)
+    outage(sim, 0.0)
+    psu.recover()
+    assert psu.reopens == 0 and psu.failedRecoveries == 0
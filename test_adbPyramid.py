@@ -0,0 +1,63 @@
+import numpy as np
+from adbPyramid import Pyramid, PyramidWriter, open_pyramid, pyramid_path
+from adbRunFormat import RunWriter
+
+COLUMNS = ['t', 'volt', 'curr', 'power']
+
+def record(path, n=2345, batch=37, pyramid=True):
+    """A run written the way RunSink does it: the .adbrun and the pyramid from the same batches."""
+    rng = np.random.default_rng(1)
+    t = 0.05 * np.arange(n)
+    curr = 0.005 + 0.001 * rng.standard_normal(n)
+    curr[n // 2:] += 0.8
+    rows = np.column_stack((t, np.full(n, 7.2), curr, 7.2 * curr))
+    writer = RunWriter(str(path), COLUMNS)
+    pyramid = PyramidWriter(pyramid_path(str(path)), COLUMNS, factor=10) if pyramid else None
+    for i in range(0, n, batch):
+        for row in rows[i:i + batch]:
+            writer.append(row)
+        if pyramid:
+            pyramid.extend(rows[i:i + batch])
+    writer.close()
+    return rows, pyramid
+
+def check(env, rows, j):
+    """Every bin of env agrees with the raw samples between its first and last time."""
+    assert len(env.t0)
+    for t0, t1, n, lo, hi, mean in zip(env.t0, env.t1, env.n, env.min, env.max, env.mean):
+        values = rows[(rows[:, 0] >= t0) & (rows[:, 0] <= t1), j]
+        assert n == len(values)
+        assert lo == values.min() and hi == values.max()
+        assert abs(mean - values.mean()) < 1e-12
+
+def test_query_matches_the_raw_columns(tmp_path):
+    path = str(tmp_path / 'timer_test_1_20260101_000000_data.adbrun')
+    rows, writer = record(path)
+    writer.close()
+    with Pyramid(pyramid_path(path)) as pyramid:
+        assert pyramid.rows == len(rows)
+        whole = pyramid.query('curr', pixels=20)
+        assert whole.level == 2 # 24 bins of 100 samples, the last one partial
+        assert whole.n.sum() == len(rows)
+        check(whole, rows, 2)
+        window = pyramid.query('power', 30.0, 80.0, pixels=50)
+        assert window.level == 1
+        check(window, rows, 3)
+        raw = pyramid.query('curr', 30.0, 31.0, pixels=50)
+        assert raw.level == 0
+        assert list(raw.t0) == [t for t in rows[:, 0] if 30.0 <= t <= 31.0]
+        check(raw, rows, 2)
+
+def test_live_query_matches_the_raw_columns(tmp_path):
+    rows, writer = record(tmp_path / 'timer_test_1_20260101_000000_data.adbrun')
+    env = writer.query('curr', pixels=20)
+    assert env.n.sum() == len(rows)
+    check(env, rows, 2)
+    writer.close()
+
+def test_open_pyramid_builds_one_for_older_runs(tmp_path):
+    path = str(tmp_path / 'burn_test_20260101_000000_data.adbrun')
+    rows, _ = record(path, pyramid=False)
+    with open_pyramid(path) as pyramid:
+        assert pyramid.header['source'] == 'burn_test_20260101_000000_data.adbrun'
+        check(pyramid.query('curr', pixels=20), rows, 2)
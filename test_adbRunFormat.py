@@ -0,0 +1,56 @@
+import os
+import pytest
+from adbRunFormat import EXTENSION, RunFile, RunWriter, convert_csv
+
+def test_round_trip_across_spilled_chunks(tmp_path):
+    path = str(tmp_path / 'timer_test_1_20260101_000000_data.adbrun')
+    rows = [(0.05 * k, 7.2, 0.005 + 1e-6 * k, 7.2 * (0.005 + 1e-6 * k), k // 100) for k in range(1000)]
+    writer = RunWriter(path, ['t', 'volt', 'curr', 'power', 'errors'], {'test': 'timer_test'}, chunkRows=64)
+    for row in rows:
+        writer.append(row)
+    writer.close({'triggerIndex': 990})
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+    with RunFile(path) as run:
+        assert run.rows == 1000
+        assert run.header['test'] == 'timer_test' and run.header['triggerIndex'] == 990
+        assert run.columns == ['t', 'volt', 'curr', 'power', 'errors']
+        assert 'volt' in run and 'dio' not in run
+        for i, name in enumerate(run.columns):
+            assert list(run.column(name)) == [row[i] for row in rows]
+
+def test_empty_run(tmp_path):
+    path = str(tmp_path / 'empty') + EXTENSION
+    RunWriter(path, ['t', 'curr']).close()
+    with RunFile(path) as run:
+        assert run.rows == 0 and len(run.column('curr')) == 0
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_a_run.adbrun'
+    path.write_bytes(b'\0' * 128)
+    with pytest.raises(ValueError):
+        RunFile(str(path))
+
+def test_convert_csv(tmp_path):
+    csvPath = tmp_path / 'timer_test_2_20260101_000000_data.csv'
+    csvPath.write_text(
+        "Time (MM:SS.mmm),Current (A),Power (W),Voltage (V),Errors/Interrupts Total\n"
+        "00:00.000,0.005000,0.036000,7.200000,0\n"
+        "00:00.250,0.005100,0.036720,7.200000,0\n"
+        "\n"
+        "01:02.500,0.800000,5.760000,7.200000,1\n")
+    path = convert_csv(str(csvPath))
+    assert path == str(tmp_path / 'timer_test_2_20260101_000000_data.adbrun')
+    with RunFile(path) as run:
+        assert run.header['test'] == 'timer_test'
+        assert run.header['source'] == csvPath.name
+        assert run.columns == ['t', 'curr', 'power', 'volt', 'errors']
+        assert list(run.column('t')) == [0.0, 0.25, 62.5]
+        assert list(run.column('curr')) == [0.005, 0.0051, 0.8]
+        assert list(run.column('errors')) == [0.0, 0.0, 1.0]
+
+def test_convert_csv_rejects_unknown_columns(tmp_path):
+    csvPath = tmp_path / 'burn_test_20260101_000000_data.csv'
+    csvPath.write_text("Time (MM:SS.mmm),Temperature (C)\n00:00.000,21.0\n")
+    with pytest.raises(ValueError):
+        convert_csv(str(csvPath))
+    assert not os.path.exists(str(tmp_path / 'burn_test_20260101_000000_data.adbrun'))
@@ -0,0 +1,38 @@
+import numpy as np
+from adbRunFormat import RunFile, RunWriter
+from adbRunIndex import RunIndex, register_run
+from timerTestResultCalculator import analyze_file
+
+def write_run(path, n=50):
+    """A timer run at a sagging 7.2 V that trips 0.5 A at sample 40."""
+    writer = RunWriter(str(path), ['t', 'volt', 'curr', 'power', 'errors'],
+                       header={'test': 'timer_test', 'currThreshold': 0.5})
+    for k in range(n):
+        volt = 7.2 - 0.01 * k
+        curr = 0.9 if k >= 40 else 0.01
+        writer.append((0.1 * k, volt, curr, volt * curr, 0))
+    writer.close()
+    return str(path)
+
+def test_indexed_volt_avg_matches_the_file(tmp_path):
+    path = write_run(tmp_path / 'timer_test_1_20260101_000000_data.adbrun')
+    db = str(tmp_path / 'runs.sqlite')
+    register_run(path, db=db)
+    with RunIndex(db) as index:
+        summary = index.lookup(path)
+    with RunFile(path) as run:
+        volt = np.array(run.column('volt'))
+    assert abs(summary['overall']['volt_avg'] - volt.mean()) < 1e-9
+    assert abs(summary['timer']['volt_avg'] - volt[:40].mean()) < 1e-9
+    assert abs(summary['burn']['volt_avg'] - volt[40:].mean()) < 1e-9
+
+def test_index_and_fresh_analysis_agree(tmp_path):
+    path = write_run(tmp_path / 'timer_test_1_20260101_000000_data.adbrun')
+    db = str(tmp_path / 'runs.sqlite')
+    register_run(path, db=db)
+    with RunIndex(db) as index:
+        cached = index.lookup(path)
+    fresh = analyze_file(path)
+    for segment in ('overall', 'timer', 'burn'):
+        for key in ('volt_avg', 'curr_avg', 'energy', 'duration'):
+            assert abs(cached[segment][key] - fresh[segment][key]) < 1e-9
@@ -0,0 +1,77 @@
+import socket
+import time
+import pytest
+from adbPsu import PsuSession, measure_each, visa_error
+from adbSim import ScpiServer, SimulatedBoard, SimulatedPsu
+from adbSocket import SocketResource, SocketResourceManager, parse_address
+
+class SlowVolt(SimulatedPsu):
+    """A PSU that answers MEAS:VOLT? only after delay seconds, well past the client's timeout."""
+    delay = 0.3
+    def query(self, cmd):
+        if cmd.startswith('MEAS:VOLT?'):
+            time.sleep(self.delay)
+        return super().query(cmd)
+
+@pytest.fixture
+def server(request):
+    cls = getattr(request, 'param', SimulatedPsu)
+    sim = cls(SimulatedBoard(timerDelay=None, noise=0.0), latency=0.0, jitter=0.0)
+    sim.timeout = 1 # ms, so unknown headers fail quickly
+    sim.write('VOLT 7.2')
+    sim.write('OUTP ON')
+    server = ScpiServer(sim, port=0)
+    server.start()
+    yield server
+    server.stop()
+
+def connect(server, timeout=1000):
+    return SocketResource(*server.address, timeout=timeout)
+
+def test_parse_address():
+    assert parse_address('TCPIP0::10.0.0.5::5025::SOCKET') == ('10.0.0.5', 5025)
+    assert parse_address('10.0.0.5:5025') == ('10.0.0.5', 5025)
+    assert parse_address('10.0.0.5') == ('10.0.0.5', 5555)
+    with pytest.raises(ValueError):
+        parse_address('USB0::0x1AB1::0x0E11::DP8C234305873::INSTR')
+
+def test_query_many_splits_one_reply(server):
+    psu = connect(server)
+    before = server.psu.queries
+    assert psu.query_many(['MEAS:VOLT?', ':MEAS:CURR?', 'MEAS:POWE?']) == ['7.2000', '0.0050', '0.0360']
+    assert server.psu.queries - before == 3
+    assert measure_each(psu, 1) == (7.2, 0.005, 0.036)
+    psu.close()
+
+def test_query_many_wants_one_reply_per_query(server):
+    psu = connect(server, timeout=200)
+    with pytest.raises(ValueError):
+        psu.query_many(['MEAS:VOLT?', 'OUTP ON', 'MEAS:CURR?']) # the write has no reply
+    psu.close()
+
+@pytest.mark.parametrize('server', [SlowVolt], indirect=True)
+def test_late_reply_is_not_taken_for_the_next_one(server):
+    psu = connect(server, timeout=50)
+    with pytest.raises(visa_error()):
+        psu.query('MEAS:VOLT?')
+    psu.clear() # reconnects; the late '7.2000' goes to the old connection
+    psu.timeout = 1000
+    assert psu.query('MEAS:CURR?') == '0.0050'
+    psu.close()
+
+def test_lost_connection_is_a_visa_error(server):
+    psu = connect(server)
+    psu._sock.shutdown(socket.SHUT_RDWR)
+    with pytest.raises(visa_error()):
+        psu.query('MEAS:CURR?')
+    psu.close()
+
+@pytest.mark.parametrize('server', [SlowVolt], indirect=True)
+def test_session_recovers_from_a_timeout(server):
+    psu = PsuSession(address=f"{server.address[0]}:{server.address[1]}", timeout=50, rm=SocketResourceManager())
+    with pytest.raises(visa_error()):
+        psu.query('MEAS:VOLT?')
+    psu.recover()
+    assert psu.failedRecoveries == 0
+    assert psu.query('MEAS:CURR?').strip() == '0.0050'
+    psu.close()
@@ -0,0 +1,74 @@
+from adbAcquisition import Sample
+from adbTrigger import All, Any, Level, STOWED, Threshold, Trigger, script_trigger
+
+def samples(currents, period=0.1):
+    return [Sample(k * period, 3.6, i, 3.6 * i) for k, i in enumerate(currents)]
+
+def first_hit(trigger, run, dio=None):
+    for s in run:
+        hit = trigger.feed(s, dio)
+        if hit:
+            return hit
+    return None
+
+def test_crossing_time_is_interpolated():
+    hit = first_hit(Trigger(Threshold(0.5)), samples([0.0, 0.0, 0.2, 0.8, 0.9]))
+    assert hit.index == 3
+    assert abs(hit.t - 0.25) < 1e-12 # 0.2 -> 0.8 between 0.2 s and 0.3 s
+    assert hit.value == 0.8
+
+def test_debounce_ignores_a_single_sample_spike():
+    run = samples([0.0, 0.9, 0.0, 0.0, 0.9, 0.9, 0.9])
+    assert first_hit(Trigger(Threshold(0.5, debounce=1)), run).index == 1
+    hit = first_hit(Trigger(Threshold(0.5, debounce=2)), run)
+    assert hit.index == 4 # the first sample of the run that held
+    assert abs(hit.t - (0.3 + 0.5 / 0.9 * 0.1)) < 1e-12
+
+def test_hysteresis_keeps_it_active_until_released():
+    cond = Threshold(0.5, hysteresis=0.1)
+    states = [cond.update(k, s) for k, s in enumerate(samples([0.6, 0.45, 0.41, 0.39, 0.6]))]
+    assert states == [True, True, True, False, True]
+
+def test_unarmed_threshold_waits_for_the_other_side():
+    run = samples([0.9, 0.9, 0.1, 0.9])
+    assert first_hit(Trigger(Threshold(0.5)), run).index == 0
+    assert first_hit(Trigger(Threshold(0.5, armed=False)), run).index == 3
+
+def test_falling_threshold():
+    hit = first_hit(Trigger(Threshold(0.5, rising=False)), samples([1.0, 0.8, 0.2]))
+    assert hit.index == 2
+    assert abs(hit.t - 0.15) < 1e-12
+
+def test_all_fires_when_the_last_part_starts_holding():
+    trigger = Trigger(All(Threshold(0.5), Level('DET1', False)))
+    run = samples([0.9, 0.9, 0.9])
+    assert trigger.feed(run[0], {'DET1': True}) is None
+    hit = trigger.feed(run[1], {'DET1': False})
+    assert hit.index == 1 and hit.t == run[1].t
+    assert hit.value == 0.9
+
+def test_any_takes_the_earliest_part():
+    cond = Any(Level('DET1'), Level('DET2'))
+    run = samples([0.0, 0.0, 0.0])
+    assert not cond.update(0, run[0], {'DET1': False, 'DET2': False})
+    assert cond.update(1, run[1], {'DET1': False, 'DET2': True})
+    assert cond.update(2, run[2], {'DET1': True, 'DET2': True})
+    assert cond.since == run[1].t
+
+def test_missing_dio_never_holds():
+    assert first_hit(Trigger(Level('DET1', False)), samples([0.0, 0.0])) is None
+
+def test_reset_starts_over():
+    trigger = Trigger(Threshold(0.5))
+    run = samples([0.0, 0.9])
+    assert first_hit(trigger, run).index == 1
+    trigger.reset()
+    assert not trigger.fired
+    assert first_hit(trigger, run).index == 1
+
+def test_full_functional_burn_onset_needs_both_antennas_stowed():
+    run = samples([0.0, 0.9, 0.9, 0.9])
+    deployed = {'DET1': True, 'DET2': False}
+    assert first_hit(script_trigger('full_functional_test', 0.5, debounce=1), run, deployed) is None
+    assert first_hit(script_trigger('full_functional_test', 0.5, debounce=1), run, STOWED).index == 1
+    assert first_hit(script_trigger('timer_test', 0.5, debounce=1), run).index == 1
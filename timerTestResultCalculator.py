@@ -1,55 +1,222 @@
+import argparse
 import csv
 import glob
+import os
+import statistics
 import sys
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from adbRunFormat import CSV_COLUMNS, EXTENSION, RunFile, test_type
+from adbAnalysis import summarize_run
+from adbPyramid import open_pyramid, sparkline
+from adbRunIndex import DEFAULT_DB, RunIndex, file_hash
+
+TEST_TYPES = ('timer_test', 'burn_test', 'full_functional_test')
 
 def parse_time(ts: str) -> float:
     """Parse 'MM:SS.mmm' into seconds (float)."""
     minutes, rest = ts.split(':')
     return int(minutes) * 60 + float(rest)
 
-def parse_csv_file(path: str) -> Tuple[List[float], List[float], List[float]]:
-    """Return (times_s, currents_A, powers_W)."""
-    times, currents, powers = [], [], []
+def parse_csv_file(path: str) -> Tuple[List[float], Optional[List[float]], List[float], List[float]]:
+    """Return (times_s, volts_V, currents_A, powers_W); columns are found by header name.
+
+    volts is None for CSVs without a voltage column (burn_test).
+    """
+    times, volts, currents, powers = [], [], [], []
     with open(path, newline='') as f:
         reader = csv.reader(f)
-        header = next(reader, None)
+        header = next(reader, None) or []
+        names = [next((col for prefix, col in CSV_COLUMNS.items() if title.startswith(prefix)), None) for title in header]
+        iCurr, iPower = names.index('curr'), names.index('power')
+        iVolt = names.index('volt') if 'volt' in names else None
+        width = max(iCurr, iPower, iVolt or 0) + 1
         for row in reader:
-            if not row or len(row) < 3:
+            if not row or len(row) < width:
                 continue
             times.append(parse_time(row[0].strip()))
-            currents.append(float(row[1]))
-            powers.append(float(row[2]))
-    return times, currents, powers
+            if iVolt is not None:
+                volts.append(float(row[iVolt]))
+            currents.append(float(row[iCurr]))
+            powers.append(float(row[iPower]))
+    return times, volts if iVolt is not None else None, currents, powers
+
+def load_run(path: str) -> Tuple[Sequence[float], Optional[Sequence[float]], Sequence[float], Sequence[float], Dict]:
+    """Return (times_s, volts_V, currents_A, powers_W, header) from a .adbrun or *_data.csv file.
+
+    .adbrun columns are copied out of the memory-mapped file (one memcpy
+    each) and the file is closed, so batch workers don't keep a mapping and
+    a descriptor open per run; volts is None for runs recorded without
+    it. CSVs have an empty header.
+    """
+    if not path.endswith(EXTENSION):
+        return parse_csv_file(path) + ({},)
+    with RunFile(path) as run:
+        volts = np.array(run.column('volt')) if 'volt' in run else None
+        return np.array(run.column('t')), volts, np.array(run.column('curr')), np.array(run.column('power')), run.header
+
+def find_runs(testTypes: Iterable[str]) -> List[str]:
+    """Glob *_data files of the given test types, preferring .adbrun over .csv for the same run."""
+    runs = {}
+    for prefix in testTypes:
+        for path in glob.glob(f"{prefix}_*_data.csv") + glob.glob(f"{prefix}_*_data{EXTENSION}"):
+            stem = os.path.splitext(path)[0]
+            if stem not in runs or path.endswith(EXTENSION):
+                runs[stem] = path
+    return sorted(runs.values())
 
-def avg(lst: List[float]) -> float:
-    return sum(lst) / len(lst) if lst else 0.0
+def analyze_file(path: str, digest: bool = False) -> Dict:
+    """Summarize one run file; runs in a worker process in batch mode.
+
+    With digest the content hash for the run index is computed here too,
+    so hashing is spread over the workers as well.
+    """
+    times, volts, currents, powers, header = load_run(path)
+    summary = summarize_run(times, volts, currents, powers, header, header.get('test', test_type(path)))
+    summary['path'] = path
+    if digest:
+        summary['hash'] = file_hash(path)
+    return summary
 
 def format_time(seconds: float) -> str:
     minutes = int(seconds) // 60
     secs = seconds - minutes * 60
     return f"{minutes:02d}:{secs:06.3f}"
 
+def print_report(summary: Dict):
+    overall = summary['overall']
+    print(f"File: {summary['path']}")
+    print(f"  samples: {summary['samples']}")
+    print(f"  final time: {format_time(summary['finalTime'])}")
+    print(f"  avg current: {overall['curr_avg']:.5f} A")
+    print(f"  avg power: {overall['power_avg']:.5f} W")
+    if summary['samples']:
+        print(f"  peak current: {overall['curr_peak']:.5f} A (p50 {overall['curr_p50']:.5f}, p99 {overall['curr_p99']:.5f})")
+        print(f"  peak power: {overall['power_peak']:.5f} W")
+    print(f"  total energy: {overall['energy']:.3f} J")
+    if summary['burnIndex'] is not None:
+        print(f"  timer segment: {format_time(summary['timer']['duration'])}, {summary['timer']['energy']:.3f} J")
+        print(f"  burn segment: {format_time(summary['burn']['duration'])}, {summary['burn']['energy']:.3f} J")
+    print(f"  detected errors (time gaps >1s): {summary['gaps']}\n")
+    print(f"  total downtime due to errors: {format_time(summary['downtime'])}\n")
+
+def print_overview(path: str, width: int, window: Optional[Tuple[float, float]] = None):
+    """Current envelope of the run (or of window, in seconds) from its decimation pyramid.
+
+    Reads on the order of width bins whatever the run's length; a run
+    recorded without a pyramid gets one built first.
+    """
+    if not path.endswith(EXTENSION):
+        print(f"  overview: needs the {EXTENSION} file (see adbRunFormat.py)\n")
+        return
+    start, end = window or (None, None)
+    with open_pyramid(path) as pyramid:
+        env = pyramid.query('curr', start, end, pixels=width)
+    if not len(env.t0):
+        print("  overview: no samples in the window\n")
+        return
+    print(f"  current {format_time(env.t0[0])}-{format_time(env.t1[-1])}: {env.min.min():.5f}..{env.max.max():.5f} A")
+    print(f"  |{sparkline(env, width, start, end)}|\n")
+
+def parse_window(text: str) -> Tuple[float, float]:
+    start, _, end = text.partition(':')
+    return float(start), float(end)
+
+def describe(values: List[float]) -> Tuple[float, float, float, float]:
+    """(mean, stddev, min, max); stddev is 0 for a single run."""
+    return (statistics.fmean(values), statistics.stdev(values) if len(values) > 1 else 0.0,
+            min(values), max(values))
+
+def print_combined(summaries: List[Dict]):
+    """Campaign table: time-to-trigger and energy per run, grouped by test type."""
+    print("Combined summary:")
+    print(f"  {'test':<22} {'runs':>5}  {'quantity':<16} {'mean':>12} {'stddev':>12} {'min':>12} {'max':>12}")
+    for kind in sorted({s['test'] for s in summaries}):
+        group = [s for s in summaries if s['test'] == kind and s['samples']]
+        if not group:
+            continue
+        rows = (
+            ('trigger time (s)', [s['triggerTime'] for s in group]),
+            ('energy (J)', [s['overall']['energy'] for s in group]),
+            ('downtime (s)', [s['downtime'] for s in group]),
+        )
+        for i, (name, values) in enumerate(rows):
+            mean, std, lo, hi = describe(values)
+            label = kind if i == 0 else ''
+            runs = str(len(group)) if i == 0 else ''
+            print(f"  {label:<22} {runs:>5}  {name:<16} {mean:>12.3f} {std:>12.3f} {lo:>12.3f} {hi:>12.3f}")
+
+def _analyze(paths: List[str], workers: int, ordered: bool, digest: bool):
+    work = partial(analyze_file, digest=digest)
+    if workers <= 1 or len(paths) <= 1:
+        yield from map(work, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if ordered:
+            # a few files per task keeps pickling overhead low for big campaigns
+            yield from pool.map(work, paths, chunksize=max(1, len(paths) // (workers * 4)))
+        else:
+            for future in as_completed([pool.submit(work, p) for p in paths]):
+                yield future.result()
+
+def analyze(paths: List[str], workers: int = 1, ordered: bool = True, index: Optional[RunIndex] = None):
+    """Yield summaries for paths, fanned out over a process pool when workers > 1.
+
+    With an index, unchanged files are served from it and only new or
+    modified runs are parsed; their results are stored back.
+    """
+    cached = {}
+    if index is not None:
+        for p in paths:
+            summary = index.lookup(p)
+            if summary is not None:
+                summary['path'] = p
+                cached[p] = summary
+    fresh = _analyze([p for p in paths if p not in cached], workers, ordered, index is not None)
+
+    def store(summary):
+        if index is not None:
+            index.register(summary['path'], summary, summary.pop('hash'))
+        return summary
+
+    if not ordered:
+        yield from cached.values()
+        for summary in fresh:
+            yield store(summary)
+        return
+    for p in paths:
+        yield cached[p] if p in cached else store(next(fresh))
+
 if __name__ == "__main__":
-    paths = sys.argv[1:] or glob.glob("timer_test_*_data.csv")
+    parser = argparse.ArgumentParser(description="Summarize ADB test runs (.adbrun or *_data.csv).")
+    parser.add_argument('paths', nargs='*', help="run files; default globs timer_test_*_data.adbrun/.csv")
+    parser.add_argument('--all', action='store_true', help="also glob burn_test_* and full_functional_test_* runs")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1, help="worker processes (1 = no pool)")
+    parser.add_argument('--as-completed', action='store_true', help="print runs as they finish instead of in order")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print the combined summary")
+    parser.add_argument('--index', default=DEFAULT_DB, help="SQLite run index to reuse results from")
+    parser.add_argument('--no-index', action='store_true', help="reparse every file and leave the index alone")
+    parser.add_argument('--overview', type=int, nargs='?', const=80, default=0, metavar='WIDTH',
+                        help="print each run's current envelope WIDTH characters wide, from its .adbpyr")
+    parser.add_argument('--window', type=parse_window, metavar='START:END', help="zoom the overview to these seconds")
+    args = parser.parse_args()
+
+    paths = args.paths or find_runs(TEST_TYPES if args.all else ('timer_test',))
     if not paths:
-        print("No files found (use filenames or let it glob timer_test_*_data.csv)")
-        sys.exit(1)       
+        print("No files found (use filenames or let it glob timer_test_*_data.adbrun / .csv)")
+        sys.exit(1)
 
-    for p in paths:
-        times, currents, powers = parse_csv_file(p)
-        errors = 0
-        downtime = 0.0
-        for i in range(len(times)):
-            if i > 0 and (times[i] - times[i-1] > 1.0):
-                errors += 1
-                downtime += times[i] - times[i-1]
-
-        print(f"File: {p}")
-        print(f"  samples: {len(times)}")
-        print(f"  final time: {format_time(times[-1])}")
-        print(f"  avg current: {avg(currents):.5f} A")
-        print(f"  avg power: {avg(powers):.5f} W")
-        print(f"  total energy: {avg(powers)*times[-1]:.3f} J")
-        print(f"  detected errors (time gaps >1s): {errors}\n")
-        print(f"  total downtime due to errors: {format_time(downtime)}\n")
\ No newline at end of file
+    index = None if args.no_index else RunIndex(args.index)
+    summaries = []
+    for summary in analyze(paths, args.workers, ordered=not args.as_completed, index=index):
+        summaries.append(summary)
+        if not args.quiet:
+            print_report(summary)
+            if args.overview:
+                print_overview(summary['path'], args.overview, args.window)
+    if index is not None:
+        index.close()
+    if len(summaries) > 1 or args.quiet:
+        print_combined(summaries)